@@ -20,13 +20,22 @@ try:
     from ags_core import (
         AGS4_to_dict,
         AGS4_to_dataframe,
+        iter_groups,
+        index_groups,
+        split_ags_line,
         concat_ags_files,
         combine_ags_data,
         search_keyword,
         match_soil_types,
         search_depth,
+        DepthIndex,
+        TextIndex,
         calculate_rockhead,
+        rockhead_sweep,
+        detect_corestones,
         calculate_q_value,
+        calculate_q_values_bulk,
+        interpret_q_value,
         weth_grade_to_numeric,
         rock_material_criteria,
         is_file_like
@@ -34,10 +43,10 @@ try:
 except ImportError as e:
     print(f"Warning: Could not import from legacy ags_core: {e}")
     # Fallback to local implementations
-    from .processor import AGS4_to_dict, AGS4_to_dataframe, is_file_like
-    from .search import search_keyword, match_soil_types, search_depth
+    from .processor import AGS4_to_dict, AGS4_to_dataframe, iter_groups, index_groups, split_ags_line, is_file_like
+    from .search import search_keyword, match_soil_types, search_depth, DepthIndex, TextIndex
     from .combiners import concat_ags_files, combine_ags_data
-    from .calculations import calculate_rockhead, calculate_q_value, weth_grade_to_numeric, rock_material_criteria
+    from .calculations import calculate_rockhead, rockhead_sweep, detect_corestones, calculate_q_value, calculate_q_values_bulk, interpret_q_value, weth_grade_to_numeric, rock_material_criteria
 
 # Import from legacy ags_3_reader module
 try:
@@ -52,6 +61,7 @@ from .processor import AGSProcessor
 # Import other modules
 from .validator import AGSValidator
 from .exporter import AGSExporter
+from .cache import ParseCache
 from .calculations import GeotechnicalCalculations
 
 # Import comprehensive modules
@@ -67,13 +77,22 @@ __all__ = [
     # Legacy functions from ags_core
     "AGS4_to_dict",
     "AGS4_to_dataframe",
+    "iter_groups",
+    "index_groups",
+    "split_ags_line",
     "concat_ags_files",
     "combine_ags_data",
     "search_keyword",
     "match_soil_types",
     "search_depth",
+    "DepthIndex",
+    "TextIndex",
     "calculate_rockhead",
+    "rockhead_sweep",
+    "detect_corestones",
     "calculate_q_value",
+    "calculate_q_values_bulk",
+    "interpret_q_value",
     "weth_grade_to_numeric",
     "rock_material_criteria",
     "is_file_like",
@@ -83,6 +102,7 @@ __all__ = [
     # Other classes
     "AGSValidator", 
     "AGSExporter", 
+    "ParseCache",
     "GeotechnicalCalculations",
     # Modules
     "processor",
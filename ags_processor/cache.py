@@ -0,0 +1,203 @@
+"""
+On-disk parse cache for AGS files.
+
+Parsed groups are stored as Parquet, one directory per entry, keyed by a
+hash of the file bytes, the parser version and the parse options. An
+unchanged file is therefore reloaded without being parsed again, whatever
+its name or location.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Default upper bound for the total size of a cache directory
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+MANIFEST = "manifest.json"
+
+
+class ParseCache:
+    """
+    Content-addressed cache of parsed AGS files.
+
+    Each entry holds one file's groups (as ``<n>.parquet``) together with
+    its AGS version, warnings and per-group UNIT/TYPE attrs. When the
+    directory grows past ``max_bytes`` the least recently used entries are
+    evicted.
+    """
+
+    def __init__(self, cache_dir, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        cache_dir : str or Path
+            Directory holding the cache entries (created if missing)
+        max_bytes : int, optional
+            Size limit for the whole cache directory
+        """
+        if pyarrow is None:
+            raise ImportError("pyarrow is required for the parse cache (pip install pyarrow)")
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries = self._scan()
+
+    def _scan(self) -> Dict[str, List[float]]:
+        """Return {key: [size in bytes, last use]} for the entries on disk."""
+        entries = {}
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir() or bucket.name.startswith('.'):
+                continue
+            for entry in os.scandir(bucket.path):
+                manifest = os.path.join(entry.path, MANIFEST)
+                if entry.is_dir() and not entry.name.startswith('.') and os.path.exists(manifest):
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    entries[entry.name] = [size, os.path.getmtime(manifest)]
+        return entries
+
+    @staticmethod
+    def make_key(file_bytes, parser_version: str, **options) -> str:
+        """
+        Hash file contents together with everything that shapes the parse.
+
+        Parameters
+        ----------
+        file_bytes : bytes-like
+            Raw contents of the AGS file
+        parser_version : str
+            Version of the parser that produced (or will produce) the entry
+        **options
+            Parse options such as skip_mismatched_rows or selected groups
+
+        Returns
+        -------
+        str
+            Hex digest used as the entry key
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps([parser_version, sorted(options.items())], default=str).encode('utf-8'))
+        digest.update(file_bytes)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, pd.DataFrame], List[str]]]:
+        """
+        Load a cached parse.
+
+        Returns
+        -------
+        tuple or None
+            (ags_version, groups dict, warnings list), or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path / MANIFEST, encoding='utf-8') as f:
+                manifest = json.load(f)
+            groups = {}
+            for index, group in enumerate(manifest['groups']):
+                df = pd.read_parquet(path / f"{index}.parquet")
+                df.attrs.update(group['attrs'])
+                groups[group['name']] = df
+        except (OSError, ValueError, KeyError) as e:
+            if path.exists():
+                logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+                self._remove(key)
+            return None
+
+        now = time.time()
+        os.utime(path / MANIFEST, (now, now))
+        self._entries.setdefault(key, [self._size(path), now])[1] = now
+        return manifest['ags_version'], groups, manifest['warnings']
+
+    def put(self, key: str, ags_version: str, groups: Dict[str, pd.DataFrame], warnings: List[str]) -> bool:
+        """
+        Store a parse, then evict least recently used entries over the size limit.
+
+        The entry is written to a temporary directory and renamed into place,
+        so readers never see a partial entry. Groups that Parquet cannot hold
+        (e.g. mixed-type object columns) leave the file uncached.
+
+        Returns
+        -------
+        bool
+            True if the entry was stored
+        """
+        path = self._path(key)
+        if path.exists():
+            return True
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix='.tmp-', dir=path.parent))
+        try:
+            manifest = {'ags_version': ags_version, 'warnings': list(warnings), 'groups': []}
+            for index, (name, df) in enumerate(groups.items()):
+                table = df.copy(deep=False)
+                table.attrs = {}
+                table.to_parquet(staging / f"{index}.parquet", engine='pyarrow')
+                manifest['groups'].append({'name': name, 'attrs': df.attrs})
+            with open(staging / MANIFEST, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, default=str)
+            os.replace(staging, path)
+        except Exception as e:
+            logger.warning(f"Could not cache parse {key}: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+
+        self._entries[key] = [self._size(path), time.time()]
+        self._evict(keep=key)
+        return True
+
+    def clear(self):
+        """Remove every cache entry."""
+        for key in list(self._entries):
+            self._remove(key)
+
+    def size(self) -> int:
+        """Total size of the cached entries in bytes."""
+        return int(sum(size for size, _ in self._entries.values()))
+
+    def _evict(self, keep: str):
+        total = self.size()
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._remove(key)
+            total -= size
+
+    def _remove(self, key: str):
+        shutil.rmtree(self._path(key), ignore_errors=True)
+        self._entries.pop(key, None)
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        return sum(f.stat().st_size for f in os.scandir(path))
+
+    def __contains__(self, key: str) -> bool:
+        return (self._path(key) / MANIFEST).exists()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = ['ParseCache', 'DEFAULT_CACHE_MAX_BYTES']
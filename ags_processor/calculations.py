@@ -19,7 +19,11 @@ try:
         weth_grade_to_numeric,
         rock_material_criteria,
         calculate_rockhead,
-        calculate_q_value
+        rockhead_sweep,
+        detect_corestones,
+        calculate_q_value,
+        calculate_q_values_bulk,
+        interpret_q_value
     )
 except ImportError as e:
     print(f"Warning: Could not import from legacy ags_core: {e}")
@@ -30,8 +34,16 @@ except ImportError as e:
         raise NotImplementedError("Legacy ags_core module not found")
     def calculate_rockhead(*args, **kwargs):
         raise NotImplementedError("Legacy ags_core module not found")
+    def rockhead_sweep(*args, **kwargs):
+        raise NotImplementedError("Legacy ags_core module not found")
+    def detect_corestones(*args, **kwargs):
+        raise NotImplementedError("Legacy ags_core module not found")
     def calculate_q_value(*args, **kwargs):
         raise NotImplementedError("Legacy ags_core module not found")
+    def calculate_q_values_bulk(*args, **kwargs):
+        raise NotImplementedError("Legacy ags_core module not found")
+    def interpret_q_value(*args, **kwargs):
+        raise NotImplementedError("Legacy ags_core module not found")
 
 # Wrapper class for backwards compatibility
 class GeotechnicalCalculations:
@@ -51,6 +63,10 @@ class GeotechnicalCalculations:
         """Calculate rockhead depth."""
         return calculate_rockhead(*args, **kwargs)
     
+    def rockhead_sweep(self, *args, **kwargs):
+        """Rockhead depths over a grid of rockhead parameters."""
+        return rockhead_sweep(*args, **kwargs)
+    
     def calculate_q_value(self, *args, **kwargs):
         """Calculate Q-value."""
         return calculate_q_value(*args, **kwargs)
@@ -59,6 +75,10 @@ class GeotechnicalCalculations:
         """Calculate Q-values for bulk data (alias for calculate_q_value)."""
         return calculate_q_value(*args, **kwargs)
     
+    def calculate_q_values_bulk(self, *args, **kwargs):
+        """Calculate Q-values row by row from per-row joint parameter columns."""
+        return calculate_q_values_bulk(*args, **kwargs)
+    
     # Additional helper methods
     def detect_rockhead(self, df, **kwargs):
         """Simple wrapper for calculate_rockhead."""
@@ -68,35 +88,21 @@ class GeotechnicalCalculations:
         return result
     
     def detect_corestones(self, df, min_thickness=0.5, **kwargs):
-        """Detect corestones (placeholder - implement if needed)."""
-        # This was not in legacy, so return empty for now
-        return {}
+        """Detect corestones as a DataFrame with a THICKNESS column."""
+        return detect_corestones(df, min_thickness=min_thickness, **kwargs)
     
     def interpret_q_value(self, q_value):
-        """Interpret Q-value to rock quality category."""
-        if q_value < 0.01:
-            return "Exceptionally Poor"
-        elif q_value < 0.1:
-            return "Extremely Poor"
-        elif q_value < 1:
-            return "Very Poor"
-        elif q_value < 4:
-            return "Poor"
-        elif q_value < 10:
-            return "Fair"
-        elif q_value < 40:
-            return "Good"
-        elif q_value < 100:
-            return "Very Good"
-        elif q_value < 400:
-            return "Extremely Good"
-        else:
-            return "Exceptionally Good"
+        """Interpret Q-value(s) to rock quality category."""
+        return interpret_q_value(q_value)
 
 __all__ = [
     'weth_grade_to_numeric',
     'rock_material_criteria',
     'calculate_rockhead',
+    'rockhead_sweep',
+    'detect_corestones',
     'calculate_q_value',
+    'calculate_q_values_bulk',
+    'interpret_q_value',
     'GeotechnicalCalculations'
 ]
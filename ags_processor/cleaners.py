@@ -20,6 +20,7 @@ try:
         drop_singleton_rows,
         deduplicate_cell,
         expand_rows,
+        clean_group,
         combine_groups,
         coalesce_columns,
         to_numeric_safe
@@ -35,6 +36,8 @@ except ImportError as e:
         raise NotImplementedError("Legacy cleaners module not found")
     def expand_rows(*args, **kwargs):
         raise NotImplementedError("Legacy cleaners module not found")
+    def clean_group(*args, **kwargs):
+        raise NotImplementedError("Legacy cleaners module not found")
     def combine_groups(*args, **kwargs):
         raise NotImplementedError("Legacy cleaners module not found")
     def coalesce_columns(*args, **kwargs):
@@ -47,6 +50,7 @@ __all__ = [
     'drop_singleton_rows',
     'deduplicate_cell',
     'expand_rows',
+    'clean_group',
     'combine_groups',
     'coalesce_columns',
     'to_numeric_safe'
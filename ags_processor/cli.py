@@ -1,6 +1,7 @@
 """Command-line interface for AGS Processor."""
 
 import argparse
+import importlib.util
 import os
 import sys
 from typing import List
@@ -23,6 +24,15 @@ Examples:
   # Process multiple AGS files
   ags-processor file1.ags file2.ags file3.ags -o consolidated.xlsx
   
+  # Parse a large batch on 8 worker processes
+  ags-processor data/*.ags -o consolidated.xlsx --jobs 8
+  
+  # Reuse parsed results for files that have not changed since the last run
+  ags-processor data/*.ags -o consolidated.xlsx --cache-dir .ags-cache
+  
+  # Export partitioned Parquet datasets (one directory per group)
+  ags-processor data/*.ags -o datasets/ -f parquet
+  
   # Validate an AGS file
   ags-processor input.ags --validate-only
   
@@ -39,13 +49,13 @@ Examples:
     
     parser.add_argument(
         '-o', '--output',
-        help='Output file path (Excel) or directory (CSV)',
+        help='Output file path (Excel) or directory (CSV, Parquet)',
         default=None
     )
     
     parser.add_argument(
         '-f', '--format',
-        choices=['excel', 'csv'],
+        choices=['excel', 'csv', 'parquet'],
         default='excel',
         help='Output format (default: excel)'
     )
@@ -63,6 +73,21 @@ Examples:
         help='Skip invalid files (default: True)'
     )
     
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Parse files in N worker processes (0 = one per CPU, default: 1)'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        metavar='DIR',
+        help='Cache parsed files in DIR (Parquet, keyed by file contents) and reuse them on later runs'
+    )
+    
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -83,8 +108,16 @@ Examples:
             print(f"Error: File not found: {filepath}", file=sys.stderr)
             sys.exit(1)
             
+    if args.output and args.format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        print("Error: -f parquet needs pyarrow (pip install ags-processor-st[parquet])", file=sys.stderr)
+        sys.exit(1)
+            
     # Initialize processor and validator
-    processor = AGSProcessor()
+    try:
+        processor = AGSProcessor(cache_dir=args.cache_dir)
+    except ImportError:
+        print("Error: --cache-dir needs pyarrow (pip install ags-processor-st[parquet])", file=sys.stderr)
+        sys.exit(1)
     validator = AGSValidator()
     exporter = AGSExporter()
     
@@ -102,7 +135,7 @@ Examples:
         sys.exit(0)
         
     # Process files
-    file_data = processor.read_multiple_files(args.files, skip_invalid=args.skip_invalid)
+    file_data = processor.read_multiple_files(args.files, skip_invalid=args.skip_invalid, workers=args.jobs)
     
     if args.verbose:
         print(f"Successfully loaded {len(file_data)} file(s)")
@@ -132,16 +165,20 @@ Examples:
         if args.verbose:
             print(f"\nExporting to {args.output}...")
             
-        tables = processor.get_all_tables()
-        
         if args.format == 'excel':
             success = exporter.export_to_excel(
-                tables, 
+                processor.get_all_tables(), 
                 args.output,
                 include_summary=not args.no_summary
             )
+        elif args.format == 'parquet':
+            # Partitioned by source file so each file can be read back on its own
+            success = exporter.export_to_parquet(
+                processor.get_all_tables(include_source=True),
+                args.output
+            )
         else:  # csv
-            success = exporter.export_to_csv(tables, args.output)
+            success = exporter.export_to_csv(processor.get_all_tables(), args.output)
             
         if success:
             if args.verbose:
@@ -1,8 +1,29 @@
 """AGS data exporter to various formats."""
 
+import json
 import os
-from typing import Dict, List, Optional
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
 import pandas as pd
+import xlsxwriter
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Columns written to Parquet as partition directories, when present
+PARQUET_PARTITION_COLUMNS = ['GIU_NO', 'SOURCE_FILE']
+
+# Rows per Excel worksheet (including the header row); longer tables roll
+# over to GROUP_2, GROUP_3, ... sheets
+EXCEL_MAX_ROWS = 1048576
+# Rows converted from the column arrays at a time while streaming a sheet
+EXCEL_BLOCK_ROWS = 10000
+# Characters Excel does not allow in sheet names
+_EXCEL_SHEET_NAME_RE = re.compile(r'[\[\]:*?/\\]')
 
 
 class AGSExporter:
@@ -12,6 +33,7 @@ class AGSExporter:
     Supports:
     - Excel export (single or multi-sheet)
     - CSV export
+    - Parquet datasets (partitioned, typed)
     - Consolidated data from multiple AGS files
     """
     
@@ -28,6 +50,11 @@ class AGSExporter:
         """
         Export tables to Excel file.
         
+        The workbook is streamed to disk with xlsxwriter's constant_memory
+        mode, so memory use stays flat however large the tables are. Tables
+        longer than Excel's 1,048,576-row limit continue on GROUP_2,
+        GROUP_3, ... sheets.
+        
         Args:
             tables: Dictionary mapping table names to DataFrames
             output_path: Path to output Excel file
@@ -41,32 +68,92 @@ class AGSExporter:
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
-                
-            # Create Excel writer
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                
-                # Add summary sheet if requested
-                if include_summary:
-                    summary_df = self._create_summary_sheet(tables)
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
-                
-                # Write each table to a separate sheet
-                for table_name, df in tables.items():
-                    # Excel sheet names have a 31 character limit
-                    sheet_name = table_name[:31] if len(table_name) > 31 else table_name
-                    
-                    try:
-                        df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    except Exception as e:
-                        self.export_errors.append(
-                            f"Failed to export table {table_name}: {str(e)}"
-                        )
-                        
+            
+            sheets = list(tables.items())
+            # Add summary sheet if requested
+            if include_summary:
+                sheets.insert(0, ('Summary', self._create_summary_sheet(tables)))
+            
+            self._write_excel_streaming(sheets, output_path)
             return True
             
         except Exception as e:
             self.export_errors.append(f"Export to Excel failed: {str(e)}")
             return False
+    
+    def _write_excel_streaming(self, sheets: Iterable[Tuple[str, pd.DataFrame]], output_path: str):
+        """
+        Write sheets with xlsxwriter in constant_memory mode.
+        
+        Rows are flushed to disk as soon as they are written, so memory use
+        does not grow with the workbook. Failures of a single table are
+        recorded in export_errors and the remaining tables still written.
+        """
+        workbook = xlsxwriter.Workbook(output_path, {
+            'constant_memory': True,
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+            'strings_to_numbers': False,
+            # Safety net: an unexpected inf/NaN becomes an error cell instead of aborting the sheet
+            'nan_inf_to_errors': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        })
+        try:
+            header_format = workbook.add_format({'bold': True, 'border': 1})
+            date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+            for table_name, df in sheets:
+                try:
+                    self._write_excel_table(workbook, table_name, df, header_format, date_format)
+                except Exception as e:
+                    self.export_errors.append(
+                        f"Failed to export table {table_name}: {str(e)}"
+                    )
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def _excel_sheet_name(table_name: str, part: int = 1) -> str:
+        """Valid sheet name for a table; part 2, 3, ... get a _2, _3 suffix."""
+        suffix = f"_{part}" if part > 1 else ""
+        # Excel sheet names have a 31 character limit
+        return _EXCEL_SHEET_NAME_RE.sub('_', str(table_name))[:31 - len(suffix)] + suffix
+    
+    def _write_excel_table(self, workbook, table_name: str, df: pd.DataFrame, header_format, date_format):
+        """Stream one table to as many worksheets as its row count needs."""
+        rows_per_sheet = EXCEL_MAX_ROWS - 1
+        header = [str(col) for col in df.columns]
+        date_columns = [i for i, dtype in enumerate(df.dtypes) if pd.api.types.is_datetime64_dtype(dtype)]
+        n_sheets = max(1, -(-len(df) // rows_per_sheet))
+        
+        for part in range(1, n_sheets + 1):
+            worksheet = workbook.add_worksheet(self._excel_sheet_name(table_name, part))
+            # Dates are written as serial numbers and shown through the column format
+            for i in date_columns:
+                worksheet.set_column(i, i, 19, date_format)
+            worksheet.write_row(0, 0, header, header_format)
+            
+            stop = min(len(df), part * rows_per_sheet)
+            row = 1
+            for start in range((part - 1) * rows_per_sheet, stop, EXCEL_BLOCK_ROWS):
+                block = df.iloc[start:min(stop, start + EXCEL_BLOCK_ROWS)]
+                columns = [self._excel_values(block.iloc[:, i]) for i in range(block.shape[1])]
+                for values in zip(*columns):
+                    worksheet.write_row(row, 0, values)
+                    row += 1
+    
+    @staticmethod
+    def _excel_values(column: pd.Series) -> list:
+        """
+        Cell values of a column slice; missing values become blank cells and
+        +/-inf, which Excel cannot store as a number, the text 'inf'/'-inf'.
+        """
+        if pd.api.types.is_datetime64_dtype(column.dtype):
+            column = (column - pd.Timestamp('1899-12-30')) / pd.Timedelta(days=1)
+        values = column.astype(object).where(column.notna(), None)
+        infinite = column.isin([float('inf'), float('-inf')])
+        if infinite.any():
+            values = values.where(~infinite, values[infinite].map(str))
+        return values.tolist()
             
     def export_to_csv(
         self, 
@@ -108,6 +195,88 @@ class AGSExporter:
             self.export_errors.append(f"Export to CSV failed: {str(e)}")
             return False
             
+    def export_to_parquet(
+        self,
+        tables: Dict[str, pd.DataFrame],
+        output_dir: str,
+        partition_cols: Optional[List[str]] = None
+    ) -> bool:
+        """
+        Export tables as Parquet datasets, one directory per group.
+        
+        Each group is written as a hive-partitioned dataset
+        (``GROUP/GIU_NO=.../SOURCE_FILE=.../*.parquet``) so readers can load
+        only the partitions and columns they need. Column dtypes are kept,
+        ID columns (TYPE ID, ``*_ID``, GIU_NO, SOURCE_FILE) are dictionary
+        encoded and the group's UNIT/TYPE rows are stored in the schema:
+        per field as 'unit'/'type' metadata and for the whole table under
+        the 'ags' key.
+        
+        Args:
+            tables: Dictionary mapping table names to DataFrames, e.g.
+                AGSProcessor.get_all_tables(include_source=True)
+            output_dir: Directory for the datasets
+            partition_cols: Partition columns; defaults to whichever of
+                GIU_NO and SOURCE_FILE a table has
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if pa is None:
+            self.export_errors.append("Export to Parquet failed: pyarrow is not installed")
+            return False
+        
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            
+            for table_name, df in tables.items():
+                try:
+                    self._write_parquet_group(
+                        df, os.path.join(output_dir, table_name.replace('?', '_')),
+                        PARQUET_PARTITION_COLUMNS if partition_cols is None else partition_cols
+                    )
+                except Exception as e:
+                    self.export_errors.append(
+                        f"Failed to export table {table_name} to Parquet: {str(e)}"
+                    )
+                    
+            return True
+            
+        except Exception as e:
+            self.export_errors.append(f"Export to Parquet failed: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _write_parquet_group(df: pd.DataFrame, group_dir: str, partition_cols: List[str]):
+        """Write one table as a Parquet dataset with AGS metadata in its schema."""
+        units = df.attrs.get('units', {})
+        types = df.attrs.get('types', {})
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        fields = []
+        for i, field in enumerate(table.schema):
+            name = field.name
+            is_id = types.get(name) == 'ID' or name.endswith('_ID') or name in PARQUET_PARTITION_COLUMNS
+            if is_id and not pa.types.is_dictionary(field.type):
+                table = table.set_column(i, name, table.column(i).dictionary_encode())
+                field = table.schema.field(i)
+            metadata = {key: value for key, value in (('unit', units.get(name)), ('type', types.get(name))) if value}
+            fields.append(field.with_metadata(metadata) if metadata else field)
+        
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[b'ags'] = json.dumps({'units': units, 'types': types}).encode('utf-8')
+        table = table.cast(pa.schema(fields, metadata=schema_metadata))
+        
+        partitions = [col for col in partition_cols if col in df.columns]
+        if partitions and len(df):
+            pq.write_to_dataset(
+                table, group_dir, partition_cols=partitions,
+                existing_data_behavior='delete_matching'
+            )
+        else:
+            os.makedirs(group_dir, exist_ok=True)
+            pq.write_table(table, os.path.join(group_dir, 'part-0.parquet'))
+            
     def export_consolidated(
         self,
         tables: Dict[str, pd.DataFrame],
@@ -120,7 +289,7 @@ class AGSExporter:
         Args:
             tables: Dictionary mapping table names to DataFrames
             output_path: Path to output file or directory
-            format: Export format ('excel' or 'csv')
+            format: Export format ('excel', 'csv' or 'parquet')
             
         Returns:
             True if successful, False otherwise
@@ -129,6 +298,8 @@ class AGSExporter:
             return self.export_to_excel(tables, output_path, include_summary=True)
         elif format.lower() == 'csv':
             return self.export_to_csv(tables, output_path)
+        elif format.lower() == 'parquet':
+            return self.export_to_parquet(tables, output_path)
         else:
             self.export_errors.append(f"Unsupported format: {format}")
             return False
@@ -286,23 +457,13 @@ class AGSExporter:
                     self.export_errors.append(f"Failed to process {file_path}: {str(e)}")
                     continue
             
-            # Write to Excel
+            # Write to Excel (sheet names are sanitized by the writer)
             if concat_df:
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                
-                with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                    for key in list(concat_df):
-                        try:
-                            # Sanitize sheet name (Excel limit: 31 chars, no special chars)
-                            new_key = key
-                            if '?' in key:
-                                new_key = new_key.replace('?', '_')
-                            sheet_name = new_key[:31] if len(new_key) > 31 else new_key
-                            
-                            concat_df[key].to_excel(writer, sheet_name=sheet_name, index=False)
-                        except ValueError as e:
-                            self.export_errors.append(f'Failed to export group {key}: {str(e)}')
+                output_dir = os.path.dirname(output_path)
+                if output_dir:
+                    os.makedirs(output_dir, exist_ok=True)
                 
+                self._write_excel_streaming(concat_df.items(), output_path)
                 return True
             else:
                 self.export_errors.append("No data to export")
@@ -2,20 +2,34 @@
 AGS File Processing Module
 
 Re-exports parsing functions from legacy files and provides AGSProcessor wrapper class.
-- AGS4_to_dict, AGS4_to_dataframe from legacy/AGS-Processor/ags_core.py
+- AGS4_to_dict, AGS4_to_dataframe, iter_groups, index_groups, split_ags_line from legacy/AGS-Processor/ags_core.py
 - parse_ags_file from legacy/ags3_all_data_to_excel/ags_3_reader.py
 """
 
+import mmap
+import os
 import sys
-import csv
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from io import StringIO
+from typing import Any, Dict, List, Optional, Tuple
+from io import BytesIO
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import logging
 
+from .cache import DEFAULT_CACHE_MAX_BYTES, ParseCache
+
 logger = logging.getLogger(__name__)
 
+# Number of leading bytes inspected to tell AGS3 from AGS4
+SNIFF_BYTES = 4096
+
+# Part of every parse cache key; bump whenever a parser change alters the
+# parsed tables or warnings so stale cache entries are no longer used
+PARSER_VERSION = "1"
+
 # Add legacy directories to path
 ags_processor_legacy = Path(__file__).parent.parent / "legacy" / "AGS-Processor"
 ags3_reader_legacy = Path(__file__).parent.parent / "legacy" / "ags3_all_data_to_excel"
@@ -27,13 +41,19 @@ if str(ags3_reader_legacy) not in sys.path:
 
 # Import from legacy files
 try:
-    from ags_core import AGS4_to_dict, AGS4_to_dataframe, is_file_like
+    from ags_core import AGS4_to_dict, AGS4_to_dataframe, iter_groups, index_groups, split_ags_line, is_file_like
 except ImportError as e:
     print(f"Warning: Could not import from legacy ags_core: {e}")
     def AGS4_to_dict(*args, **kwargs):
         raise NotImplementedError("Legacy ags_core module not found")
     def AGS4_to_dataframe(*args, **kwargs):
         raise NotImplementedError("Legacy ags_core module not found")
+    def iter_groups(*args, **kwargs):
+        raise NotImplementedError("Legacy ags_core module not found")
+    def index_groups(*args, **kwargs):
+        raise NotImplementedError("Legacy ags_core module not found")
+    def split_ags_line(*args, **kwargs):
+        raise NotImplementedError("Legacy ags_core module not found")
     def is_file_like(*args, **kwargs):
         return False
 
@@ -47,6 +67,144 @@ except ImportError as e:
         return None
 
 
+# ============================================================================
+# GROUP CONSOLIDATION
+# ============================================================================
+
+def _dtype_kind(dtype) -> Optional[str]:
+    """Coarse dtype family used to decide whether two chunks' columns can share a dtype."""
+    if dtype is None:
+        return None
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'category'
+    if isinstance(dtype, pd.StringDtype):
+        return 'string'
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return 'datetime'
+    return 'object'
+
+
+def _merge_dtypes(current, new):
+    """
+    Resolve the dtype of a column seen with ``current`` and then ``new``.
+    
+    Numeric columns stay numeric (int + float -> float64), categoricals stay
+    categorical (categories are unioned at build time) and only genuinely
+    different families fall back to object. ``None`` marks a column seen in
+    empty chunks only.
+    """
+    if current is None:
+        return new
+    if new is None:
+        return current
+    kind = _dtype_kind(current)
+    if kind != _dtype_kind(new):
+        return np.dtype(object)
+    if kind == 'numeric':
+        try:
+            return np.result_type(current, new)
+        except TypeError:
+            return np.dtype(object)
+    if kind == 'category':
+        return current if current == new else pd.CategoricalDtype()
+    if kind == 'datetime' and current != new:
+        return np.dtype('datetime64[ns]')
+    return current
+
+
+def _nullable_dtype(dtype):
+    """dtype able to hold the missing values of rows from files without the column."""
+    if dtype is None:
+        return np.dtype(object)
+    if _dtype_kind(dtype) == 'numeric' and pd.api.types.is_integer_dtype(dtype):
+        return np.dtype('float64')
+    if _dtype_kind(dtype) == 'bool':
+        return np.dtype(object)
+    return dtype
+
+
+def _build_group(chunks: List[pd.DataFrame], schema: Dict) -> pd.DataFrame:
+    """
+    Build one consolidated table from its per-file chunks in a single pass.
+    
+    Every column is preallocated at the total length in its resolved schema
+    dtype and each chunk is copied into its slice once; rows from files
+    without the column are left missing.
+    """
+    lengths = [len(chunk) for chunk in chunks]
+    total = sum(lengths)
+    bounds = np.cumsum([0] + lengths)
+    columns = {}
+    
+    for col, dtype in schema.items():
+        kind = _dtype_kind(dtype)
+        if kind == 'category':
+            parts = [
+                chunk[col].array if col in chunk.columns
+                else pd.Categorical.from_codes(np.full(len(chunk), -1), dtype=pd.CategoricalDtype(pd.Index([], dtype=object)))
+                for chunk in chunks if len(chunk)
+            ]
+            try:
+                columns[col] = pd.Series(union_categoricals(parts) if parts else pd.Categorical([]), copy=False)
+                continue
+            except TypeError:
+                kind, dtype = 'object', np.dtype(object)
+        
+        if kind in ('numeric', 'datetime', 'bool'):
+            values = np.empty(total, dtype=dtype)
+            missing = np.datetime64('NaT') if kind == 'datetime' else np.nan
+        else:
+            values = np.empty(total, dtype=object)
+            missing = pd.NA if kind == 'string' else np.nan
+        
+        for chunk, start, stop in zip(chunks, bounds[:-1], bounds[1:]):
+            if start == stop:
+                continue
+            if col in chunk.columns:
+                values[start:stop] = chunk[col].to_numpy(dtype=values.dtype)
+            else:
+                values[start:stop] = missing
+        
+        columns[col] = pd.Series(pd.array(values, dtype=dtype) if kind == 'string' else values, copy=False)
+    
+    table = pd.DataFrame(columns)
+    table.index = pd.RangeIndex(total)
+    for key in ('units', 'types'):
+        merged = {}
+        for chunk in chunks:
+            for col, value in chunk.attrs.get(key, {}).items():
+                merged.setdefault(col, value)
+        if merged:
+            table.attrs[key] = merged
+    return table
+
+
+def _source_labels(parts: List[Tuple[Any, int]]) -> pd.Categorical:
+    """
+    Source file of every row of a table built from consecutive parts.
+    
+    Each part is (source, rows), where source is a file name, None for rows
+    of unknown origin, or the labels of a previously built table.
+    """
+    names = {}
+    codes = []
+    for source, rows in parts:
+        if isinstance(source, pd.Categorical):
+            remap = np.array([names.setdefault(name, len(names)) for name in source.categories] + [-1])
+            codes.append(remap[source.codes])
+        else:
+            code = -1 if source is None else names.setdefault(source, len(names))
+            codes.append(np.full(rows, code))
+    return pd.Categorical.from_codes(
+        np.concatenate(codes) if codes else np.array([], dtype=int),
+        categories=pd.Index(list(names), dtype=object)
+    )
+
+
 # ============================================================================
 # AGS PROCESSOR CLASS - Thin wrapper using legacy functions directly
 # ============================================================================
@@ -61,8 +219,20 @@ class AGSProcessor:
     - AGS4_to_dataframe() from ags_core.py for AGS4 files
     """
     
-    def __init__(self):
-        """Initialize the AGS processor."""
+    def __init__(self, cache_dir=None, cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Initialize the AGS processor.
+        
+        Parameters
+        ----------
+        cache_dir : str or Path, optional
+            Directory for the on-disk parse cache. Files whose bytes were
+            parsed before (with the same parser version and options) are
+            reloaded from Parquet instead of being parsed again.
+        cache_max_bytes : int, optional
+            Size limit of the cache; least recently used entries are evicted
+        """
+        self.cache = ParseCache(cache_dir, cache_max_bytes) if cache_dir is not None else None
         self.tables = {}
         self.file_data = {}
         self.errors = {}
@@ -76,8 +246,115 @@ class AGSProcessor:
         self.file_data = {}
         self.errors = {}
         self.processed_files = []
+    
+    @property
+    def tables(self) -> Dict[str, pd.DataFrame]:
+        """
+        Consolidated group tables.
+        
+        Files only register their groups as pending chunks; each group is
+        built once, on first access, from all chunks received since. Groups
+        added, replaced or deleted through the returned dict are picked up
+        by the schema registry on the next access.
+        """
+        self._sync_tables()
+        for group_name in list(self._pending):
+            self._consolidate(group_name)
+        if list(self._tables) != list(self._schemas):
+            # Reorder in place so references to the dict stay live
+            ordered = [(name, self._tables[name]) for name in self._schemas if name in self._tables]
+            self._tables.clear()
+            self._tables.update(ordered)
+        return self._tables
+    
+    @tables.setter
+    def tables(self, tables: Dict[str, pd.DataFrame]):
+        self._tables = {}
+        self._pending = {}
+        self._schemas = {}
+        self._built = {}
+        for group_name, df in tables.items():
+            self._register_chunk(group_name, df)
+            self._tables[group_name] = df
+            self._built[group_name] = (df, _source_labels([(None, len(df))]))
+    
+    def _sync_tables(self):
+        """
+        Reconcile the schema registry with direct edits to the tables dict.
+        
+        A group whose table is no longer the one the processor built (added,
+        replaced, deleted or resized by the caller) gets its schema rebuilt
+        from the caller's table plus any chunks still pending for it; the
+        caller's rows have no known source file.
+        """
+        for group_name in list(self._built) + [name for name in self._tables if name not in self._built]:
+            df = self._tables.get(group_name)
+            built, labels = self._built.get(group_name, (None, None))
+            if df is built and len(df) == len(labels):
+                continue
+            pending = self._pending.get(group_name, [])
+            self._built.pop(group_name, None)
+            if df is None and not pending:
+                self._schemas.pop(group_name, None)
+                continue
+            # Reset in place so the group keeps its position
+            self._schemas[group_name] = {'dtypes': {}, 'rows': 0, 'filled': {}}
+            if df is not None:
+                self._register_chunk(group_name, df)
+                self._built[group_name] = (df, _source_labels([(None, len(df))]))
+            for chunk, _ in pending:
+                self._register_chunk(group_name, chunk)
+    
+    def _register_chunk(self, group_name: str, df: pd.DataFrame):
+        """Add one file's table for a group to the schema registry."""
+        schema = self._schemas.setdefault(group_name, {'dtypes': {}, 'rows': 0, 'filled': {}})
+        dtypes = schema['dtypes']
+        for col in df.columns:
+            dtype = df[col].dtype if len(df) else None
+            dtypes[col] = _merge_dtypes(dtypes.get(col), dtype)
+            schema['filled'][col] = schema['filled'].get(col, 0) + len(df)
+        schema['rows'] += len(df)
+    
+    def get_schema(self, group_name: str) -> Optional[Dict]:
+        """
+        Get the consolidated schema of a group without building it.
+        
+        Parameters
+        ----------
+        group_name : str
+            Name of the AGS group (e.g., 'LOCA', 'GEOL')
+            
+        Returns
+        -------
+        dict or None
+            Column -> resolved dtype, over the union of the headings of all
+            files read so far, or None if the group has not been seen
+        """
+        self._sync_tables()
+        schema = self._schemas.get(group_name)
+        if schema is None:
+            return None
+        return {
+            col: dtype if schema['filled'][col] == schema['rows'] else _nullable_dtype(dtype)
+            for col, dtype in schema['dtypes'].items()
+        }
+    
+    def _consolidate(self, group_name: str):
+        """Build a group from its pending chunks (and any table built before)."""
+        pending = self._pending.pop(group_name)
+        chunks = [chunk for chunk, _ in pending]
+        sources = [(source, len(chunk)) for chunk, source in pending]
+        if group_name in self._tables:
+            chunks.insert(0, self._tables[group_name])
+            sources.insert(0, (self._built[group_name][1], len(chunks[0])))
+        if len(chunks) == 1:
+            self._tables[group_name] = chunks[0].copy()
+        else:
+            self._tables[group_name] = _build_group(chunks, self.get_schema(group_name))
+        self._built[group_name] = (self._tables[group_name], _source_labels(sources))
         
-    def read_file(self, filepath, prefix_hole_id: bool = False, skip_mismatched_rows: bool = None) -> Dict[str, pd.DataFrame]:
+    def read_file(self, filepath, prefix_hole_id: bool = False, skip_mismatched_rows: bool = None,
+                  groups: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
         """
         Read a single AGS file using legacy parsers with enhanced validation.
         
@@ -89,6 +366,10 @@ class AGSProcessor:
             Whether to prefix HOLE_ID with first 5 chars of filename
         skip_mismatched_rows : bool, optional
             If True, skip rows with mismatched column counts (default: True)
+        groups : list, optional
+            Only load these groups (e.g. ['HOLE', 'LOCA', 'GEOL']). Other
+            GROUP blocks are located by a byte-offset pre-scan and never
+            tokenized; on-disk files are memory-mapped for the scan.
             
         Returns
         -------
@@ -98,76 +379,142 @@ class AGSProcessor:
         if skip_mismatched_rows is not None:
             self.skip_mismatched_rows = skip_mismatched_rows
         try:
-            filename = Path(filepath).name if hasattr(filepath, '__fspath__') or isinstance(filepath, str) else 'uploaded_file'
-            file_warnings = []
+            filename = self._source_name(filepath)
+            ags_version, groups, file_warnings = self._parse_source(filepath, groups)
+            return self._store_parsed(filename, ags_version, groups, file_warnings)
+            
+        except Exception as e:
+            self._store_failure(filepath, e)
+            return {}
+    
+    @staticmethod
+    def _source_name(filepath) -> str:
+        """Name under which a file's data and warnings are stored."""
+        return Path(filepath).name if hasattr(filepath, '__fspath__') or isinstance(filepath, str) else 'uploaded_file'
+    
+    def _parse_source(self, filepath, selected_groups=None):
+        """
+        Parse one AGS file without touching the processor state.
+        
+        Returns
+        -------
+        tuple
+            (ags_version, groups dict, warnings list)
+        """
+        filename = self._source_name(filepath)
+        file_warnings = []
+        
+        # Read the file once; version detection and parsing share the bytes
+        with self._open_bytes(filepath, mapped=selected_groups is not None) as file_bytes:
+            cache_key = self._cache_key(file_bytes, selected_groups)
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
-            # Detect AGS version first
-            ags_version = self._detect_ags_version(filepath)
+            ags_version = self._sniff_ags_version(file_bytes[:SNIFF_BYTES])
             
             # Use appropriate parser based on version
             if ags_version == 'AGS3':
                 # Use parse_ags_file for AGS3
                 try:
-                    if isinstance(filepath, (str, Path)):
-                        with open(filepath, 'rb') as f:
-                            file_bytes = f.read()
-                    elif hasattr(filepath, 'read'):
-                        file_bytes = filepath.read()
-                        if isinstance(file_bytes, str):
-                            file_bytes = file_bytes.encode('utf-8')
-                    else:
-                        raise ValueError(f"Invalid filepath type: {type(filepath)}")
-                    
-                    groups, parse_warnings = self._parse_ags3_with_validation(file_bytes, filename)
+                    groups, parse_warnings = self._parse_ags3_with_validation(
+                        file_bytes, filename, groups=selected_groups
+                    )
                     file_warnings.extend(parse_warnings)
                 except Exception as e:
                     raise Exception(f"AGS3 parser failed: {e}")
             else:
                 # Use AGS4_to_dataframe for AGS4
                 try:
-                    groups, parse_warnings = self._parse_with_validation(filepath, filename)
+                    groups, parse_warnings = self._parse_with_validation(
+                        file_bytes, filename, groups=selected_groups
+                    )
                     file_warnings.extend(parse_warnings)
                 except Exception as e:
                     raise Exception(f"AGS4 parser failed: {e}")
-            
-            # Store warnings if any
-            if file_warnings:
-                if filename not in self.errors:
-                    self.errors[filename] = []
-                self.errors[filename].extend(file_warnings)
-            
-            # Store the data
-            self.file_data[filename] = groups
-            if filename not in self.processed_files:
-                self.processed_files.append(filename)
-            
-            # Merge into consolidated tables
-            for group_name, df in groups.items():
-                if group_name in self.tables:
-                    # Concatenate with existing data
-                    self.tables[group_name] = pd.concat(
-                        [self.tables[group_name], df],
-                        ignore_index=True
-                    )
-                else:
-                    self.tables[group_name] = df.copy()
-                    
-            # Store version info
-            if not hasattr(self, 'file_versions'):
-                self.file_versions = {}
-            self.file_versions[filename] = ags_version
-            
-            return groups
-            
-        except Exception as e:
-            filepath_str = str(filepath) if isinstance(filepath, (str, Path)) else 'file'
-            self.errors[filepath_str] = [str(e)]
-            logger.error(f"Error reading {filepath_str}: {e}")
-            return {}
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, ags_version, groups, file_warnings)
+        return ags_version, groups, file_warnings
     
-    def _detect_ags_version(self, filepath) -> str:
+    def _cache_key(self, file_bytes, selected_groups=None) -> Optional[str]:
+        """Parse cache key for a file's bytes, or None when caching is off."""
+        if self.cache is None:
+            return None
+        return ParseCache.make_key(
+            file_bytes, PARSER_VERSION,
+            skip_mismatched_rows=self.skip_mismatched_rows,
+            groups=sorted(selected_groups) if selected_groups is not None else None
+        )
+    
+    def _store_parsed(self, filename, ags_version, groups, file_warnings) -> Dict[str, pd.DataFrame]:
+        """Record one parsed file and merge its groups into the consolidated tables."""
+        # Store warnings if any
+        if file_warnings:
+            if filename not in self.errors:
+                self.errors[filename] = []
+            self.errors[filename].extend(file_warnings)
+        
+        # Store the data
+        self.file_data[filename] = groups
+        if filename not in self.processed_files:
+            self.processed_files.append(filename)
+        
+        # Queue for consolidation; groups are built when first accessed
+        for group_name, df in groups.items():
+            self._register_chunk(group_name, df)
+            self._pending.setdefault(group_name, []).append((df, filename))
+                
+        # Store version info
+        if not hasattr(self, 'file_versions'):
+            self.file_versions = {}
+        self.file_versions[filename] = ags_version
+        
+        return groups
+    
+    def _store_failure(self, filepath, error):
+        """Record a file that could not be parsed."""
+        filepath_str = str(filepath) if isinstance(filepath, (str, Path)) else 'file'
+        self.errors[filepath_str] = [str(error)]
+        logger.error(f"Error reading {filepath_str}: {error}")
+    
+    @staticmethod
+    def _read_bytes(filepath) -> bytes:
+        """Read the whole file (path or file-like) into bytes exactly once."""
+        if isinstance(filepath, (str, Path)):
+            with open(filepath, 'rb') as f:
+                return f.read()
+        if hasattr(filepath, 'read'):
+            if hasattr(filepath, 'seek'):
+                filepath.seek(0)
+            content = filepath.read()
+            if hasattr(filepath, 'seek'):
+                filepath.seek(0)
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+            return content
+        raise ValueError(f"Invalid filepath type: {type(filepath)}")
+    
+    @classmethod
+    @contextmanager
+    def _open_bytes(cls, filepath, mapped: bool = False):
         """
-        Detect whether file is AGS3 or AGS4 format.
+        Provide the file contents as a bytes-like object.
+        
+        With ``mapped=True`` on-disk files are memory-mapped instead of read,
+        so a selective parse only pages in the blocks it needs.
+        """
+        if mapped and isinstance(filepath, (str, Path)) and os.path.getsize(filepath) > 0:
+            with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+        else:
+            yield cls._read_bytes(filepath)
+    
+    @staticmethod
+    def _sniff_ags_version(prefix: bytes) -> str:
+        """
+        Detect whether file is AGS3 or AGS4 format from the start of the file.
         
         AGS3 uses:
         - **GROUP for group headers
@@ -179,6 +526,40 @@ class AGSProcessor:
         - "HEADING" keyword in first column
         - "UNIT" keyword in first column
         
+        Parameters
+        ----------
+        prefix : bytes
+            The first few KB of the file
+            
+        Returns
+        -------
+        str
+            'AGS3' or 'AGS4'
+        """
+        lines = prefix.decode('utf-8', errors='replace').split('\n')[:10]
+        
+        # Check for AGS3 markers
+        for line in lines:
+            line = line.strip()
+            if line.startswith('**'):
+                # **GROUP marker indicates AGS3
+                return 'AGS3'
+            if line.startswith('*') and not line.startswith('**'):
+                # *HEADING marker indicates AGS3
+                return 'AGS3'
+            if line.startswith('<UNITS>') or line.startswith('<UNIT>'):
+                # <UNITS> marker indicates AGS3
+                return 'AGS3'
+        
+        # If no AGS3 markers found, assume AGS4
+        return 'AGS4'
+    
+    def _detect_ags_version(self, filepath) -> str:
+        """
+        Detect whether file is AGS3 or AGS4 format.
+        
+        Only the first SNIFF_BYTES of the file are read; see _sniff_ags_version.
+        
         Parameters
         ----------
         filepath : str or file-like
@@ -190,108 +571,45 @@ class AGSProcessor:
             'AGS3' or 'AGS4'
         """
         try:
-            # Read first few lines to check format
             if isinstance(filepath, (str, Path)):
-                with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                    lines = [f.readline() for _ in range(10)]
+                with open(filepath, 'rb') as f:
+                    prefix = f.read(SNIFF_BYTES)
             elif hasattr(filepath, 'read'):
                 if hasattr(filepath, 'seek'):
                     filepath.seek(0)
-                content = filepath.read()
-                if isinstance(content, bytes):
-                    content = content.decode('utf-8', errors='replace')
+                prefix = filepath.read(SNIFF_BYTES)
+                if isinstance(prefix, str):
+                    prefix = prefix.encode('utf-8')
                 if hasattr(filepath, 'seek'):
                     filepath.seek(0)
-                lines = content.split('\n')[:10]
             else:
                 return 'AGS4'  # Default
-            
-            # Check for AGS3 markers
-            for line in lines:
-                line = line.strip()
-                if line.startswith('**'):
-                    # **GROUP marker indicates AGS3
-                    return 'AGS3'
-                if line.startswith('*') and not line.startswith('**'):
-                    # *HEADING marker indicates AGS3
-                    return 'AGS3'
-                if line.startswith('<UNITS>') or line.startswith('<UNIT>'):
-                    # <UNITS> marker indicates AGS3
-                    return 'AGS3'
-            
-            # If no AGS3 markers found, assume AGS4
-            return 'AGS4'
+            return self._sniff_ags_version(prefix)
             
         except Exception as e:
             logger.warning(f"Error detecting AGS version, defaulting to AGS4: {e}")
             return 'AGS4'
     
-    def _parse_with_validation(self, filepath, parser_name='AGS4_to_dataframe'):
+    def _parse_with_validation(self, file_bytes, filename=None, groups=None):
         """
-        Parse AGS file and validate row/heading consistency.
+        Parse AGS file and validate row/heading consistency in a single pass.
+        
+        With ``groups`` only those GROUP blocks are parsed.
         
         Returns
         -------
         tuple
             (groups dict, warnings list)
         """
-        import csv
-        from io import StringIO
-        
         warnings = []
         
-        # First, do a validation pass to detect mismatches
-        if isinstance(filepath, (str, Path)):
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
-        elif hasattr(filepath, 'read'):
-            if hasattr(filepath, 'seek'):
-                filepath.seek(0)
-            content = filepath.read()
-            if isinstance(content, bytes):
-                content = content.decode('utf-8', errors='replace')
-            if hasattr(filepath, 'seek'):
-                filepath.seek(0)
-        else:
-            content = str(filepath)
-        
-        # Parse and validate
-        reader = csv.reader(StringIO(content), delimiter=',', quotechar='"')
-        current_group = None
-        headings = []
-        line_num = 0
-        
-        for row in reader:
-            line_num += 1
-            if not row or len(row) == 0:
-                continue
-            
-            first = row[0]
-            
-            if first.startswith('**'):
-                current_group = first[2:]
-                headings = []
-            elif first.startswith('*'):
-                # Heading row
-                headings.extend([h[1:] for h in row])
-            elif first == '<CONT>':
-                # Continuation line
-                continue
-            elif current_group and headings:
-                # Data row - check length
-                if len(row) != len(headings):
-                    warning_msg = (
-                        f"WARNING: Line {line_num} in group {current_group}: "
-                        f"Row has {len(row)} items but {len(headings)} headings expected. "
-                        f"Row data: {row[:min(5, len(row))]}..."
-                    )
-                    if self.skip_mismatched_rows:
-                        warning_msg += " - SKIPPED"
-                    warnings.append(warning_msg)
-        
-        # Now call the actual parser
         try:
-            df_dict, headings_dict = AGS4_to_dataframe(filepath)
+            df_dict, headings_dict = AGS4_to_dataframe(
+                BytesIO(file_bytes) if groups is None else file_bytes,
+                warnings=warnings,
+                skip_mismatched_rows=self.skip_mismatched_rows,
+                groups=groups
+            )
         except Exception as e:
             # If parser fails, add error to warnings
             error_msg = str(e)
@@ -305,11 +623,12 @@ class AGSProcessor:
         
         return df_dict, warnings
     
-    def _parse_ags3_with_validation(self, file_bytes, filename):
+    def _parse_ags3_with_validation(self, file_bytes, filename=None, groups=None):
         """
         Parse AGS3 file with row padding and unit row skipping.
         
-        Skips <UNITS> rows and pads data rows to match heading count.
+        Skips <UNITS> rows and pads data rows to match heading count; the
+        row-length warnings are collected by the parser in the same pass.
         
         Returns
         -------
@@ -317,48 +636,11 @@ class AGSProcessor:
             (groups dict, warnings list)
         """
         warnings = []
-        text = file_bytes.decode("latin-1", errors="ignore")
-        lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-        
-        current_group = None
-        headings = []
-        groups = {}
-        line_num = 0
-        group_data = []
-        
-        import re
-        def _split_line(line: str):
-            parts = re.split(r',(?=(?:[^"]*"[^"]*")*[^"]*$)', line)
-            return [p.strip().strip('"') for p in parts]
-        
-        for line in lines:
-            line_num += 1
-            parts = _split_line(line)
-            first_field = parts[0]
-            
-            if first_field.startswith("**"):
-                current_group = first_field.strip("*?")
-                headings = []
-            elif first_field.startswith("*"):
-                new_headings = [h.lstrip("*?") for h in parts]
-                headings.extend(new_headings)
-            elif first_field == "<UNITS>" or first_field == "<CONT>":
-                continue
-            elif current_group and headings and parts:
-                # Data row - check length
-                if len(parts) != len(headings):
-                    warnings.append(
-                        f"WARNING: Line {line_num} in group {current_group}: "
-                        f"Row has {len(parts)} items but {len(headings)} headings expected. "
-                        f"Row data: {parts[:min(5, len(parts))]}..."
-                    )
-        
-        # Now call the actual parser
-        groups = parse_ags_file(file_bytes)
-        
-        return groups, warnings
+        parsed = parse_ags_file(file_bytes, warnings=warnings, groups=groups)
+        return parsed, warnings
             
-    def read_multiple_files(self, filepaths: List, skip_invalid: bool = True) -> Dict[str, Dict[str, pd.DataFrame]]:
+    def read_multiple_files(self, filepaths: List, skip_invalid: bool = True,
+                            workers: Optional[int] = None) -> Dict[str, Dict[str, pd.DataFrame]]:
         """
         Read multiple AGS files.
         
@@ -368,6 +650,10 @@ class AGSProcessor:
             List of file paths or file-like objects
         skip_invalid : bool, optional
             Whether to skip files that fail to parse
+        workers : int, optional
+            Parse the files in a pool of this many processes (0 = one per
+            CPU). Results are merged in input order, so tables, warnings and
+            errors are the same as for a sequential read.
             
         Returns
         -------
@@ -376,9 +662,22 @@ class AGSProcessor:
         """
         results = {}
         
-        for filepath in filepaths:
+        if workers is not None and workers != 1 and len(filepaths) > 1:
+            parsed = self._parse_in_pool(filepaths, workers)
+        else:
+            parsed = None
+        
+        for index, filepath in enumerate(filepaths):
             try:
-                groups = self.read_file(filepath)
+                if parsed is None:
+                    groups = self.read_file(filepath)
+                else:
+                    outcome = parsed[index]
+                    if isinstance(outcome, Exception):
+                        self._store_failure(filepath, outcome)
+                        groups = {}
+                    else:
+                        groups = self._store_parsed(self._source_name(filepath), *outcome)
                 if groups:
                     filename = Path(filepath).name if isinstance(filepath, (str, Path)) else 'uploaded_file'
                     results[filename] = groups
@@ -390,17 +689,75 @@ class AGSProcessor:
                 logger.warning(f"Skipped {filepath_str}: {e}")
                 
         return results
+    
+    def _parse_in_pool(self, filepaths: List, workers: int) -> List:
+        """
+        Parse files in worker processes.
         
-    def get_all_tables(self) -> Dict[str, pd.DataFrame]:
+        Returns one (ags_version, groups, warnings) tuple - or the raised
+        exception - per input, in input order. File-like objects are read
+        here and sent to the workers as bytes. The parse cache is consulted
+        and filled here, so only cache misses reach the pool.
+        """
+        parsed = [None] * len(filepaths)
+        pending = {}
+        for index, filepath in enumerate(filepaths):
+            source = filepath if isinstance(filepath, (str, Path)) else BytesIO(self._read_bytes(filepath))
+            cache_key = None
+            if self.cache is not None:
+                try:
+                    with self._open_bytes(source) as file_bytes:
+                        cache_key = self._cache_key(file_bytes)
+                except OSError as e:
+                    parsed[index] = e
+                    continue
+                parsed[index] = self.cache.get(cache_key)
+            if parsed[index] is None:
+                pending[index] = (source, cache_key)
+        
+        if pending:
+            max_workers = min(workers if workers > 0 else (os.cpu_count() or 1), len(pending))
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    index: pool.submit(_parse_source_in_worker, source, self.skip_mismatched_rows)
+                    for index, (source, _) in pending.items()
+                }
+                for index, future in futures.items():
+                    try:
+                        parsed[index] = future.result()
+                    except Exception as e:
+                        parsed[index] = e
+                        continue
+                    cache_key = pending[index][1]
+                    if cache_key is not None:
+                        self.cache.put(cache_key, *parsed[index])
+        return parsed
+        
+    def get_all_tables(self, include_source: bool = False) -> Dict[str, pd.DataFrame]:
         """
         Get all consolidated tables.
         
+        Parameters
+        ----------
+        include_source : bool, optional
+            Return copies with a leading categorical SOURCE_FILE column
+            naming the file each row was read from
+        
         Returns
         -------
         dict
             Dictionary of group name -> consolidated DataFrame
         """
-        return self.tables
+        tables = self.tables
+        if not include_source:
+            return tables
+        
+        with_source = {}
+        for group_name, df in tables.items():
+            df = df.copy(deep=False)
+            df.insert(0, 'SOURCE_FILE', self._built[group_name][1])
+            with_source[group_name] = df
+        return with_source
         
     def get_table(self, group_name: str) -> Optional[pd.DataFrame]:
         """
@@ -416,7 +773,10 @@ class AGSProcessor:
         DataFrame or None
             The requested table, or None if not found
         """
-        return self.tables.get(group_name)
+        self._sync_tables()
+        if group_name in self._pending:
+            self._consolidate(group_name)
+        return self._tables.get(group_name)
         
     def get_file_summary(self) -> Dict:
         """
@@ -427,7 +787,13 @@ class AGSProcessor:
         dict
             Summary information including total files, groups, records
         """
-        total_records = sum(len(df) for df in self.tables.values())
+        self._sync_tables()
+        if self._pending:
+            total_records = sum(schema['rows'] for schema in self._schemas.values())
+            group_names = list(self._schemas)
+        else:
+            total_records = sum(len(df) for df in self._tables.values())
+            group_names = list(self._tables)
         total_errors = sum(len(msgs) for msgs in self.errors.values())
         
         # Count files by version (basic detection)
@@ -438,12 +804,12 @@ class AGSProcessor:
         
         return {
             'total_files': len(self.processed_files),
-            'total_tables': len(self.tables),  # Use 'total_tables' instead of 'total_groups'
-            'total_groups': len(self.tables),  # Keep for backwards compatibility
+            'total_tables': len(group_names),  # Use 'total_tables' instead of 'total_groups'
+            'total_groups': len(group_names),  # Keep for backwards compatibility
             'total_records': total_records,
             'total_errors': total_errors,
             'files_by_version': files_by_version,
-            'group_names': list(self.tables.keys()),
+            'group_names': group_names,
             'files': self.processed_files
         }
         
@@ -467,13 +833,25 @@ class AGSProcessor:
         list
             List of group names
         """
-        return list(self.tables.keys())
+        self._sync_tables()
+        return list(self._schemas)
+
+
+def _parse_source_in_worker(filepath, skip_mismatched_rows):
+    """Process-pool entry point for AGSProcessor.read_multiple_files."""
+    processor = AGSProcessor()
+    processor.skip_mismatched_rows = skip_mismatched_rows
+    return processor._parse_source(filepath)
 
 
 __all__ = [
     'AGSProcessor',
+    'PARSER_VERSION',
     'AGS4_to_dict',
     'AGS4_to_dataframe',
+    'iter_groups',
+    'index_groups',
+    'split_ags_line',
     'parse_ags_file',
     'find_hole_id_column',
     'is_file_like'
@@ -18,7 +18,12 @@ try:
     from ags_core import (
         search_keyword,
         match_soil_types,
-        search_depth
+        search_depth,
+        DepthIndex,
+        TextIndex,
+        RULE_COLUMNS,
+        SOIL_TYPE_RULES,
+        GRAIN_SIZE_RULES
     )
 except ImportError as e:
     print(f"Warning: Could not import from legacy ags_core: {e}")
@@ -29,9 +34,21 @@ except ImportError as e:
         raise NotImplementedError("Legacy ags_core module not found")
     def search_depth(*args, **kwargs):
         raise NotImplementedError("Legacy ags_core module not found")
+    class DepthIndex:
+        def __init__(self, *args, **kwargs):
+            raise NotImplementedError("Legacy ags_core module not found")
+    class TextIndex:
+        def __init__(self, *args, **kwargs):
+            raise NotImplementedError("Legacy ags_core module not found")
+    RULE_COLUMNS = SOIL_TYPE_RULES = GRAIN_SIZE_RULES = None
 
 __all__ = [
     'search_keyword',
     'match_soil_types',
-    'search_depth'
+    'search_depth',
+    'DepthIndex',
+    'TextIndex',
+    'RULE_COLUMNS',
+    'SOIL_TYPE_RULES',
+    'GRAIN_SIZE_RULES'
 ]
@@ -2,6 +2,7 @@
 Triaxial Test Processing Module
 
 Re-exports functions directly from legacy/agsfileanalysis/triaxial.py
+(and the strength fitting from legacy/agsfileanalysis/charts.py)
 No duplication - uses original implementations.
 """
 
@@ -18,6 +19,7 @@ try:
     from triaxial import (
         generate_triaxial_table,
         generate_triaxial_with_lithology,
+        lookup_intervals,
         calculate_s_t_values,
         remove_duplicate_tests
     )
@@ -28,14 +30,32 @@ except ImportError as e:
         raise NotImplementedError("Legacy triaxial module not found")
     def generate_triaxial_with_lithology(*args, **kwargs):
         raise NotImplementedError("Legacy triaxial module not found")
+    def lookup_intervals(*args, **kwargs):
+        raise NotImplementedError("Legacy triaxial module not found")
     def calculate_s_t_values(*args, **kwargs):
         raise NotImplementedError("Legacy triaxial module not found")
     def remove_duplicate_tests(*args, **kwargs):
         raise NotImplementedError("Legacy triaxial module not found")
 
+# Strength fitting lives in legacy charts.py
+try:
+    from charts import (
+        fit_strength_params,
+        estimate_strength_params
+    )
+except ImportError as e:
+    print(f"Warning: Could not import from legacy charts: {e}")
+    def fit_strength_params(*args, **kwargs):
+        raise NotImplementedError("Legacy charts module not found")
+    def estimate_strength_params(*args, **kwargs):
+        raise NotImplementedError("Legacy charts module not found")
+
 __all__ = [
     'generate_triaxial_table',
     'generate_triaxial_with_lithology',
+    'lookup_intervals',
     'calculate_s_t_values',
-    'remove_duplicate_tests'
+    'remove_duplicate_tests',
+    'fit_strength_params',
+    'estimate_strength_params'
 ]
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Benchmark: AGS line tokenizer cost against field count
+
+Compares the shared linear-time tokenizer (split_ags_line) with the
+lookahead regex split it replaced, for AGS lines of increasing width.
+
+Usage (with the package installed, e.g. ``pip install -e .``):
+    python benchmarks/tokenizer_benchmark.py
+"""
+
+import re
+import timeit
+
+from ags_processor.processor import split_ags_line
+
+LOOKAHEAD_SPLIT = re.compile(r',(?=(?:[^"]*"[^"]*")*[^"]*$)')
+
+
+def regex_split(line):
+    """The previous tokenizer: lookahead regex split, quadratic in line length."""
+    return [p.strip().strip('"') for p in LOOKAHEAD_SPLIT.split(line)]
+
+
+def make_line(n_fields):
+    """Build a quoted AGS DATA line with n_fields fields, some with commas."""
+    fields = ['"DATA"'] + [
+        f'"Grey, slightly weathered GRANITE {i}"' if i % 3 == 0 else f'"{i}.25"'
+        for i in range(n_fields - 1)
+    ]
+    return ','.join(fields)
+
+
+def main():
+    print(f"{'fields':>8} {'regex (us/line)':>16} {'linear (us/line)':>17} {'speed-up':>9}")
+    for n_fields in (5, 10, 25, 50, 100, 250, 500):
+        line = make_line(n_fields)
+        assert split_ags_line(line) == regex_split(line)
+        number = max(20, 20000 // n_fields)
+        regex_us = timeit.timeit(lambda: regex_split(line), number=number) / number * 1e6
+        linear_us = timeit.timeit(lambda: split_ags_line(line), number=number) / number * 1e6
+        print(f"{n_fields:>8} {regex_us:>16.1f} {linear_us:>17.1f} {regex_us / linear_us:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -28,9 +28,9 @@ def main():
     processor = AGSProcessor()
     exporter = AGSExporter()
     
-    # Process all files
+    # Process all files (workers=0 parses them in one process per CPU)
     print("\nProcessing files...")
-    file_data = processor.read_multiple_files(ags_files, skip_invalid=True)
+    file_data = processor.read_multiple_files(ags_files, skip_invalid=True, workers=0)
     
     print(f"Successfully loaded {len(file_data)} file(s)")
     
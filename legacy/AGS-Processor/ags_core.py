@@ -8,7 +8,13 @@ These functions are called by the Streamlit interface.
 import pandas as pd
 import numpy as np
 import csv 
-from io import BytesIO, StringIO
+import functools
+import json
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from io import BufferedIOBase, BytesIO, RawIOBase, StringIO, TextIOWrapper
 
 # ============================================================================
 # AGS FILE PARSING FUNCTIONS
@@ -30,131 +36,663 @@ def is_file_like(obj):
     return True
 
 
-def AGS4_to_dict(filepath_or_buffer, encoding: str = 'utf-8'):
+def split_ags_line(line: str) -> list:
     """
-    Load all the data in an AGS file to dictionaries.
-    Preserves field order and includes empty fields (including trailing empties).
+    Split one AGS line into its fields in linear time.
+
+    Commas inside quoted fields are kept, doubled quotes ("") inside a
+    quoted field are unescaped and whitespace around each field is dropped.
+    This is the tokenizer shared by all AGS3/AGS4 line-based readers; it
+    replaces the lookahead regex split, which rescanned the rest of the line
+    at every comma and was quadratic in the number of fields.
+    """
+    fields = next(csv.reader((line,), skipinitialspace=True), None)
+    return [field.strip() for field in fields] if fields else [""]
 
-    Parameters
-    ----------
-    filepath_or_buffer : File path (str, pathlib.Path), or a file-like object.
-        Path to AGS4/AGS3 file or any object with a read() method.
+
+def _open_text(filepath_or_buffer, encoding):
+    """
+    Open a path or file-like object as a text stream for csv.reader.
+
+    Binary buffers (BytesIO, files opened in 'rb') are wrapped in a
+    TextIOWrapper so they are decoded incrementally instead of being read
+    into memory in one piece.
 
     Returns
     -------
-    data : dict[str, dict[str, list[str]]]
-        Python dictionary populated with data from the AGS file.
-    headings : dict[str, list[str]]
-        Dictionary with the headings in each GROUP.
+    tuple
+        (text stream, cleanup callable)
     """
-    close_file = False
-
-    # Handle file-like inputs vs paths
     if is_file_like(filepath_or_buffer) or hasattr(filepath_or_buffer, 'read'):
+        buffer = filepath_or_buffer
+        if hasattr(buffer, 'seek'):
+            buffer.seek(0)
+
+        if isinstance(buffer, (BufferedIOBase, RawIOBase)):
+            f = TextIOWrapper(buffer, encoding=encoding, errors="replace", newline="")
+
+            def cleanup():
+                f.detach()
+                buffer.seek(0)
+            return f, cleanup
+
         need_to_read = False
-        if isinstance(filepath_or_buffer, BytesIO):
+        if hasattr(buffer, 'mode') and 'b' in getattr(buffer, 'mode', ''):
             need_to_read = True
-        elif hasattr(filepath_or_buffer, 'mode') and 'b' in getattr(filepath_or_buffer, 'mode', ''):
-            need_to_read = True
-        elif not hasattr(filepath_or_buffer, 'mode'):
+        elif not hasattr(buffer, 'mode'):
             need_to_read = True
 
         if need_to_read:
-            if hasattr(filepath_or_buffer, 'seek'):
-                filepath_or_buffer.seek(0)
-            content = filepath_or_buffer.read()
+            content = buffer.read()
             if isinstance(content, bytes):
                 content = content.decode(encoding, errors="replace")
-            if hasattr(filepath_or_buffer, 'seek'):
-                filepath_or_buffer.seek(0)
-            f = StringIO(content)
-        else:
-            f = filepath_or_buffer
-    else:
-        f = open(filepath_or_buffer, "r", encoding=encoding, errors="replace")
-        close_file = True
+            if hasattr(buffer, 'seek'):
+                buffer.seek(0)
+            return StringIO(content), lambda: None
+        return buffer, lambda: None
+
+    f = open(filepath_or_buffer, "r", encoding=encoding, errors="replace", newline="")
+    return f, f.close
+
+
+def _iter_ags_blocks(filepath_or_buffer, encoding='utf-8', warnings=None, skip_mismatched_rows=False,
+                     first_line=1):
+    """
+    Parse an AGS3/AGS4 file block by block.
+
+    Yields ``(group, data, headings, metadata)`` as soon as each GROUP block
+    ends, so only one group is held in memory at a time. ``data`` maps each
+    heading to its list of string values and ``metadata`` holds the
+    'units'/'types' dicts from the UNIT/<UNITS> and TYPE rows.
+    See AGS4_to_dict for the meaning of ``warnings``/``skip_mismatched_rows``;
+    ``first_line`` is the file line number of the first line of the input.
+    """
+    f, cleanup = _open_text(filepath_or_buffer, encoding)
 
     try:
-        data: dict[str, dict[str, list[str]]] = {}
-        headings: dict[str, list[str]] = {}
+        data = None
+        headings: list[str] = []
+        meta = None
         group = None
         row = 0
+        is_ags4 = None
+
+        def _add_row(values, lineno):
+            if warnings is not None and headings and len(values) != len(headings):
+                message = (
+                    f"WARNING: Line {lineno} in group {group}: "
+                    f"Row has {len(values)} items but {len(headings)} headings expected. "
+                    f"Row data: {values[:min(5, len(values))]}..."
+                )
+                if skip_mismatched_rows:
+                    warnings.append(message + " - SKIPPED")
+                    return
+                warnings.append(message)
+                values = (values + [""] * len(headings))[:len(headings)]
+            for j in range(len(values)):
+                col = headings[j]
+                data[col].append(values[j])
+
+        def _set_headings(cleaned_headings, extend):
+            if not extend:
+                headings.clear()
+            headings.extend(cleaned_headings)
+
+            # Deduplicate headings by suffixing with _n
+            seen = {}
+            for idx, item in enumerate(headings):
+                seen[item] = seen.get(item, -1) + 1
+                if seen[item]:
+                    headings[idx] = f"{item}_{seen[item]}"
+
+            for h in headings:
+                data.setdefault(h, [])
 
         reader = csv.reader(f, delimiter=",", quotechar='"', skipinitialspace=False)
-        for lineno, temp in enumerate(reader, start=1):
+        for temp in reader:
+            lineno = reader.line_num + first_line - 1
             # Skip completely empty lines
             if temp is None or len(temp) == 0:
                 continue
 
             first = temp[0]
 
-            # GROUP line (AGS4: "**", AGS3: "**")
+            # Group breaks (blank line with one empty field)
+            if first == "" and len(temp) == 1:
+                continue
+
+            # The first non-empty row tells the dialect apart
+            if is_ags4 is None:
+                is_ags4 = first == "GROUP"
+
+            if is_ags4:
+                # AGS4 keyword rows
+                if first == "GROUP":
+                    if group is not None:
+                        yield group, data, headings, meta
+                    group = temp[1] if len(temp) > 1 else ""
+                    data, headings, meta = {}, [], {'units': {}, 'types': {}}
+                elif group is None:
+                    raise ValueError(f"Data before GROUP at line {lineno}")
+                elif first == "HEADING":
+                    _set_headings(list(temp[1:]), extend=False)
+                elif first == "UNIT":
+                    meta['units'] = dict(zip(headings, temp[1:]))
+                elif first == "TYPE":
+                    meta['types'] = dict(zip(headings, temp[1:]))
+                elif first == "DATA":
+                    _add_row(temp[1:], lineno)
+                continue
+
+            # GROUP line (AGS3: "**")
             if first.startswith("**"):
+                if group is not None:
+                    yield group, data, headings, meta
                 row = 0
                 group = first[2:]
-                data[group] = {}
+                data, headings, meta = {}, [], {'units': {}, 'types': {}}
 
             # HEADING line (starts with "*")
             elif first.startswith("*"):
                 if group is None:
                     raise ValueError(f"Heading before GROUP at line {lineno}")
                 row += 1
-                cleaned_headings = [item[1:] for item in temp]
-
-                if row == 1:
-                    headings[group] = cleaned_headings
-                else:
-                    headings[group].extend(cleaned_headings)
-
-                # Deduplicate headings by suffixing with _n
-                seen = {}
-                for idx, item in enumerate(headings[group]):
-                    seen[item] = seen.get(item, -1) + 1
-                    if seen[item]:
-                        headings[group][idx] = f"{item}_{seen[item]}"
-
-                for h in headings[group]:
-                    data[group].setdefault(h, [])
+                _set_headings([item[1:] for item in temp], extend=row > 1)
 
             # Continuation line
             elif first == "<CONT>":
                 if group is None:
                     raise ValueError(f"Continuation before GROUP at line {lineno}")
                 for j in range(1, len(temp)):
-                    if j >= len(headings[group]):
+                    if j >= len(headings):
                         raise ValueError(f"Continuation column index {j} exceeds headings for group {group} at line {lineno}")
-                    col = headings[group][j]
-                    if not data[group][col]:
+                    col = headings[j]
+                    if not data[col]:
                         raise ValueError(f"No previous row for continuation in column '{col}' at line {lineno}")
-                    data[group][col][-1] += temp[j]
+                    data[col][-1] += temp[j]
 
-            # Group breaks (blank line with one empty field)
-            elif first == "" and len(temp) == 1:
-                continue
+            # UNITS line
+            elif first in ("<UNITS>", "<UNIT>"):
+                if group is None:
+                    raise ValueError(f"Units before GROUP at line {lineno}")
+                meta['units'] = dict(zip(headings[1:], temp[1:]))
 
-            # DATA / UNITS lines
-                       # DATA / UNITS lines
+            # DATA lines
             else:
                 if group is None:
                     raise ValueError(f"Data before GROUP at line {lineno}")
-                for j in range(len(temp)):
-                    col = headings[group][j]
-                    data[group][col].append(temp[j])
+                _add_row(temp, lineno)
+
+        if group is not None:
+            yield group, data, headings, meta
     finally:
-        if close_file:
-            f.close()
+        cleanup()
+
+
+def AGS4_to_dict(filepath_or_buffer, encoding: str = 'utf-8', warnings=None, skip_mismatched_rows=False,
+                 metadata=None):
+    """
+    Load all the data in an AGS file to dictionaries.
+    Preserves field order and includes empty fields (including trailing empties).
+
+    Both dialects are understood: AGS3 ("**GROUP", "*HEADING", "<UNITS>",
+    "<CONT>") and AGS4 ("GROUP", "HEADING", "UNIT", "TYPE", "DATA" keyword rows).
+    UNIT/TYPE rows are kept out of the data and reported through ``metadata``.
+
+    Parameters
+    ----------
+    filepath_or_buffer : File path (str, pathlib.Path), or a file-like object.
+        Path to AGS4/AGS3 file or any object with a read() method.
+    warnings : list, optional
+        If given, rows whose length does not match the group headings are
+        reported here (with their line number) in the same pass instead of
+        raising, and are padded/truncated to the heading count.
+    skip_mismatched_rows : bool
+        Drop mismatched rows instead of padding them (only used together
+        with ``warnings``).
+    metadata : dict, optional
+        If given, filled with {group: {'units': {heading: unit},
+        'types': {heading: type}}} from the UNIT/<UNITS> and TYPE rows.
+
+    Returns
+    -------
+    data : dict[str, dict[str, list[str]]]
+        Python dictionary populated with data from the AGS file.
+    headings : dict[str, list[str]]
+        Dictionary with the headings in each GROUP.
+    """
+    if metadata is None:
+        metadata = {}
+
+    data: dict[str, dict[str, list[str]]] = {}
+    headings: dict[str, list[str]] = {}
+    for group, group_data, group_headings, group_meta in _iter_ags_blocks(
+            filepath_or_buffer, encoding=encoding, warnings=warnings,
+            skip_mismatched_rows=skip_mismatched_rows):
+        data[group] = group_data
+        if group_headings:
+            headings[group] = group_headings
+        metadata[group] = group_meta
 
     return data, headings
 
 
-def AGS4_to_dataframe(filepath_or_buffer, encoding='utf-8'):
+# AGS4 TYPE codes that map to a numeric column (2DP, 3SF, 2SCI, MC, U, ...)
+_NUMERIC_TYPE_RE = re.compile(r"^\d*(DP|SF|SCI)$|^(MC|U)$")
+# AGS4 TYPE codes holding a small set of repeated values
+_CATEGORICAL_TYPES = {"ID", "PA", "PT", "PU", "YN"}
+# AGS4 DT unit strings and their strptime equivalents
+_DT_FORMATS = {
+    "yyyy-mm-dd": "%Y-%m-%d",
+    "dd/mm/yyyy": "%d/%m/%Y",
+    "yyyy-mm-ddThh:mm": "%Y-%m-%dT%H:%M",
+    "yyyy-mm-ddThh:mm:ss": "%Y-%m-%dT%H:%M:%S",
+    "yyyy-mm-ddThh:mmZ": "%Y-%m-%dT%H:%MZ",
+    "yyyy-mm": "%Y-%m",
+    "yyyy": "%Y",
+    "hh:mm": "%H:%M",
+    "hh:mm:ss": "%H:%M:%S",
+}
+
+
+def _typed_column(values, ags_type=None, unit=None):
+    """
+    Build one column directly in the dtype implied by its AGS4 TYPE.
+
+    Numeric types (nDP, nSF, nSCI, MC, U) become float64, DT becomes
+    datetime64 when the UNIT names a known format, ID/PA/PT/PU/YN become
+    categorical and everything else a string column. A column is only
+    converted when every non-blank value converts, so no data is lost.
+    Without a TYPE (AGS3) numeric conversion is attempted as before.
+    Series already parsed into a typed dtype (read_csv engines) are kept.
+    """
+    if isinstance(values, pd.Series) and values.dtype != object:
+        return values
+    raw = pd.Series(values, dtype=object)
+    ags_type = (ags_type or "").strip()
+
+    if not ags_type or _NUMERIC_TYPE_RE.match(ags_type):
+        try:
+            if not ags_type:
+                return pd.to_numeric(raw)
+            blank = raw.str.strip() == ""
+            return pd.to_numeric(raw.where(~blank), errors="raise").astype("float64")
+        except (ValueError, TypeError):
+            return raw if not ags_type else raw.astype("string")
+
+    if ags_type == "DT":
+        fmt = _DT_FORMATS.get((unit or "").strip())
+        if fmt is not None:
+            blank = raw.str.strip() == ""
+            parsed = pd.to_datetime(raw.where(~blank), format=fmt, errors="coerce")
+            if not (parsed.isna() & ~blank).any():
+                return parsed
+        return raw.astype("string")
+
+    if ags_type in _CATEGORICAL_TYPES:
+        return raw.astype("category")
+
+    return raw.astype("string")
+
+
+# Group names written with a leading '?' by some AGS3 producers
+_GROUP_RENAME_MAP = {
+    "?ETH": "WETH",
+    "?ETH_TOP": "WETH_TOP",
+    "?ETH_BASE": "WETH_BASE",
+    "?ETH_GRAD": "WETH_GRAD",
+    "?LEGD": "LEGD",
+    "?HORN": "HORN",
+}
+
+
+# First field of a GROUP line: AGS4 "GROUP","NAME" or AGS3 "**NAME"
+_GROUP_LINE_RE = re.compile(
+    rb'^[ \t]*"?GROUP"?[ \t]*,[ \t]*"?([^"\r\n,]*)|^[ \t]*"?\*\*([^"\r\n,]*)',
+    re.MULTILINE
+)
+# Newlines are counted in slices of this size while indexing
+_LINE_COUNT_CHUNK = 1 << 24
+
+
+@contextmanager
+def _mapped_bytes(filepath_or_buffer):
+    """
+    Expose an AGS source as a bytes-like object without parsing it.
+
+    On-disk files are memory-mapped, bytes-like objects are used as they
+    are and other file-like objects are read once.
+    """
+    if isinstance(filepath_or_buffer, (bytes, bytearray, memoryview, mmap.mmap)):
+        yield filepath_or_buffer
+    elif is_file_like(filepath_or_buffer) or hasattr(filepath_or_buffer, 'read'):
+        if hasattr(filepath_or_buffer, 'seek'):
+            filepath_or_buffer.seek(0)
+        content = filepath_or_buffer.read()
+        if hasattr(filepath_or_buffer, 'seek'):
+            filepath_or_buffer.seek(0)
+        yield content.encode('utf-8') if isinstance(content, str) else content
+    else:
+        with open(filepath_or_buffer, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+
+def _index_buffer(buf):
+    """Return [(group, offset, length, line)] for every GROUP block in buf."""
+    blocks = []
+    line = 1
+    pos = 0
+    for match in _GROUP_LINE_RE.finditer(buf):
+        start = match.start()
+        for chunk_start in range(pos, start, _LINE_COUNT_CHUNK):
+            line += buf[chunk_start:min(chunk_start + _LINE_COUNT_CHUNK, start)].count(b'\n')
+        pos = start
+        name = (match.group(1) if match.group(1) is not None else match.group(2)).decode('latin-1').strip()
+        if blocks:
+            group, offset, _, first_line = blocks[-1]
+            blocks[-1] = (group, offset, start - offset, first_line)
+        blocks.append((name, start, len(buf) - start, line))
+    return blocks
+
+
+def index_groups(filepath_or_buffer):
+    """
+    Pre-scan an AGS3/AGS4 file for its GROUP blocks without tokenizing it.
+
+    The scan is a single regex pass over the raw bytes (memory-mapped for
+    on-disk files), so it is far cheaper than a parse.
+
+    Parameters
+    ----------
+    filepath_or_buffer : str, bytes or file-like object
+        Path to AGS file, its bytes, or any file like object
+
+    Returns
+    -------
+    dict
+        {group name: (byte offset, byte length, first line number)}
+    """
+    with _mapped_bytes(filepath_or_buffer) as buf:
+        return {name: (offset, length, line) for name, offset, length, line in _index_buffer(buf)}
+
+
+def _group_selected(name, groups):
+    """True if a raw group name (e.g. '?ETH') was requested in ``groups``."""
+    return name in groups or name.strip('?') in groups or _GROUP_RENAME_MAP.get(name) in groups
+
+
+def iter_group_blocks(filepath_or_buffer, groups):
+    """
+    Yield ``(group, block bytes, first line number)`` for the requested groups.
+
+    Only the bytes of the selected GROUP blocks are copied out of the
+    (memory-mapped) source; all other blocks are skipped untouched.
+    """
+    groups = set(groups)
+    with _mapped_bytes(filepath_or_buffer) as buf:
+        for name, offset, length, line in _index_buffer(buf):
+            if _group_selected(name, groups):
+                yield name, bytes(buf[offset:offset + length]), line
+
+
+def _build_frame(group, data, headings, meta):
+    """Typed DataFrame for one parsed block, or None if its columns do not line up."""
+    units = meta['units']
+    types = meta['types']
+    try:
+        if len({len(v) for v in data.values()}) > 1:
+            raise ValueError(f"Columns of {group} have different lengths")
+        table = pd.DataFrame({
+            col: _typed_column(values, types.get(col), units.get(col))
+            for col, values in data.items()
+        })
+    except ValueError:
+        print(f'Warning: {group} is not exported')
+        return None
+    # Release the string lists before the next block is parsed
+    data.clear()
+    table.attrs['units'] = units
+    table.attrs['types'] = types
+    return _GROUP_RENAME_MAP.get(group, group), table, {'headings': headings, 'units': units, 'types': types}
+
+
+def _iter_frames(filepath_or_buffer, encoding, warnings, skip_mismatched_rows, first_line=1):
+    """Turn each parsed block into a typed DataFrame (see iter_groups)."""
+    for group, data, headings, meta in _iter_ags_blocks(
+            filepath_or_buffer, encoding=encoding, warnings=warnings,
+            skip_mismatched_rows=skip_mismatched_rows, first_line=first_line):
+        frame = _build_frame(group, data, headings, meta)
+        if frame is not None:
+            yield frame
+
+
+# First DATA row of an AGS4 GROUP block
+_DATA_LINE_RE = re.compile(rb'^[ \t]*"?DATA"?[ \t]*,', re.MULTILINE)
+# Appended to every DATA row handed to read_csv; a row that is short (or
+# otherwise malformed) leaves it out of the last column
+_ROW_SENTINEL = '\x01'
+_READ_CSV_ENGINES = ('c', 'pyarrow')
+
+
+def _read_csv_engine(engine):
+    """Resolve the read_csv engine, using the C engine when pyarrow is missing."""
+    if engine not in _READ_CSV_ENGINES:
+        raise ValueError(f"engine must be 'python', 'c' or 'pyarrow', got {engine!r}")
+    if engine == 'pyarrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return 'c'
+    return engine
+
+
+def _read_csv_block(block, encoding, engine):
+    """
+    Parse one AGS4 GROUP block with pandas.read_csv.
+
+    The GROUP/HEADING/UNIT/TYPE rows are tokenized in Python; every row from
+    the first DATA row on is handed to the C (or pyarrow) parser in one call.
+    Returns ``(group, data, headings, meta)`` like _iter_ags_blocks, or None
+    when the block needs the line-by-line parser: <CONT> or other keyword
+    rows between the DATA rows, rows of the wrong length, blank lines or
+    duplicate headings.
+    """
+    match = _DATA_LINE_RE.search(block)
+    data_start = match.start() if match else len(block)
+
+    group = None
+    headings = []
+    meta = {'units': {}, 'types': {}}
+    header = block[:data_start].decode(encoding, errors="replace").splitlines()
+    for temp in csv.reader(header):
+        if not temp or temp == [""]:
+            continue
+        if temp[0] == "GROUP":
+            group = temp[1] if len(temp) > 1 else ""
+        elif group is None:
+            return None
+        elif temp[0] == "HEADING":
+            headings = temp[1:]
+        elif temp[0] == "UNIT":
+            meta['units'] = dict(zip(headings, temp[1:]))
+        elif temp[0] == "TYPE":
+            meta['types'] = dict(zip(headings, temp[1:]))
+        else:
+            return None
+    if group is None or not headings or len(set(headings)) != len(headings):
+        return None
+
+    rows = block[data_start:].rstrip()
+    if not rows:
+        return group, {h: [] for h in headings}, headings, meta
+    if b'\r' in rows:
+        rows = rows.replace(b'\r\n', b'\n')
+    sentinel = f',"{_ROW_SENTINEL}"\n'.encode('ascii')
+    rows = rows.replace(b'\n', sentinel) + sentinel
+
+    columns = (_read_rows_pyarrow if engine == 'pyarrow' else _read_rows_c)(rows, headings, meta['types'], encoding)
+    if columns is None:
+        return None
+    return group, dict(zip(headings, columns)), headings, meta
+
+
+def _read_rows_c(rows, headings, types, encoding):
+    """DATA rows -> one Series per heading with the pandas C parser, or None."""
+    # Let the parser build the final dtype where _typed_column would; a
+    # value that does not convert raises and the block is re-parsed in Python
+    dtypes = {0: str, len(headings) + 1: str}
+    na_values = {}
+    for i, h in enumerate(headings, start=1):
+        ags_type = types.get(h, "").strip()
+        if _NUMERIC_TYPE_RE.match(ags_type):
+            dtypes[i] = 'float64'
+            na_values[i] = [""]
+        elif ags_type in _CATEGORICAL_TYPES:
+            dtypes[i] = 'category'
+        elif ags_type and ags_type != "DT":
+            dtypes[i] = 'string'
+        else:
+            dtypes[i] = str
+    try:
+        # index_col=False: extra fields raise instead of silently becoming the index
+        frame = pd.read_csv(BytesIO(rows), header=None, names=range(len(headings) + 2), dtype=dtypes,
+                            keep_default_na=False, na_values=na_values, index_col=False,
+                            encoding=encoding, engine='c')
+    except (pd.errors.ParserError, ValueError):
+        return None
+    if not (frame[0].eq("DATA").all() and frame[len(headings) + 1].eq(_ROW_SENTINEL).all()):
+        return None
+    return [frame[i] for i in range(1, len(headings) + 1)]
+
+
+def _read_rows_pyarrow(rows, headings, types, encoding):
+    """DATA rows -> one Series per heading with pyarrow.csv, or None."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+
+    # Every column is read as text so no value is reformatted by inference
+    names = [str(i) for i in range(len(headings) + 2)]
+    try:
+        table = pa_csv.read_csv(
+            BytesIO(rows),
+            read_options=pa_csv.ReadOptions(column_names=names, encoding=encoding),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in names},
+                strings_can_be_null=False, quoted_strings_can_be_null=False
+            )
+        )
+        if not (pc.all(pc.equal(table.column(0), "DATA")).as_py()
+                and pc.all(pc.equal(table.column(names[-1]), _ROW_SENTINEL)).as_py()):
+            return None
+        columns = []
+        for i, h in enumerate(headings, start=1):
+            values = table.column(i)
+            if _NUMERIC_TYPE_RE.match(types.get(h, "").strip()):
+                blank = pc.equal(values, "")
+                values = pc.if_else(blank, pa.scalar(None, pa.string()), values).cast(pa.float64())
+            columns.append(values.to_pandas())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+    return columns
+
+
+def _iter_frames_read_csv(filepath_or_buffer, encoding, warnings, skip_mismatched_rows, groups, engine):
+    """iter_groups with AGS4 DATA rows parsed by pandas.read_csv where possible."""
+    engine = _read_csv_engine(engine)
+    groups = set(groups) if groups is not None else None
+    with _mapped_bytes(filepath_or_buffer) as buf:
+        for name, offset, length, line in _index_buffer(buf):
+            if groups is not None and not _group_selected(name, groups):
+                continue
+            block = bytes(buf[offset:offset + length])
+            parsed = None
+            if block.lstrip().startswith((b'"GROUP"', b'GROUP')):
+                parsed = _read_csv_block(block, encoding, engine)
+            if parsed is None:
+                # AGS3 blocks and AGS4 blocks the fast path cannot take
+                yield from _iter_frames(BytesIO(block), encoding, warnings, skip_mismatched_rows, line)
+                continue
+            frame = _build_frame(*parsed)
+            if frame is not None:
+                yield frame
+
+
+def iter_groups(filepath_or_buffer, encoding='utf-8', warnings=None, skip_mismatched_rows=False, groups=None,
+                engine='python'):
+    """
+    Stream the tables of an AGS3/AGS4 file one GROUP at a time.
+
+    Each group is yielded as soon as its block ends, so callers can process
+    and release it before the next one is parsed; peak memory is bounded by
+    the largest single group instead of the whole file.
+
+    Parameters
+    ----------
+    filepath_or_buffer : str, file-like object
+        Path to AGS file or any file like object (bytes are also accepted
+        together with ``groups``)
+    warnings : list, optional
+        Collects row-length warnings during the parse (see AGS4_to_dict)
+    skip_mismatched_rows : bool
+        Drop mismatched rows instead of padding them
+    groups : list, optional
+        Only parse these groups. The file is pre-scanned with index_groups
+        and all other GROUP blocks are never tokenized.
+    engine : {'python', 'c', 'pyarrow'}
+        Parser for AGS4 DATA rows. 'c' and 'pyarrow' hand each GROUP block
+        to pandas.read_csv ('pyarrow' uses the C engine when pyarrow is not
+        installed); blocks with <CONT> lines or malformed rows, and AGS3
+        files, still go through the line-by-line 'python' parser, so row
+        warnings are unchanged.
+
+    Yields
+    ------
+    tuple
+        (group_name, DataFrame, metadata) where metadata is a dict with
+        'headings', 'units' and 'types'
+    """
+    if engine != 'python':
+        yield from _iter_frames_read_csv(filepath_or_buffer, encoding, warnings, skip_mismatched_rows,
+                                         groups, engine)
+        return
+
+    if groups is None:
+        yield from _iter_frames(filepath_or_buffer, encoding, warnings, skip_mismatched_rows)
+        return
+
+    for _, block, first_line in iter_group_blocks(filepath_or_buffer, groups):
+        yield from _iter_frames(BytesIO(block), encoding, warnings, skip_mismatched_rows, first_line)
+
+
+def AGS4_to_dataframe(filepath_or_buffer, encoding='utf-8', warnings=None, skip_mismatched_rows=False,
+                      groups=None, engine='python'):
     """
     Load all the tables in a AGS4 file to Pandas dataframes.
     
+    Columns are built straight into the dtype given by the group's TYPE row
+    (see _typed_column). UNIT/TYPE rows are not part of the data; they are
+    kept per group in ``df[group].attrs['units']`` and ``.attrs['types']``.
+    Use iter_groups to process one group at a time instead.
+    
     Parameters
     ----------
     filepath_or_buffer : str, file-like object
         Path to AGS4 file or any file like object
+    warnings : list, optional
+        Collects row-length warnings during the parse (see AGS4_to_dict)
+    skip_mismatched_rows : bool
+        Drop mismatched rows instead of padding them
+    groups : list, optional
+        Only parse these groups (e.g. ['HOLE', 'GEOL']); other blocks are
+        skipped using the byte-offset index from index_groups
+    engine : {'python', 'c', 'pyarrow'}
+        'c'/'pyarrow' parse AGS4 DATA rows with pandas.read_csv, falling
+        back to the 'python' parser per block (see iter_groups)
     
     Returns
     -------
@@ -163,35 +701,14 @@ def AGS4_to_dataframe(filepath_or_buffer, encoding='utf-8'):
     headings : dict
         Dictionary with the headings in each GROUP
     """
-    # Extract AGS4 file into a dictionary of dictionaries
-    data, headings = AGS4_to_dict(filepath_or_buffer, encoding=encoding)
-
-    # Convert to dictionary of Pandas dataframes
     df = {}
-    for key in data:
-        try:
-            table = pd.DataFrame(data[key])
-            table[1:] = table[1:].apply(pd.to_numeric, errors='ignore')
-            df[key] = table
-        except ValueError:
-            print(f'Warning: {key} is not exported')
-            continue
-    
-   
-    # Handle exceptions for group names
-    rename_map = {
-        "?ETH": "WETH",
-        "?ETH_TOP": "WETH_TOP",
-        "?ETH_BASE": "WETH_BASE",
-        "?ETH_GRAD": "WETH_GRAD",
-        "?LEGD": "LEGD",
-        "?HORN": "HORN",
-    }
-    for old, new in rename_map.items():
-        if old in df:
-            df[new] = df.pop(old)
-        if old in headings:
-            headings[new] = headings.pop(old)
+    headings = {}
+    for group, table, meta in iter_groups(filepath_or_buffer, encoding=encoding, warnings=warnings,
+                                          skip_mismatched_rows=skip_mismatched_rows, groups=groups,
+                                          engine=engine):
+        df[group] = table
+        if meta['headings']:
+            headings[group] = meta['headings']
     
     return df, headings
 
@@ -225,12 +742,10 @@ def concat_ags_files(uploaded_files, giu_number):
 
     for idx, file in enumerate(uploaded_files):
         per_file_giu = f"{giu_number}_{idx+1}"
-        df_dict, headings = AGS4_to_dataframe(file)
-
-        for group_name, df in df_dict.items():
-            if df is None or df.empty:
+        # Stream groups so only one table of the file is alive at a time
+        for group_name, temp, _ in iter_groups(file):
+            if temp is None or temp.empty:
                 continue
-            temp = df.copy()
             temp["GIU_NO"] = per_file_giu
             temp["AGS_FILE"] = getattr(file, "name", "")
             if "HOLE_ID" in temp.columns:
@@ -244,14 +759,226 @@ def concat_ags_files(uploaded_files, giu_number):
 # AGS COMBINATION FUNCTION
 # ============================================================================
 
+# Columns of the combined table, in output order
+_COMBINE_COLUMNS = [
+    'GIU_HOLE_ID', 'GIU_NO', 'HOLE_ID', 'DEPTH_FROM', 'DEPTH_TO',
+    'GEOL', 'GEOL_DESC', 'THICKNESS_M', 'TCR', 'RQD',
+    'WETH_GRAD', 'WETH', 'FI', 'Details'
+]
+# Interval groups overlaid by combine_ags_data:
+# group -> (top column, base column, column required to fill, {output column: group column})
+_COMBINE_SOURCES = {
+    'CORE': ('CORE_TOP', 'CORE_BOT', None, {'RQD': 'CORE_RQD', 'TCR': 'CORE_PREC'}),
+    'DETL': ('DETL_TOP', 'DETL_BASE', 'DETL_DESC', {'Details': 'DETL_DESC'}),
+    'FRAC': ('FRAC_TOP', 'FRAC_BASE', 'FRAC_FI', {'FI': 'FRAC_FI'}),
+    'GEOL': ('GEOL_TOP', 'GEOL_BASE', None, {'GEOL': 'GEOL_LEG', 'GEOL_DESC': 'GEOL_DESC'}),
+    'WETH': ('WETH_TOP', 'WETH_BASE', 'WETH_GRAD', {'WETH_GRAD': 'WETH_GRAD'}),
+}
+
+
+def _hole_codes(df, holes):
+    """Position of each row's (GIU_NO, HOLE_ID) in ``holes``; -1 if absent or incomplete."""
+    keys = pd.MultiIndex.from_arrays([df['GIU_NO'], df['HOLE_ID']])
+    codes = holes.get_indexer(keys)
+    codes[(df['GIU_NO'].isna() | df['HOLE_ID'].isna()).to_numpy()] = -1
+    return codes
+
+
+def _overlay_intervals(group_dict, group_list):
+    """
+    Overlay the interval groups of one concatenated AGS data set.
+
+    All TOP/BASE depths of a hole are merged into one sorted breakpoint
+    array; consecutive breakpoints form the output intervals. Each source
+    row [TOP, BASE) covers a contiguous run of those intervals, found with
+    searchsorted, and where rows of a group overlap the later row wins.
+    """
+    hole = group_dict.get('HOLE')
+    if hole is None or hole.empty:
+        return None
+
+    hole_keys = pd.MultiIndex.from_arrays([hole['GIU_NO'], hole['HOLE_ID']])
+    holes = hole_keys.unique()
+    hole_codes = _hole_codes(hole, holes)
+
+    # Source rows belonging to a known hole, with numeric depths
+    sources = []
+    for g, (top, base, required, fields) in _COMBINE_SOURCES.items():
+        data = group_dict.get(g)
+        if g not in group_list or data is None or data.empty or top not in data or base not in data:
+            continue
+        data = data.reset_index(drop=True)
+        codes = _hole_codes(data, holes)
+        tops = pd.to_numeric(data[top], errors='coerce').to_numpy(dtype=float)
+        bases = pd.to_numeric(data[base], errors='coerce').to_numpy(dtype=float)
+        sources.append((g, data, codes, tops, bases, required, fields))
+
+    # Sorted, de-duplicated (hole, depth) breakpoints
+    bp_code = np.concatenate([np.r_[c, c] for _, _, c, _, _, _, _ in sources] or [np.empty(0, dtype=np.intp)])
+    bp_depth = np.concatenate([np.r_[t, b] for _, _, _, t, b, _, _ in sources] or [np.empty(0)])
+    keep = (bp_code >= 0) & ~np.isnan(bp_depth)
+    bp_code, bp_depth = bp_code[keep], bp_depth[keep]
+    order = np.lexsort((bp_depth, bp_code))
+    bp_code, bp_depth = bp_code[order], bp_depth[order]
+    distinct = np.r_[True, (bp_code[1:] != bp_code[:-1]) | (bp_depth[1:] != bp_depth[:-1])]
+    bp_code, bp_depth = bp_code[distinct], bp_depth[distinct]
+
+    # Breakpoint j starts an interval when breakpoint j + 1 is in the same hole
+    starts = np.r_[bp_code[1:] == bp_code[:-1], False]
+    start_pos = np.flatnonzero(starts)
+    interval_of = np.cumsum(starts) - 1
+    if not len(start_pos):
+        return None
+
+    # (hole, depth) -> breakpoint position via an exact integer composite key
+    depth_values = np.unique(bp_depth)
+    stride = len(depth_values) + 1
+    bp_key = bp_code.astype(np.int64) * stride + np.searchsorted(depth_values, bp_depth)
+
+    def _locate(codes, depths):
+        return np.searchsorted(bp_key, codes.astype(np.int64) * stride + np.searchsorted(depth_values, depths))
+
+    combined = pd.DataFrame({
+        'DEPTH_FROM': bp_depth[start_pos],
+        'DEPTH_TO': bp_depth[start_pos + 1],
+    })
+    combined['THICKNESS_M'] = combined['DEPTH_TO'] - combined['DEPTH_FROM']
+
+    for g, data, codes, tops, bases, required, fields in sources:
+        if required is not None and required not in data:
+            continue
+        valid = (codes >= 0) & (tops < bases)
+        rows = np.flatnonzero(valid)
+        first = _locate(codes[rows], tops[rows])
+        last = _locate(codes[rows], bases[rows])
+        lengths = last - first
+        # Expand each row to the breakpoints it covers; the latest row wins
+        covered = np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        owner = np.full(len(start_pos), -1, dtype=np.intp)
+        np.maximum.at(owner, interval_of[covered], np.repeat(rows, lengths))
+        for column, source_column in fields.items():
+            if source_column in data:
+                combined[column] = data[source_column].reindex(owner).to_numpy()
+
+    # One block of intervals per HOLE row, in HOLE order
+    interval_code = bp_code[start_pos]
+    block_start = np.searchsorted(interval_code, hole_codes, side='left')
+    block_end = np.searchsorted(interval_code, hole_codes, side='right')
+    block_end[hole_codes < 0] = block_start[hole_codes < 0]
+    lengths = block_end - block_start
+    take = np.repeat(block_start - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    hole_rows = np.repeat(np.arange(len(hole)), lengths)
+
+    combined = combined.iloc[take].reset_index(drop=True)
+    giu_no = hole['GIU_NO'].iloc[hole_rows].reset_index(drop=True)
+    hole_id = hole['HOLE_ID'].iloc[hole_rows].reset_index(drop=True)
+    combined['GIU_HOLE_ID'] = giu_no.astype(str) + "_" + hole_id.astype(str)
+    combined['GIU_NO'] = giu_no
+    combined['HOLE_ID'] = hole_id
+
+    if 'WETH' in group_list and 'WETH_GRAD' in combined:
+        combined['WETH'] = _simplify_weth_grade(combined['WETH_GRAD'])
+
+    return combined.reindex(columns=_COMBINE_COLUMNS)
+
+
+def _simplify_weth_grade(weth_grad):
+    """Reduce transitional weathering grades (e.g. 'II/III') to a single grade."""
+    weth = weth_grad.astype(object)
+    weth[weth_grad.isin(['I/II', 'II/I'])] = 'II'
+    weth[weth_grad.isin(['II/III', 'III/II'])] = 'III'
+    weth[weth_grad.isin(['III/IV', 'IV/III']) |
+         (weth_grad.str.contains('III', na=False) & weth_grad.str.contains('IV', na=False))] = 'IV'
+    weth[weth_grad.isin(['IV/V', 'V/IV'])] = 'V'
+    weth[weth_grad.isin(['V/VI', 'VI/V'])] = 'VI'
+    return weth
+
+
+def _combine_columns(group):
+    """Columns combine_ags_data reads from a group."""
+    columns = ['GIU_NO', 'SOURCE_FILE', 'HOLE_ID']
+    if group in _COMBINE_SOURCES:
+        top, base, _, fields = _COMBINE_SOURCES[group]
+        columns += [top, base] + list(fields.values())
+    return columns
+
+
+def _read_combine_parquet(path, group_list):
+    """Read the groups of a Parquet dataset (one sub-directory per group), only the needed columns."""
+    import pyarrow.dataset as ds
+
+    group_dict = {}
+    for g in group_list:
+        group_dir = os.path.join(path, g)
+        if not os.path.isdir(group_dir):
+            group_dict[g] = pd.DataFrame()
+            continue
+        dataset = ds.dataset(group_dir, format='parquet', partitioning='hive')
+        columns = [c for c in _combine_columns(g) if c in dataset.schema.names]
+        group_dict[g] = dataset.to_table(columns=columns).to_pandas()
+    return group_dict
+
+
+def _read_combine_excel(file, group_list):
+    """Read the group sheets of an Excel workbook, opening it once."""
+    group_dict = {}
+    try:
+        workbook = pd.ExcelFile(file)
+    except Exception:
+        return group_dict
+    with workbook:
+        for g in group_list:
+            if g in workbook.sheet_names:
+                columns = set(_combine_columns(g))
+                group_dict[g] = workbook.parse(g, usecols=lambda c: c in columns)
+            else:
+                group_dict[g] = pd.DataFrame()
+    return group_dict
+
+
+def _combine_input(source, group_list):
+    """
+    Normalise one combine_ags_data input to {group: DataFrame}.
+
+    Tables without GIU_NO (e.g. AGSProcessor.get_all_tables(include_source=True))
+    use SOURCE_FILE in its place.
+    """
+    if isinstance(source, dict):
+        group_dict = dict(source)
+    elif isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        group_dict = _read_combine_parquet(source, group_list)
+    else:
+        group_dict = _read_combine_excel(source, group_list)
+
+    for g, df in group_dict.items():
+        if g in group_list and not df.empty and 'GIU_NO' not in df:
+            if 'SOURCE_FILE' not in df:
+                raise ValueError(
+                    f"Group {g} has no GIU_NO or SOURCE_FILE column to identify its file; "
+                    "use concat_ags_files() or get_all_tables(include_source=True)"
+                )
+            group_dict[g] = df.assign(GIU_NO=df['SOURCE_FILE'])
+    return group_dict
+
+
 def combine_ags_data(uploaded_excel_files, selected_groups=None):
     """
-    Combine data from multiple Excel files into a single dataframe.
+    Combine AGS3 group tables into a single interval dataframe.
+    
+    For every hole the TOP/BASE depths of the selected groups are merged
+    into consecutive intervals, and each interval takes its CORE, DETL,
+    FRAC, GEOL and WETH attributes from the row covering it (see
+    _overlay_intervals).
     
     Parameters
     ----------
-    uploaded_excel_files : list
-        List of uploaded Excel file objects
+    uploaded_excel_files : dict, str or list
+        One input or a list of inputs, each either
+        - a {group: DataFrame} dict, as returned by concat_ags_files or
+          AGSProcessor.get_all_tables(include_source=True),
+        - a directory holding a Parquet dataset per group, as written by
+          AGSExporter.export_to_parquet, or
+        - an Excel file (path or file object) with one sheet per group.
     selected_groups : list, optional
         List of groups to combine. If None, combines all groups.
     
@@ -265,181 +992,344 @@ def combine_ags_data(uploaded_excel_files, selected_groups=None):
     else:
         group_list = ['HOLE'] + selected_groups
     
-    # Initialize master dataframe
-    df = pd.DataFrame(columns=[
-        'GIU_HOLE_ID', 'GIU_NO', 'HOLE_ID', 'DEPTH_FROM', 'DEPTH_TO', 
-        'GEOL', 'GEOL_DESC', 'THICKNESS_M', 'TCR', 'RQD', 
-        'WETH_GRAD', 'WETH', 'FI', 'Details'
-    ])
+    sources = uploaded_excel_files
+    if isinstance(sources, (dict, str, os.PathLike)):
+        sources = [sources]
     
-    row_index = 0
+    combined = []
+    for source in sources:
+        table = _overlay_intervals(_combine_input(source, group_list), group_list)
+        if table is not None:
+            combined.append(table)
     
-    for file in uploaded_excel_files:
-        # Read separate sheets for each file
-        group_dict = {}
-        for g in group_list:
-            try:
-                group_dict[g] = pd.read_excel(file, sheet_name=g)
-            except:
-                group_dict[g] = pd.DataFrame()
-        
-        if 'HOLE' not in group_dict or group_dict['HOLE'].empty:
-            continue
-        
-        GIU_HOLE_ID_list = group_dict['HOLE']['GIU_NO'].astype(str) + "_" + group_dict['HOLE']['HOLE_ID']
-        
-        # Process each borehole
-        for bh in range(len(GIU_HOLE_ID_list)):
-            GIU_NO_bh = group_dict['HOLE'].loc[bh, 'GIU_NO']
-            HOLE_ID_bh = group_dict['HOLE'].loc[bh, 'HOLE_ID']
-            
-            # Get combined depths from all selected groups
-            all_depths = []
-            
-            if 'CORE' in group_list and 'CORE' in group_dict:
-                core_data = group_dict['CORE'][(group_dict['CORE']['HOLE_ID'] == HOLE_ID_bh) & 
-                                                (group_dict['CORE']['GIU_NO'] == GIU_NO_bh)]
-                if not core_data.empty and 'CORE_TOP' in core_data.columns and 'CORE_BOT' in core_data.columns:
-                    all_depths.extend(list(core_data['CORE_TOP'].values))
-                    all_depths.extend(list(core_data['CORE_BOT'].values))
-            
-            if 'DETL' in group_list and 'DETL' in group_dict:
-                detl_data = group_dict['DETL'][(group_dict['DETL']['HOLE_ID'] == HOLE_ID_bh) & 
-                                                (group_dict['DETL']['GIU_NO'] == GIU_NO_bh)]
-                if not detl_data.empty and 'DETL_TOP' in detl_data.columns and 'DETL_BASE' in detl_data.columns:
-                    all_depths.extend(list(detl_data['DETL_TOP'].values))
-                    all_depths.extend(list(detl_data['DETL_BASE'].values))
-            
-            if 'FRAC' in group_list and 'FRAC' in group_dict:
-                frac_data = group_dict['FRAC'][(group_dict['FRAC']['HOLE_ID'] == HOLE_ID_bh) & 
-                                                (group_dict['FRAC']['GIU_NO'] == GIU_NO_bh)]
-                if not frac_data.empty and 'FRAC_TOP' in frac_data.columns and 'FRAC_BASE' in frac_data.columns:
-                    all_depths.extend(list(frac_data['FRAC_TOP'].values))
-                    all_depths.extend(list(frac_data['FRAC_BASE'].values))
-            
-            if 'GEOL' in group_list and 'GEOL' in group_dict:
-                geol_data = group_dict['GEOL'][(group_dict['GEOL']['HOLE_ID'] == HOLE_ID_bh) & 
-                                                (group_dict['GEOL']['GIU_NO'] == GIU_NO_bh)]
-                if not geol_data.empty and 'GEOL_TOP' in geol_data.columns and 'GEOL_BASE' in geol_data.columns:
-                    all_depths.extend(list(geol_data['GEOL_TOP'].values))
-                    all_depths.extend(list(geol_data['GEOL_BASE'].values))
-            
-            if 'WETH' in group_list and 'WETH' in group_dict:
-                weth_data = group_dict['WETH'][(group_dict['WETH']['HOLE_ID'] == HOLE_ID_bh) & 
-                                                (group_dict['WETH']['GIU_NO'] == GIU_NO_bh)]
-                if not weth_data.empty and 'WETH_TOP' in weth_data.columns and 'WETH_BASE' in weth_data.columns:
-                    all_depths.extend(list(weth_data['WETH_TOP'].values))
-                    all_depths.extend(list(weth_data['WETH_BASE'].values))
-            
-            # Create unique sorted depths
-            depths = list(set(all_depths))
-            depths.sort()
-            depth = [x for x in depths if str(x) != 'nan']
-            depth.sort()
-            
-            if len(depth) < 2:
-                continue
-            
-            depth_from = depth[0:-1]
-            depth_to = depth[1:]
-            
-            # Fill in the dataframe
-            for d in range(len(depth_to)):
-                df.loc[row_index, 'GIU_HOLE_ID'] = GIU_HOLE_ID_list[bh]
-                df.loc[row_index, 'GIU_NO'] = GIU_NO_bh
-                df.loc[row_index, 'HOLE_ID'] = HOLE_ID_bh
-                df.loc[row_index, 'DEPTH_FROM'] = depth_from[d]
-                df.loc[row_index, 'DEPTH_TO'] = depth_to[d]
-                df.loc[row_index, 'THICKNESS_M'] = depth_to[d] - depth_from[d]
-                row_index += 1
-            
-            # Fill from CORE sheet
-            if 'CORE' in group_list and 'CORE' in group_dict:
-                core = group_dict['CORE'][(group_dict['CORE']['HOLE_ID'] == HOLE_ID_bh) & 
-                                          (group_dict['CORE']['GIU_NO'] == GIU_NO_bh)]
-                for c in range(len(core)):
-                    if 'CORE_TOP' in core.columns and 'CORE_BOT' in core.columns:
-                        mask = (df.HOLE_ID == HOLE_ID_bh) & (df.GIU_NO == GIU_NO_bh) & \
-                               (df.DEPTH_FROM.between(core.iloc[c]['CORE_TOP'], 
-                                                     core.iloc[c]['CORE_BOT'], inclusive='left'))
-                        if 'CORE_RQD' in core.columns:
-                            df.loc[mask, 'RQD'] = core.iloc[c]['CORE_RQD']
-                        if 'CORE_PREC' in core.columns:
-                            df.loc[mask, 'TCR'] = core.iloc[c]['CORE_PREC']
-            
-            # Fill from DETL sheet
-            if 'DETL' in group_list and 'DETL' in group_dict:
-                detl = group_dict['DETL'][(group_dict['DETL']['HOLE_ID'] == HOLE_ID_bh) & 
-                                          (group_dict['DETL']['GIU_NO'] == GIU_NO_bh)]
-                for d in range(len(detl)):
-                    if 'DETL_TOP' in detl.columns and 'DETL_BASE' in detl.columns and 'DETL_DESC' in detl.columns:
-                        mask = (df.HOLE_ID == HOLE_ID_bh) & (df.GIU_NO == GIU_NO_bh) & \
-                               (df.DEPTH_FROM.between(detl.iloc[d]['DETL_TOP'], 
-                                                     detl.iloc[d]['DETL_BASE'], inclusive='left'))
-                        df.loc[mask, 'Details'] = detl.iloc[d]['DETL_DESC']
-            
-            # Fill from FRAC sheet
-            if 'FRAC' in group_list and 'FRAC' in group_dict:
-                frac = group_dict['FRAC'][(group_dict['FRAC']['HOLE_ID'] == HOLE_ID_bh) & 
-                                          (group_dict['FRAC']['GIU_NO'] == GIU_NO_bh)]
-                for fr in range(len(frac)):
-                    if 'FRAC_TOP' in frac.columns and 'FRAC_BASE' in frac.columns and 'FRAC_FI' in frac.columns:
-                        mask = (df.HOLE_ID == HOLE_ID_bh) & (df.GIU_NO == GIU_NO_bh) & \
-                               (df.DEPTH_FROM.between(frac.iloc[fr]['FRAC_TOP'], 
-                                                     frac.iloc[fr]['FRAC_BASE'], inclusive='left'))
-                        df.loc[mask, 'FI'] = frac.iloc[fr]['FRAC_FI']
-            
-            # Fill from GEOL sheet
-            if 'GEOL' in group_list and 'GEOL' in group_dict:
-                geol = group_dict['GEOL'][(group_dict['GEOL']['HOLE_ID'] == HOLE_ID_bh) & 
-                                          (group_dict['GEOL']['GIU_NO'] == GIU_NO_bh)]
-                for g in range(len(geol)):
-                    if 'GEOL_TOP' in geol.columns and 'GEOL_BASE' in geol.columns:
-                        mask = (df.HOLE_ID == HOLE_ID_bh) & (df.GIU_NO == GIU_NO_bh) & \
-                               (df.DEPTH_FROM.between(geol.iloc[g]['GEOL_TOP'], 
-                                                     geol.iloc[g]['GEOL_BASE'], inclusive='left'))
-                        if 'GEOL_LEG' in geol.columns:
-                            df.loc[mask, 'GEOL'] = geol.iloc[g]['GEOL_LEG']
-                        if 'GEOL_DESC' in geol.columns:
-                            df.loc[mask, 'GEOL_DESC'] = geol.iloc[g]['GEOL_DESC']
-            
-            # Fill from WETH sheet
-            if 'WETH' in group_list and 'WETH' in group_dict:
-                weth = group_dict['WETH'][(group_dict['WETH']['HOLE_ID'] == HOLE_ID_bh) & 
-                                          (group_dict['WETH']['GIU_NO'] == GIU_NO_bh)]
-                for w in range(len(weth)):
-                    if 'WETH_TOP' in weth.columns and 'WETH_BASE' in weth.columns and 'WETH_GRAD' in weth.columns:
-                        mask = (df.HOLE_ID == HOLE_ID_bh) & (df.GIU_NO == GIU_NO_bh) & \
-                               (df.DEPTH_FROM.between(weth.iloc[w]['WETH_TOP'], 
-                                                     weth.iloc[w]['WETH_BASE'], inclusive='left'))
-                        df.loc[mask, 'WETH_GRAD'] = weth.iloc[w]['WETH_GRAD']
-                
-                # Simplify weathering grades
-                df['WETH'] = df['WETH_GRAD']
-                df.loc[(df.WETH_GRAD == 'I/II') | (df.WETH_GRAD == 'II/I'), 'WETH'] = 'II'
-                df.loc[(df.WETH_GRAD == 'II/III') | (df.WETH_GRAD == 'III/II'), 'WETH'] = 'III'
-                df.loc[(df.WETH_GRAD == 'III/IV') | (df.WETH_GRAD == 'IV/III') | 
-                       (df.WETH_GRAD.str.contains('III', na=False) & df.WETH_GRAD.str.contains('IV', na=False)), 'WETH'] = 'IV'
-                df.loc[(df.WETH_GRAD == 'IV/V') | (df.WETH_GRAD == 'V/IV'), 'WETH'] = 'V'
-                df.loc[(df.WETH_GRAD == 'V/VI') | (df.WETH_GRAD == 'VI/V'), 'WETH'] = 'VI'
-    
-    return df
+    if not combined:
+        return pd.DataFrame(columns=_COMBINE_COLUMNS)
+    return pd.concat(combined, ignore_index=True)
 
 
 # ============================================================================
 # SEARCH KEYWORD FUNCTION
 # ============================================================================
 
-def search_keyword(df_in, keyword_list):
+# Characters that make a keyword more than a literal (alternation aside)
+_REGEX_SPECIALS = set('.^$*+?{}[]\\()')
+
+
+def _literal_alternatives(pattern):
+    """The ASCII literals a pattern is an alternation of, or None if it is any other regex."""
+    if _REGEX_SPECIALS.intersection(pattern) or not pattern.isascii():
+        return None
+    literals = pattern.split('|')
+    return None if '' in literals else literals
+
+
+def _literal_trie(literals):
+    """
+    Regex for the longest of literals that starts at a position.
+    
+    The literals are merged into a trie, so one scan tests them all, and
+    each literal ends in an empty group ``t<i>`` that tells which matched.
+    """
+    trie = {}
+    for i, literal in enumerate(literals):
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = i
+    
+    def branches(node):
+        # Longer literals first, so a match is the longest one at its position
+        options = [re.escape(char) + branches(child) for char, child in node.items() if char]
+        if '' in node:
+            options.append(f'(?P<t{node[""]}>)')
+        return options[0] if len(options) == 1 else '(?:' + '|'.join(options) + ')'
+    
+    return f'(?={branches(trie)})'
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_keywords(patterns, case):
+    """
+    Compile keywords for _match_strings.
+    
+    Keywords that are literals (or alternations of literals, see
+    _literal_alternatives) share one trie regex, so a single scan of a
+    string finds all of them. Any literal that is a prefix of a matched
+    literal also occurs there, so ``prefixes[i]`` marks the keywords found
+    when literal i matches. Other keywords are compiled on their own.
+    
+    Returns
+    -------
+    tuple
+        (trie, prefixes, regexes): the trie regex (None without literal
+        keywords), a literals x patterns boolean array, and a list of
+        (pattern position, compiled regex) for the other keywords
+    """
+    flags = 0 if case else re.IGNORECASE
+    owners = {}
+    regexes = []
+    for k, pattern in enumerate(patterns):
+        literals = _literal_alternatives(pattern)
+        if literals is None:
+            regexes.append((k, re.compile(pattern, flags)))
+            continue
+        for literal in literals:
+            owners.setdefault(literal if case else literal.lower(), set()).add(k)
+    
+    literals = list(owners)
+    prefixes = np.zeros((len(literals), len(patterns)), dtype=bool)
+    for i, literal in enumerate(literals):
+        for other in literals:
+            if literal.startswith(other):
+                prefixes[i, list(owners[other])] = True
+    trie = re.compile(_literal_trie(literals), flags) if literals else None
+    return trie, prefixes, regexes
+
+
+def _match_strings(strings, patterns, case=False):
+    """
+    Boolean array (strings + 1 x patterns) of which regex patterns occur in each string.
+    
+    Literal keywords are found in one trie scan per string and the other
+    regexes are searched one by one (see _compile_keywords). The extra
+    all-False last row is picked by code -1 (missing); non-string values
+    match nothing, as with ``str.contains(..., na=False)``.
+    """
+    hits = np.zeros((len(strings) + 1, len(patterns)), dtype=bool)
+    if not patterns:
+        return hits
+    trie, prefixes, regexes = _compile_keywords(tuple(patterns), case)
+    for u, text in enumerate(strings):
+        if not isinstance(text, str):
+            continue
+        if trie is not None:
+            found = {int(m.lastgroup[1:]) for m in trie.finditer(text)}
+            if found:
+                hits[u] = prefixes[list(found)].any(axis=0)
+        for k, regex in regexes:
+            hits[u, k] = regex.search(text) is not None
+    return hits
+
+
+def _keyword_matches(values, patterns, case=False, text_index=None):
+    """
+    Boolean array (rows x patterns) of which regex patterns occur in each value.
+    
+    Matches are computed once per distinct string and mapped back to the
+    rows, through ``text_index`` when it covers the column.
+    """
+    if text_index is not None and values.name in text_index:
+        return text_index.matches(values, patterns, case)
+    codes, uniques = pd.factorize(values)
+    return _match_strings(uniques, patterns, case)[codes]
+
+
+class TextIndex:
+    """
+    Inverted trigram index over the text columns of a combined dataset.
+    
+    For each column the index keeps every row's code into the column's
+    distinct strings, and for each lower-cased trigram the distinct strings
+    containing it. A keyword that is a literal (or an alternation of
+    literals) is only tested against the strings holding all its trigrams;
+    other regular expressions are tested against every distinct string.
+    Matching stays exact either way, and rows are looked up by their text,
+    so a reordered or edited frame is still searched correctly. Build the index once per dataset and
+    save it next to the data (see for_dataset) to reuse it across searches.
+    
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows of the indexed dataframe
+    fields : dict
+        {column: (codes, strings, postings)} as produced by build
+    source : dict, optional
+        Size and modification time of the indexed file
+    """
+    
+    FIELDS = ('GEOL_DESC', 'Details', 'GEOL')
+    GRAM = 3
+    
+    def __init__(self, n_rows, fields, source=None):
+        self.n_rows = n_rows
+        self.fields = fields
+        self.source = source or {}
+    
+    def __contains__(self, field):
+        return field in self.fields
+    
+    @classmethod
+    def build(cls, df, fields=None, source=None):
+        """Index the text columns of df (by default those of FIELDS it has)."""
+        fields = [f for f in (fields or cls.FIELDS) if f in df.columns]
+        indexed = {}
+        for field in fields:
+            codes, uniques = pd.factorize(df[field])
+            is_text = np.array([isinstance(u, str) for u in uniques], dtype=bool)
+            # Renumber so only strings keep a code
+            renumber = np.append(np.where(is_text, np.cumsum(is_text) - 1, -1), -1)
+            strings = [u for u, text in zip(uniques, is_text) if text]
+            postings = {}
+            for u, text in enumerate(strings):
+                for gram in cls._grams(text.lower()):
+                    postings.setdefault(gram, []).append(u)
+            postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+            indexed[field] = (renumber[codes].astype(np.int32), strings, postings)
+        return cls(len(df), indexed, source)
+    
+    @classmethod
+    def _grams(cls, text):
+        return {text[i:i + cls.GRAM] for i in range(len(text) - cls.GRAM + 1)}
+    
+    def candidates(self, field, pattern):
+        """Ids of the distinct strings that may match pattern, or None for all of them."""
+        literals = _literal_alternatives(pattern)
+        if literals is None:
+            return None
+        postings = self.fields[field][2]
+        found = []
+        for literal in literals:
+            grams = self._grams(literal.lower())
+            if not grams:
+                return None
+            lists = sorted((postings.get(g, np.empty(0, dtype=np.int32)) for g in grams), key=len)
+            ids = lists[0]
+            for other in lists[1:]:
+                ids = np.intersect1d(ids, other, assume_unique=True)
+            found.append(ids)
+        return np.unique(np.concatenate(found))
+    
+    def matches(self, values, patterns, case=False):
+        """
+        Boolean array (rows x patterns) of which regex patterns occur in each of values.
+        
+        values is a column the index covers (named after its field). Rows are
+        looked up by their text rather than their position, so the frame may
+        be reordered or filtered; strings the index has not seen are matched
+        directly.
+        """
+        _, strings, _ = self.fields[values.name]
+        codes = pd.Index(strings, dtype=object).get_indexer(values)
+        unseen = codes == -1
+        extra = []
+        if unseen.any():
+            extra_codes, extra = pd.factorize(values[unseen])
+            codes[unseen] = np.where(extra_codes >= 0, len(strings) + extra_codes, -1)
+        flags = 0 if case else re.IGNORECASE
+        hits = np.zeros((len(strings) + 1, len(patterns)), dtype=bool)
+        scan = []
+        for k, pattern in enumerate(patterns):
+            ids = self.candidates(values.name, pattern)
+            if ids is None:
+                scan.append(k)
+                continue
+            regex = re.compile(pattern, flags)
+            hits[ids[[regex.search(strings[u]) is not None for u in ids]], k] = True
+        if scan:
+            hits[:, scan] = _match_strings(strings, [patterns[k] for k in scan], case)
+        if len(extra):
+            hits = np.vstack([hits[:-1], _match_strings(extra, patterns, case)])
+        return hits[codes]
+    
+    def check(self, df):
+        """Raise ValueError unless the index was built for a dataframe of df's length."""
+        if len(df) != self.n_rows:
+            raise ValueError(
+                f"Text index covers {self.n_rows} rows but the data has {len(df)}; rebuild the index"
+            )
+    
+    def save(self, path):
+        """Write the index to a NumPy .npz file."""
+        meta = {'n_rows': self.n_rows, 'fields': list(self.fields), 'source': self.source}
+        arrays = {'meta': np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)}
+        for i, (codes, strings, postings) in enumerate(self.fields.values()):
+            encoded = [text.encode('utf-8') for text in strings]
+            grams = sorted(postings)
+            arrays[f'{i}_codes'] = codes
+            arrays[f'{i}_strings'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+            arrays[f'{i}_string_ends'] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+            arrays[f'{i}_grams'] = np.array(grams, dtype=f'U{self.GRAM}')
+            arrays[f'{i}_posting_ends'] = np.cumsum([len(postings[g]) for g in grams], dtype=np.int64)
+            arrays[f'{i}_postings'] = np.concatenate([postings[g] for g in grams] or [np.empty(0, dtype=np.int32)])
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+    
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            fields = {}
+            for i, field in enumerate(meta['fields']):
+                blob = data[f'{i}_strings'].tobytes()
+                ends = data[f'{i}_string_ends']
+                starts = np.concatenate([[0], ends[:-1]])
+                strings = [blob[a:b].decode('utf-8') for a, b in zip(starts, ends)]
+                posting_ends = data[f'{i}_posting_ends']
+                postings = dict(zip(
+                    data[f'{i}_grams'].tolist(),
+                    np.split(data[f'{i}_postings'], posting_ends[:-1])
+                ))
+                fields[field] = (data[f'{i}_codes'], strings, postings)
+        return cls(meta['n_rows'], fields, meta['source'])
+    
+    @staticmethod
+    def path_for(data_path):
+        """Where the index of a data file is kept: alongside it."""
+        return f"{os.fspath(data_path)}.textindex.npz"
+    
+    @classmethod
+    def for_dataset(cls, data_path, df, fields=None):
+        """
+        Load the index saved next to data_path, or build and save it.
+        
+        A saved index is reused while the data file keeps its size and
+        modification time and df has the indexed number of rows.
+        
+        Parameters
+        ----------
+        data_path : str or Path
+            File the combined data was read from
+        df : pd.DataFrame
+            The combined data read from data_path
+        fields : list, optional
+            Columns to index; defaults to FIELDS
+        
+        Returns
+        -------
+        TextIndex
+        """
+        stat = os.stat(data_path)
+        source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        index_path = cls.path_for(data_path)
+        if os.path.exists(index_path):
+            try:
+                index = cls.load(index_path)
+                if index.source == source and index.n_rows == len(df):
+                    return index
+            except (OSError, ValueError, KeyError):
+                pass
+        index = cls.build(df, fields, source)
+        index.save(index_path)
+        return index
+
+
+def search_keyword(df_in, keyword_list, text_index=None):
     """
     Search for keywords in GEOL_DESC and Details columns.
     
+    Keywords are matched once per distinct description: literal keywords
+    all together in a single scan, other regular expressions one by one
+    (see _match_strings). Keywords are case-insensitive regular expressions.
+    
     Parameters
     ----------
     df_in : pd.DataFrame
         Input dataframe with geological data
     keyword_list : list
         List of keywords to search for
+    text_index : TextIndex, optional
+        Index built for df_in, used to narrow down the rows to test
     
     Returns
     -------
@@ -451,40 +1341,170 @@ def search_keyword(df_in, keyword_list):
     # Check required columns
     if 'GEOL_DESC' not in df.columns or 'Details' not in df.columns:
         raise ValueError("Input file must contain 'GEOL_DESC' and 'Details' columns")
+    if text_index is not None:
+        text_index.check(df)
     
     NR_text = 'no recovery'
     
-    for kw in keyword_list:
+    patterns = [str(kw) for kw in keyword_list]
+    hits = (_keyword_matches(df['GEOL_DESC'], patterns, text_index=text_index) |
+            _keyword_matches(df['Details'], patterns, text_index=text_index))
+    
+    columns = {}
+    for i, kw in enumerate(patterns):
         if kw.casefold() == NR_text.casefold():
-            # Special handling for "no recovery"
+            # Special handling for "no recovery": also an FI of NR
+            no_recovery = hits[:, i]
             if 'FI' in df.columns:
-                df['No Recovery'] = (
-                    df['GEOL_DESC'].str.contains(kw, case=False, na=False) | 
-                    df['Details'].str.contains(kw, case=False, na=False) | 
-                    (df['FI'].str.contains('N', na=False) & df['FI'].str.contains('R', na=False))
-                )
-            else:
-                df['No Recovery'] = (
-                    df['GEOL_DESC'].str.contains(kw, case=False, na=False) | 
-                    df['Details'].str.contains(kw, case=False, na=False)
-                )
+                no_recovery = no_recovery | _keyword_matches(df['FI'], ['N', 'R'], case=True).all(axis=1)
+            columns['No Recovery'] = no_recovery
         else:
-            df[str(kw)] = (
-                df['GEOL_DESC'].str.contains(kw, case=False, na=False) | 
-                df['Details'].str.contains(kw, case=False, na=False)
-            )
+            columns[kw] = hits[:, i]
     
-    return df
+    existing = [name for name in columns if name in df.columns]
+    for name in existing:
+        df[name] = columns.pop(name)
+    return pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
 
 
 # ============================================================================
 # MATCH SOIL TYPES FUNCTION
 # ============================================================================
 
-def match_soil_types(df_in, soil_type_list, grain_size_list):
+# Rule tables for match_soil_types. Each row tests one regex pattern on one
+# column; the rows of an option are OR-ed together, and where the option
+# matches, its code is written to the output column. Options selected later
+# (or with a higher priority) win. Options without rows fall back to
+# _default_rules.
+RULE_COLUMNS = ['option', 'field', 'pattern', 'case', 'output', 'code', 'priority']
+
+SOIL_TYPE_RULES = pd.DataFrame([
+    ('IV', 'WETH', 'IV', True, 'Soil Type', 'IV', 0),
+    ('V', 'WETH', 'V', True, 'Soil Type', 'V', 0),
+    ('VI (RESIDUAL SOIL)', 'WETH', 'VI', True, 'Soil Type', 'VI', 0),
+    ('VI (RESIDUAL SOIL)', 'GEOL_DESC', 'RESIDUAL SOIL', True, 'Soil Type', 'VI', 0),
+    ('TOPSOIL', 'GEOL_DESC', 'TOPSOIL', True, 'Soil Type', 'TS', 0),
+    ('TOPSOIL', 'GEOL', 'TOPSOIL', True, 'Soil Type', 'TS', 0),
+    ('TOPSOIL', 'GEOL_DESC', 'TOP SOIL', True, 'Soil Type', 'TS', 0),
+    ('TOPSOIL', 'GEOL', 'TOP SOIL', True, 'Soil Type', 'TS', 0),
+    ('MARINE DEPOSIT', 'GEOL_DESC', 'MARINE DEPOSIT', True, 'Soil Type', 'MD', 0),
+    ('MARINE DEPOSIT', 'GEOL', 'MARINE', True, 'Soil Type', 'MD', 0),
+    ('ALLUVIUM', 'GEOL_DESC', 'ALLUVIUM', True, 'Soil Type', 'ALL', 0),
+    ('ALLUVIUM', 'GEOL', 'ALL', True, 'Soil Type', 'ALL', 0),
+    ('COLLUVIUM', 'GEOL_DESC', 'COLLUVIUM', True, 'Soil Type', 'COLL', 0),
+    ('COLLUVIUM', 'GEOL', 'COLL', True, 'Soil Type', 'COLL', 0),
+    ('ESTUARINE DEPOSIT', 'GEOL_DESC', 'ESTUARINE DEPOSIT', True, 'Soil Type', 'ED', 0),
+    ('ESTUARINE DEPOSIT', 'GEOL', 'EST', True, 'Soil Type', 'ED', 0),
+    ('FILL', 'GEOL_DESC', 'FILL', True, 'Soil Type', 'FILL', 0),
+    ('FILL', 'GEOL', 'FILL', True, 'Soil Type', 'FILL', 0),
+], columns=RULE_COLUMNS)
+
+GRAIN_SIZE_RULES = pd.DataFrame([
+    (option, field, pattern, True, output, code, 0)
+    for option, output, code, patterns in [
+        ('CLAY', 'Clay', 'c', ('CLAY', 'CLAY', 'CLAY')),
+        ('FINE', 'Fine', 'c/z', ('SILT/CLAY', 'FINE', 'FINE')),
+        ('SILT', 'Silt', 'z', ('SILT', 'SILT', 'SILT')),
+        ('SAND', 'Sand', 's', ('SAND', 'SAND', 'SAND')),
+        ('GRAVEL', 'Gravel', 'g', ('GRAV', 'GRAV', 'GRAV')),
+        ('COBBLE', 'Cobble', 'cb', ('COBBLE', 'CBBL', 'COBBLE')),
+        ('BOULDER', 'Boulder', 'bd', ('BOULDER', 'BLDR', 'BOULDER')),
+    ]
+    for field, pattern in zip(('GEOL_DESC', 'GEOL', 'Details'), patterns)
+], columns=RULE_COLUMNS)
+
+
+def _default_rules(option, output):
+    """Rules for an option missing from the rule table: the option itself as a pattern."""
+    option = str(option)
+    if output == 'Soil Type':
+        fields = [('GEOL_DESC', True), ('GEOL', True)]
+    else:
+        output = option
+        fields = [('GEOL_DESC', True), ('GEOL', True), ('Details', False)]
+    return pd.DataFrame(
+        [(option, field, option, case, output, option, 0) for field, case in fields],
+        columns=RULE_COLUMNS
+    )
+
+
+def _evaluate_rules(df, options, rules, default_output, text_index=None):
+    """
+    Evaluate the rules of the selected options.
+    
+    Patterns are grouped by (column, case) and each group is matched in one
+    pass over the column's distinct values (_keyword_matches).
+    
+    Returns
+    -------
+    tuple
+        (masks, outputs, codes): a rows x options boolean array, and each
+        option's output column and code, with options ordered by priority
+        and then by their position in ``options``
+    """
+    rules = pd.DataFrame(rules)
+    missing = [c for c in ('option', 'field', 'pattern', 'code') if c not in rules.columns]
+    if missing:
+        raise ValueError(f"Rule table must contain columns: {', '.join(missing)}")
+    rules = rules.assign(
+        case=rules['case'] if 'case' in rules else True,
+        output=rules['output'] if 'output' in rules else default_output,
+        priority=rules['priority'] if 'priority' in rules else 0,
+    )
+    
+    by_option = {option: table for option, table in rules.groupby('option', sort=False)}
+    selected = []
+    for slot, option in enumerate(options):
+        table = by_option.get(option)
+        if table is None:
+            table = _default_rules(option, default_output)
+        selected.append(table.assign(slot=slot))
+    if not selected:
+        return np.zeros((len(df), 0), dtype=bool), np.array([], dtype=object), np.array([], dtype=object)
+    selected = pd.concat(selected, ignore_index=True)
+    
+    missing_fields = sorted(set(selected['field']) - set(df.columns))
+    if missing_fields:
+        raise ValueError(f"Input file must contain columns: {', '.join(missing_fields)}")
+    
+    masks = np.zeros((len(df), len(options)), dtype=bool)
+    for (field, case), table in selected.groupby(['field', 'case'], sort=False):
+        patterns = list(dict.fromkeys(table['pattern'].astype(str)))
+        hits = _keyword_matches(df[field], patterns, case=bool(case), text_index=text_index)
+        column_of = {pattern: i for i, pattern in enumerate(patterns)}
+        for slot, pattern in zip(table['slot'], table['pattern'].astype(str)):
+            masks[:, slot] |= hits[:, column_of[pattern]]
+    
+    first = selected.groupby('slot').first()
+    order = np.lexsort((first.index.to_numpy(), first['priority'].to_numpy()))
+    return (
+        masks[:, order],
+        first['output'].to_numpy(dtype=object)[order],
+        first['code'].astype(str).to_numpy(dtype=object)[order],
+    )
+
+
+def _last_match(masks, codes, missing=np.nan):
+    """Per row, the code of the last True column of ``masks``, else ``missing``."""
+    result = np.full(len(masks), missing, dtype=object)
+    if masks.shape[1]:
+        last = masks.shape[1] - 1 - np.argmax(masks[:, ::-1], axis=1)
+        matched = masks.any(axis=1)
+        result[matched] = codes[last[matched]]
+    return result
+
+
+def match_soil_types(df_in, soil_type_list, grain_size_list, soil_type_rules=None, grain_size_rules=None,
+                     text_index=None):
     """
     Match soil types and grain sizes from geological descriptions.
     
+    Soil types and grain sizes are options of the rule tables
+    SOIL_TYPE_RULES and GRAIN_SIZE_RULES (see RULE_COLUMNS); extend or
+    replace those tables to add rules without code changes. An option with
+    no rules is searched for as written in GEOL_DESC and GEOL (and, for
+    grain sizes, case-insensitively in Details).
+    
     Parameters
     ----------
     df_in : pd.DataFrame
@@ -493,6 +1513,12 @@ def match_soil_types(df_in, soil_type_list, grain_size_list):
         List of soil types to match
     grain_size_list : list
         List of grain sizes to match
+    soil_type_rules : pd.DataFrame or list of dict, optional
+        Soil type rule table; defaults to SOIL_TYPE_RULES
+    grain_size_rules : pd.DataFrame or list of dict, optional
+        Grain size rule table; defaults to GRAIN_SIZE_RULES
+    text_index : TextIndex, optional
+        Index built for df_in, used to narrow down the rows to test
     
     Returns
     -------
@@ -506,166 +1532,51 @@ def match_soil_types(df_in, soil_type_list, grain_size_list):
     missing_cols = [col for col in required_cols if col not in df.columns]
     if missing_cols:
         raise ValueError(f"Input file must contain columns: {', '.join(missing_cols)}")
-    
-    df['Soil Type/Grain Size'] = np.nan
-    df['Grain Size'] = np.nan
-    df['Soil Type'] = np.nan
-    
-    # Match soil types
-    for st in soil_type_list:
-        if st == 'IV' or st == 'V':
-            df.loc[df['WETH'].str.contains(str(st), case=True, na=False), 'Soil Type'] = str(st)
-        elif st == 'VI (RESIDUAL SOIL)':
-            df.loc[
-                (df['WETH'].str.contains('VI', case=True, na=False) | 
-                 df['GEOL_DESC'].str.contains('RESIDUAL SOIL', case=True, na=False)), 
-                'Soil Type'
-            ] = 'VI'
-        elif st == 'TOPSOIL':
-            df.loc[
-                (df['GEOL_DESC'].str.contains('TOPSOIL', case=True, na=False) | 
-                 df['GEOL'].str.contains('TOPSOIL', case=True, na=False) | 
-                 df['GEOL_DESC'].str.contains('TOP SOIL', case=True, na=False) | 
-                 df['GEOL'].str.contains('TOP SOIL', case=True, na=False)), 
-                'Soil Type'
-            ] = 'TS'
-        elif st == 'MARINE DEPOSIT':
-            df.loc[
-                (df['GEOL_DESC'].str.contains('MARINE DEPOSIT', case=True, na=False) | 
-                 df['GEOL'].str.contains('MARINE', case=True, na=False)), 
-                'Soil Type'
-            ] = 'MD'
-        elif st == 'ALLUVIUM':
-            df.loc[
-                (df['GEOL_DESC'].str.contains('ALLUVIUM', case=True, na=False) | 
-                 df['GEOL'].str.contains('ALL', case=True, na=False)), 
-                'Soil Type'
-            ] = 'ALL'
-        elif st == 'COLLUVIUM':
-            df.loc[
-                (df['GEOL_DESC'].str.contains('COLLUVIUM', case=True, na=False) | 
-                 df['GEOL'].str.contains('COLL', case=True, na=False)), 
-                'Soil Type'
-            ] = 'COLL'
-        elif st == 'ESTUARINE DEPOSIT':
-            df.loc[
-                (df['GEOL_DESC'].str.contains('ESTUARINE DEPOSIT', case=True, na=False) | 
-                 df['GEOL'].str.contains('EST', case=True, na=False)), 
-                'Soil Type'
-            ] = 'ED'
-        elif st == 'FILL':
-            df.loc[
-                (df['GEOL_DESC'].str.contains('FILL', case=True, na=False) | 
-                 df['GEOL'].str.contains('FILL', case=True, na=False)), 
-                'Soil Type'
-            ] = 'FILL'
+    if text_index is not None:
+        text_index.check(df)
+    
+    soil_masks, _, soil_codes = _evaluate_rules(
+        df, list(soil_type_list), SOIL_TYPE_RULES if soil_type_rules is None else soil_type_rules,
+        'Soil Type', text_index
+    )
+    grain_masks, grain_outputs, grain_codes = _evaluate_rules(
+        df, list(grain_size_list), GRAIN_SIZE_RULES if grain_size_rules is None else grain_size_rules,
+        'Grain Size', text_index
+    )
+    
+    soil_type = _last_match(soil_masks, soil_codes, missing='nan')
+    
+    # Grain sizes: the matching codes in rule order, joined once per distinct combination
+    grain_size = np.full(len(df), 'nan', dtype=object)
+    if grain_masks.shape[1]:
+        if grain_masks.shape[1] < 63:
+            # Pack each row's matches into an integer and hash those
+            weights = np.int64(1) << np.arange(grain_masks.shape[1], dtype=np.int64)
+            inverse = pd.factorize(grain_masks.astype(np.int64) @ weights)[0]
+            _, first = np.unique(inverse, return_index=True)
+            combos = grain_masks[first]
         else:
-            df.loc[
-                (df['GEOL_DESC'].str.contains(str(st), case=True, na=False) | 
-                 df['GEOL'].str.contains(str(st), case=True, na=False)), 
-                'Soil Type'
-            ] = str(st)
-    
-    # Match grain sizes - create individual columns first
-    grain_cols = []
-    for gs in grain_size_list:
-        if gs == 'CLAY':
-            col_name = 'Clay'
-            df.loc[
-                ((df['GEOL_DESC'].str.contains('CLAY', case=True, na=False) | 
-                  df['GEOL'].str.contains('CLAY', case=True, na=False) | 
-                  df['Details'].str.contains('CLAY', case=True, na=False)) & 
-                 df['Grain Size'].isna()), 
-                col_name
-            ] = 'c'
-            grain_cols.append(col_name)
-        elif gs == 'FINE':
-            col_name = 'Fine'
-            df.loc[
-                ((df['GEOL_DESC'].str.contains('SILT/CLAY', case=True, na=False) | 
-                  df['GEOL'].str.contains('FINE', case=True, na=False) | 
-                  df['Details'].str.contains('FINE', case=True, na=False)) & 
-                 df['Grain Size'].isna()), 
-                col_name
-            ] = 'c/z'
-            grain_cols.append(col_name)
-        elif gs == 'SILT':
-            col_name = 'Silt'
-            df.loc[
-                ((df['GEOL_DESC'].str.contains('SILT', case=True, na=False) | 
-                  df['GEOL'].str.contains('SILT', case=True, na=False) | 
-                  df['Details'].str.contains('SILT', case=True, na=False)) & 
-                 df['Grain Size'].isna()), 
-                col_name
-            ] = 'z'
-            grain_cols.append(col_name)
-        elif gs == 'SAND':
-            col_name = 'Sand'
-            df.loc[
-                ((df['GEOL_DESC'].str.contains('SAND', case=True, na=False) | 
-                  df['GEOL'].str.contains('SAND', case=True, na=False) | 
-                  df['Details'].str.contains('SAND', case=True, na=False)) & 
-                 df['Grain Size'].isna()), 
-                col_name
-            ] = 's'
-            grain_cols.append(col_name)
-        elif gs == 'GRAVEL':
-            col_name = 'Gravel'
-            df.loc[
-                ((df['GEOL_DESC'].str.contains('GRAV', case=True, na=False) | 
-                  df['GEOL'].str.contains('GRAV', case=True, na=False) | 
-                  df['Details'].str.contains('GRAV', case=True, na=False)) & 
-                 df['Grain Size'].isna()), 
-                col_name
-            ] = 'g'
-            grain_cols.append(col_name)
-        elif gs == 'COBBLE':
-            col_name = 'Cobble'
-            df.loc[
-                ((df['GEOL_DESC'].str.contains('COBBLE', case=True, na=False) | 
-                  df['GEOL'].str.contains('CBBL', case=True, na=False) | 
-                  df['Details'].str.contains('COBBLE', case=True, na=False)) & 
-                 df['Grain Size'].isna()), 
-                col_name
-            ] = 'cb'
-            grain_cols.append(col_name)
-        elif gs == 'BOULDER':
-            col_name = 'Boulder'
-            df.loc[
-                ((df['GEOL_DESC'].str.contains('BOULDER', case=True, na=False) | 
-                  df['GEOL'].str.contains('BLDR', case=True, na=False) | 
-                  df['Details'].str.contains('BOULDER', case=True, na=False)) & 
-                 df['Grain Size'].isna()), 
-                col_name
-            ] = 'bd'
-            grain_cols.append(col_name)
+            combos, inverse = np.unique(grain_masks, axis=0, return_inverse=True)
+        labels = np.array([','.join(grain_codes[combo]) or 'nan' for combo in combos], dtype=object)
+        grain_size = labels[inverse.reshape(-1)]
+    
+    df['Soil Type/Grain Size'] = pd.Series(soil_type, index=df.index) + '-' + pd.Series(grain_size, index=df.index)
+    
+    # One column per grain size output, holding its code where matched
+    new_columns = {}
+    for output in dict.fromkeys(grain_outputs):
+        own = grain_outputs == output
+        values = _last_match(grain_masks[:, own], grain_codes[own])
+        if output in df.columns:
+            matched = grain_masks[:, own].any(axis=1)
+            df.loc[matched, output] = values[matched]
         else:
-            col_name = str(gs)
-            df.loc[
-                ((df['GEOL_DESC'].str.contains(str(gs), case=True, na=False) | 
-                  df['GEOL'].str.contains(str(gs), case=True, na=False) | 
-                  df['Details'].str.contains(str(gs), case=False, na=False)) & 
-                 df['Grain Size'].isna()), 
-                col_name
-            ] = str(gs)
-            grain_cols.append(col_name)
-    
-    # Combine grain size columns
-    if grain_cols:
-        # Only use columns that exist
-        existing_grain_cols = [col for col in grain_cols if col in df.columns]
-        if existing_grain_cols:
-            df_gs = df[existing_grain_cols]
-            df['Grain Size'] = df_gs.stack().groupby(level=0).apply(lambda x: ','.join(x))
-    
-    # Create final combined column
-    df['Soil Type/Grain Size'] = df['Soil Type'].astype(str) + '-' + df['Grain Size'].astype(str)
+            new_columns[output] = values
+    df = pd.concat([df, pd.DataFrame(new_columns, index=df.index)], axis=1)
     
     # Clean up
     if 'Unnamed: 0' in df.columns:
         df = df.drop('Unnamed: 0', axis=1)
-    df = df.drop('Soil Type', axis=1)
-    df = df.drop('Grain Size', axis=1)
     
     return df
 
@@ -674,14 +1585,187 @@ def match_soil_types(df_in, soil_type_list, grain_size_list):
 # SEARCH DEPTH FUNCTION
 # ============================================================================
 
+def _expand_ranges(starts, ends):
+    """Concatenate np.arange(start, end) for each pair; also return each position's pair number."""
+    lengths = np.maximum(ends - starts, 0)
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return positions, owner
+
+
+class DepthIndex:
+    """
+    Per-hole interval index over combined AGS data, for bulk depth queries.
+    
+    Intervals with both depths are sorted by hole, DEPTH_FROM and DEPTH_TO,
+    with a running maximum of DEPTH_TO per hole. A query then finds its
+    candidate rows with two searchsorted calls: rows starting at or before
+    the query depth, minus those whose hole has ended above it. Build the
+    index once and pass it to search_depth to answer many queries.
+    
+    Parameters
+    ----------
+    df_data : pd.DataFrame
+        Combined AGS data with GIU_HOLE_ID, DEPTH_FROM and DEPTH_TO columns
+    """
+    
+    def __init__(self, df_data):
+        required_data_cols = ['GIU_HOLE_ID', 'DEPTH_FROM', 'DEPTH_TO']
+        for col in required_data_cols:
+            if col not in df_data.columns:
+                raise ValueError(f"Combined data must contain '{col}' column")
+        
+        self.data = df_data
+        self._holes = pd.Index(df_data['GIU_HOLE_ID'].dropna().unique())
+        codes = self._holes.get_indexer(df_data['GIU_HOLE_ID'])
+        top = pd.to_numeric(df_data['DEPTH_FROM'], errors='coerce').to_numpy(dtype=float)
+        base = pd.to_numeric(df_data['DEPTH_TO'], errors='coerce').to_numpy(dtype=float)
+        
+        # Rows missing a depth only ever match range queries; keep them aside
+        known = codes >= 0
+        closed = known & ~np.isnan(top) & ~np.isnan(base)
+        self._open_rows = np.flatnonzero(known & ~closed)
+        self._open = (codes[self._open_rows], top[self._open_rows], base[self._open_rows])
+        
+        rows = np.flatnonzero(closed)
+        rows = rows[np.lexsort((base[rows], top[rows], codes[rows]))]
+        self._rows = rows
+        self._codes = codes[rows]
+        self._top = top[rows]
+        self._base = base[rows]
+        reach = pd.Series(self._base).groupby(self._codes).cummax().to_numpy()
+        
+        # Exact (hole, depth) ordering as integers: hole * stride + depth rank
+        self._depths = np.unique(np.concatenate([self._top, self._base]))
+        self._stride = len(self._depths) + 1
+        self._top_keys = self._keys(self._codes, np.searchsorted(self._depths, self._top))
+        self._reach_keys = self._keys(self._codes, np.searchsorted(self._depths, reach))
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def _keys(self, codes, ranks):
+        return codes.astype(np.int64) * self._stride + ranks
+    
+    def _count_at_or_below(self, keys, codes, depths):
+        """Position after the rows of each hole whose key depth is <= depth."""
+        ranks = np.searchsorted(self._depths, depths, side='right')
+        return np.searchsorted(keys, self._keys(codes, ranks), side='left')
+    
+    def _count_below(self, keys, codes, depths):
+        """Position after the rows of each hole whose key depth is < depth."""
+        ranks = np.searchsorted(self._depths, depths, side='left')
+        return np.searchsorted(keys, self._keys(codes, ranks), side='left')
+    
+    def query_points(self, holes, depths):
+        """
+        Match depth points to the intervals containing them (DEPTH_FROM <= depth < DEPTH_TO).
+        
+        Parameters
+        ----------
+        holes : array-like
+            GIU_HOLE_ID of each query
+        depths : array-like
+            Depth of each query
+        
+        Returns
+        -------
+        tuple of np.ndarray
+            (query positions, data row positions), ordered by query and then
+            by row order in the data
+        """
+        codes = self._holes.get_indexer(pd.Index(holes))
+        depths = pd.to_numeric(pd.Series(depths), errors='coerce').to_numpy(dtype=float)
+        queries = np.flatnonzero((codes >= 0) & ~np.isnan(depths))
+        codes, depths = codes[queries], depths[queries]
+        
+        hi = self._count_at_or_below(self._top_keys, codes, depths)
+        lo = self._count_at_or_below(self._reach_keys, codes, depths)
+        positions, owner = _expand_ranges(lo, hi)
+        hit = self._base[positions] > depths[owner]
+        return self._ordered(queries[owner[hit]], self._rows[positions[hit]])
+    
+    def query_ranges(self, holes, depth_from, depth_to):
+        """
+        Match depth ranges to the intervals overlapping them.
+        
+        An interval overlaps unless it ends at or above DEPTH_FROM or starts
+        at or below DEPTH_TO; a missing depth on either side does not
+        exclude a match.
+        
+        Returns
+        -------
+        tuple of np.ndarray
+            (query positions, data row positions), as for query_points
+        """
+        codes = self._holes.get_indexer(pd.Index(holes))
+        q_top = pd.to_numeric(pd.Series(depth_from), errors='coerce').to_numpy(dtype=float)
+        q_base = pd.to_numeric(pd.Series(depth_to), errors='coerce').to_numpy(dtype=float)
+        q_top = np.where(np.isnan(q_top), -np.inf, q_top)
+        q_base = np.where(np.isnan(q_base), np.inf, q_base)
+        queries = np.flatnonzero(codes >= 0)
+        codes, q_top, q_base = codes[queries], q_top[queries], q_base[queries]
+        
+        hi = self._count_below(self._top_keys, codes, q_base)
+        lo = self._count_at_or_below(self._reach_keys, codes, q_top)
+        positions, owner = _expand_ranges(lo, hi)
+        hit = self._base[positions] > q_top[owner]
+        query_pos = [queries[owner[hit]]]
+        data_pos = [self._rows[positions[hit]]]
+        
+        if len(self._open_rows):
+            open_codes, open_top, open_base = self._open
+            pairs = pd.DataFrame({'query': np.arange(len(queries)), 'code': codes}).merge(
+                pd.DataFrame({'row': np.arange(len(open_codes)), 'code': open_codes}), on='code'
+            )
+            q, r = pairs['query'].to_numpy(), pairs['row'].to_numpy()
+            hit = ~((open_base[r] <= q_top[q]) | (open_top[r] >= q_base[q]))
+            query_pos.append(queries[q[hit]])
+            data_pos.append(self._open_rows[r[hit]])
+        
+        return self._ordered(np.concatenate(query_pos), np.concatenate(data_pos))
+    
+    @staticmethod
+    def _ordered(query_pos, data_pos):
+        order = np.lexsort((data_pos, query_pos))
+        return query_pos[order], data_pos[order]
+    
+    def search(self, df_depth, is_single_depth=True):
+        """Join depth queries to matching intervals; see search_depth."""
+        if is_single_depth:
+            if 'GIU_HOLE_ID' not in df_depth.columns or 'DEPTH' not in df_depth.columns:
+                raise ValueError("Depth query must contain 'GIU_HOLE_ID' and 'DEPTH' columns")
+            query_pos, data_pos = self.query_points(df_depth['GIU_HOLE_ID'], df_depth['DEPTH'])
+        else:
+            required_depth_cols = ['GIU_HOLE_ID', 'DEPTH_FROM', 'DEPTH_TO']
+            for col in required_depth_cols:
+                if col not in df_depth.columns:
+                    raise ValueError(f"Depth query must contain '{col}' column")
+            query_pos, data_pos = self.query_ranges(
+                df_depth['GIU_HOLE_ID'], df_depth['DEPTH_FROM'], df_depth['DEPTH_TO']
+            )
+        
+        # Query columns first; data columns of the same name replace them
+        queries = df_depth.iloc[query_pos].reset_index(drop=True)
+        matches = self.data.iloc[data_pos].reset_index(drop=True)
+        columns = list(df_depth.columns) + [c for c in self.data.columns if c not in df_depth.columns]
+        queries = queries.drop(columns=[c for c in self.data.columns if c in queries.columns])
+        return pd.concat([queries, matches], axis=1)[columns]
+
+
 def search_depth(df_data, df_depth, is_single_depth=True):
     """
     Extract data at specific depths or depth ranges.
     
+    Each query row is joined to every interval of its hole that contains
+    the depth (or overlaps the range); where query and data share a
+    column, the data value is kept.
+    
     Parameters
     ----------
-    df_data : pd.DataFrame
-        Combined AGS data
+    df_data : pd.DataFrame or DepthIndex
+        Combined AGS data, or a DepthIndex built from it to reuse across
+        calls
     df_depth : pd.DataFrame
         Depth query data with GIU_HOLE_ID and DEPTH or DEPTH_FROM/DEPTH_TO
     is_single_depth : bool
@@ -692,61 +1776,26 @@ def search_depth(df_data, df_depth, is_single_depth=True):
     pd.DataFrame
         Extracted data at specified depths
     """
-    # Check required columns in data
-    required_data_cols = ['GIU_HOLE_ID', 'DEPTH_FROM', 'DEPTH_TO']
-    for col in required_data_cols:
-        if col not in df_data.columns:
-            raise ValueError(f"Combined data must contain '{col}' column")
-    
-    # Check required columns in depth query
-    if is_single_depth:
-        if 'GIU_HOLE_ID' not in df_depth.columns or 'DEPTH' not in df_depth.columns:
-            raise ValueError("Depth query must contain 'GIU_HOLE_ID' and 'DEPTH' columns")
-    else:
-        required_depth_cols = ['GIU_HOLE_ID', 'DEPTH_FROM', 'DEPTH_TO']
-        for col in required_depth_cols:
-            if col not in df_depth.columns:
-                raise ValueError(f"Depth query must contain '{col}' column")
-    
-    # Prepare result dataframe
-    result_rows = []
-    
-    for idx, row in df_depth.iterrows():
-        hole_id = row['GIU_HOLE_ID']
-        
-        # Filter data for this borehole
-        hole_data = df_data[df_data['GIU_HOLE_ID'] == hole_id]
-        
-        if is_single_depth:
-            depth = row['DEPTH']
-            # Find intervals containing this depth
-            matching = hole_data[
-                (hole_data['DEPTH_FROM'] <= depth) & 
-                (hole_data['DEPTH_TO'] > depth)
-            ]
-        else:
-            depth_from = row['DEPTH_FROM']
-            depth_to = row['DEPTH_TO']
-            # Find intervals overlapping with this range
-            matching = hole_data[
-                ~((hole_data['DEPTH_TO'] <= depth_from) | 
-                  (hole_data['DEPTH_FROM'] >= depth_to))
-            ]
-        
-        # Add query information to results
-        for _, match_row in matching.iterrows():
-            result_row = row.to_dict()
-            result_row.update(match_row.to_dict())
-            result_rows.append(result_row)
-    
-    result_df = pd.DataFrame(result_rows)
-    return result_df
+    index = df_data if isinstance(df_data, DepthIndex) else DepthIndex(df_data)
+    return index.search(df_depth, is_single_depth)
 
 
 # ============================================================================
 # ROCKHEAD CALCULATION FUNCTION
 # ============================================================================
 
+# I = 1 (Fresh), II = 2 (Slightly), III = 3 (Moderately),
+# IV = 4 (Highly), V = 5 (Completely), VI = 6 (Residual Soil)
+WETH_GRADE_MAP = {
+    'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6,
+    'I/II': 1.5, 'II/I': 1.5,
+    'II/III': 2.5, 'III/II': 2.5,
+    'III/IV': 3.5, 'IV/III': 3.5,
+    'IV/V': 4.5, 'V/IV': 4.5,
+    'V/VI': 5.5, 'VI/V': 5.5
+}
+
+
 def weth_grade_to_numeric(df):
     """
     Convert weathering grade to numeric values.
@@ -761,30 +1810,51 @@ def weth_grade_to_numeric(df):
     pd.DataFrame
         Dataframe with additional WETH_GRAD_NUM column
     """
-    df = df.copy()
-    
     if 'WETH_GRAD' not in df.columns:
         raise ValueError("Dataframe must contain 'WETH_GRAD' column")
     
-    # Initialize numeric column
-    df['WETH_GRAD_NUM'] = np.nan
-    
-    # Map weathering grades to numeric values
-    # I = 1 (Fresh), II = 2 (Slightly), III = 3 (Moderately), 
-    # IV = 4 (Highly), V = 5 (Completely), VI = 6 (Residual Soil)
-    grade_map = {
-        'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6,
-        'I/II': 1.5, 'II/I': 1.5,
-        'II/III': 2.5, 'III/II': 2.5,
-        'III/IV': 3.5, 'IV/III': 3.5,
-        'IV/V': 4.5, 'V/IV': 4.5,
-        'V/VI': 5.5, 'VI/V': 5.5
-    }
+    df = df.copy()
+    df['WETH_GRAD_NUM'] = _weth_grade_numeric(df['WETH_GRAD'])
+    return df
+
+
+def _weth_grade_numeric(weth_grad):
+    """WETH_GRAD values -> float grades (NaN for unknown grades)."""
+    return weth_grad.map(WETH_GRADE_MAP).astype(float)
+
+
+def _rock_material_masks(df):
+    """
+    Rock material flags of each interval, as used by rock_material_criteria.
+    
+    Returns
+    -------
+    tuple of np.ndarray
+        (rock_mat including weak zones, rock_mat excluding them, Mod_Weak,
+        Weak, NR)
+    """
+    flags = []
+    for col in ('Mod_Weak', 'Weak', 'NR'):
+        flags.append((df[col] == 1).to_numpy() if col in df.columns else np.zeros(len(df), dtype=bool))
+    mod_weak, weak, nr = flags
     
-    for grade, num in grade_map.items():
-        df.loc[df['WETH_GRAD'] == grade, 'WETH_GRAD_NUM'] = num
+    # Check for no recovery indicators
+    if 'FI' in df.columns:
+        nr = nr | _keyword_matches(df['FI'], ['NR', 'N.R.'], case=True).any(axis=1)
     
-    return df
+    # Grade I-III (numeric <= 3) and not weathered/no recovery
+    with_weak = ((df['WETH_GRAD_NUM'] <= 3) & (df['WETH_GRAD'] != 'NI')).to_numpy() & ~nr
+    without_weak = with_weak & ~mod_weak & ~weak
+    return with_weak, without_weak, mod_weak, weak, nr
+
+
+def _add_rock_material(df, include_weak_zones):
+    """Add the rock material columns of rock_material_criteria to df in place."""
+    with_weak, without_weak, mod_weak, weak, nr = _rock_material_masks(df)
+    df['Mod_Weak'] = mod_weak
+    df['Weak'] = weak
+    df['NR'] = nr
+    df['rock_mat'] = with_weak if include_weak_zones else without_weak
 
 
 def rock_material_criteria(df, include_weak_zones=False):
@@ -804,48 +1874,102 @@ def rock_material_criteria(df, include_weak_zones=False):
         Dataframe with additional 'rock_mat' boolean column
     """
     sub_df = df.copy()
+    _add_rock_material(sub_df, include_weak_zones)
+    return sub_df
+
+
+def _rockhead_hole_column(df):
+    if 'HOLE_ID' in df.columns:
+        return 'HOLE_ID'
+    if 'GIU_HOLE_ID' in df.columns:
+        return 'GIU_HOLE_ID'
+    raise ValueError("DataFrame must contain 'HOLE_ID' or 'GIU_HOLE_ID' column")
+
+
+def _sorted_intervals(df, hole_col, top_col='DEPTH_FROM', base_col='DEPTH_TO'):
+    """
+    Order the intervals by hole and top depth.
     
-    # Initialize indicator columns if they don't exist
-    if 'Mod_Weak' not in sub_df.columns:
-        sub_df['Mod_Weak'] = False
-    if 'Weak' not in sub_df.columns:
-        sub_df['Weak'] = False
-    if 'NR' not in sub_df.columns:
-        sub_df['NR'] = False
-    
-    # Convert to boolean
-    sub_df['Mod_Weak'] = sub_df['Mod_Weak'] == 1
-    sub_df['Weak'] = sub_df['Weak'] == 1
-    sub_df['NR'] = sub_df['NR'] == 1
-    
-    # Check for no recovery indicators
-    if 'FI' in sub_df.columns:
-        sub_df['NR'] = sub_df['NR'] | sub_df['FI'].str.contains('NR', na=False) | sub_df['FI'].str.contains('N.R.', na=False)
+    Returns
+    -------
+    tuple
+        (holes in order of appearance, row order, hole code, top depth
+        and thickness per sorted row); rows of a missing hole are left out
+    """
+    codes, holes = pd.factorize(df[hole_col], use_na_sentinel=False)
+    # A missing hole ID never equals itself, so it has no intervals
+    codes[df[hole_col].isna().to_numpy()] = -1
+    top = pd.to_numeric(df[top_col], errors='coerce').to_numpy(dtype=float)
+    base = pd.to_numeric(df[base_col], errors='coerce').to_numpy(dtype=float)
+    order = np.lexsort((top, codes))
+    order = order[codes[order] >= 0]
+    return holes, order, codes[order], top[order], (base - top)[order]
+
+
+def _rock_runs(codes, thickness, rock):
+    """
+    Continuous runs of rock along each hole, for one or more rock masks.
     
-    # Determine rock material
-    # Grade I-III (numeric <= 3) and not weathered/no recovery
-    if include_weak_zones:
-        sub_df['rock_mat'] = (
-            (sub_df['WETH_GRAD_NUM'] <= 3) & 
-            (sub_df['WETH_GRAD'] != 'NI') &
-            (~sub_df['NR'])
-        )
-    else:
-        sub_df['rock_mat'] = (
-            (sub_df['WETH_GRAD_NUM'] <= 3) & 
-            (sub_df['WETH_GRAD'] != 'NI') &
-            (~sub_df['Mod_Weak']) & 
-            (~sub_df['Weak']) &
-            (~sub_df['NR'])
-        )
+    Parameters
+    ----------
+    codes : np.ndarray
+        Hole code of each interval, sorted by hole and depth
+    thickness : np.ndarray
+        Thickness of each interval
+    rock : np.ndarray
+        Boolean (intervals x masks) array of qualifying intervals
     
-    return sub_df
+    Returns
+    -------
+    pd.DataFrame
+        One row per run, in mask, hole and depth order: 'mask', 'hole',
+        'first' and 'last' (sorted positions of its top and bottom
+        intervals) and 'length', the longest running thickness it reaches. A missing thickness ends the
+        count of its run, as in the row-by-row walk.
+    """
+    n, n_masks = rock.shape
+    flat = rock.T.reshape(-1)
+    hole = np.tile(codes, n_masks)
+    mask = np.repeat(np.arange(n_masks), n)
+    
+    same = (hole[1:] == hole[:-1]) & (mask[1:] == mask[:-1])
+    starts = flat & ~np.r_[False, flat[:-1] & same]
+    ends = flat & ~np.r_[flat[1:] & same, False]
+    run = np.cumsum(starts)[flat] - 1
+    
+    thick = pd.Series(np.tile(thickness, n_masks)[flat])
+    # Sum each run in order, like the walk, and drop lengths after a missing thickness
+    length = thick.groupby(run).cumsum()
+    length[thick.isna().groupby(run).cummax().to_numpy()] = np.nan
+    
+    first = np.flatnonzero(starts)
+    return pd.DataFrame({
+        'mask': mask[first],
+        'hole': hole[first],
+        'first': first % max(n, 1),
+        'last': np.flatnonzero(ends) % max(n, 1),
+        'length': length.groupby(run).max().to_numpy(),
+    })
+
+
+def _first_runs(runs, continuous_length, n_masks, n_holes):
+    """Sorted position of the top of each (mask, hole)'s first run reaching continuous_length, or -1."""
+    found = np.full((n_masks, n_holes), -1, dtype=np.intp)
+    qualifying = runs[runs['length'] >= continuous_length]
+    # Runs are in depth order, so the first per (mask, hole) is the shallowest
+    qualifying = qualifying.drop_duplicates(['mask', 'hole'])
+    found[qualifying['mask'].to_numpy(), qualifying['hole'].to_numpy()] = qualifying['first'].to_numpy()
+    return found
 
 
 def calculate_rockhead(df, core_run=1.0, tcr_threshold=85, continuous_length=5, include_weak=False):
     """
     Calculate rockhead depth based on weathering grade and TCR criteria.
     
+    The rockhead of a hole is the top of its first continuous run of
+    rock_TCR intervals (in DEPTH_FROM order) whose thickness reaches
+    continuous_length. Runs are found for all holes at once (_rock_runs).
+    
     Parameters
     ----------
     df : pd.DataFrame
@@ -864,14 +1988,13 @@ def calculate_rockhead(df, core_run=1.0, tcr_threshold=85, continuous_length=5,
     dict
         Dictionary with 'summary' DataFrame and 'rockhead_depths' dict by HOLE_ID
     """
+    if 'WETH_GRAD' not in df.columns:
+        raise ValueError("Dataframe must contain 'WETH_GRAD' column")
+    
     # Prepare data
     df = df.copy()
-    
-    # Convert weathering grades to numeric
-    df = weth_grade_to_numeric(df)
-    
-    # Apply rock material criteria
-    df = rock_material_criteria(df, include_weak_zones=include_weak)
+    df['WETH_GRAD_NUM'] = _weth_grade_numeric(df['WETH_GRAD'])
+    _add_rock_material(df, include_weak)
     
     # Calculate rock_TCR (rock material AND TCR >= threshold)
     if 'TCR' in df.columns:
@@ -880,42 +2003,15 @@ def calculate_rockhead(df, core_run=1.0, tcr_threshold=85, continuous_length=5,
         df['rock_TCR'] = df['rock_mat']
     
     # Find rockhead for each borehole
-    rockhead_depths = {}
-    
-    if 'HOLE_ID' in df.columns:
-        hole_ids = df['HOLE_ID'].unique()
-    elif 'GIU_HOLE_ID' in df.columns:
-        hole_ids = df['GIU_HOLE_ID'].unique()
-    else:
-        raise ValueError("DataFrame must contain 'HOLE_ID' or 'GIU_HOLE_ID' column")
-    
-    for hole_id in hole_ids:
-        hole_data = df[df['HOLE_ID'] == hole_id] if 'HOLE_ID' in df.columns else df[df['GIU_HOLE_ID'] == hole_id]
-        hole_data = hole_data.sort_values('DEPTH_FROM')
-        
-        # Find first occurrence of continuous rock material
-        rockhead_depth = None
-        current_run_start = None
-        current_run_length = 0
-        
-        for idx, row in hole_data.iterrows():
-            if row['rock_TCR']:
-                if current_run_start is None:
-                    current_run_start = row['DEPTH_FROM']
-                    current_run_length = row['DEPTH_TO'] - row['DEPTH_FROM']
-                else:
-                    current_run_length += row['DEPTH_TO'] - row['DEPTH_FROM']
-                
-                # Check if we've met the continuous length criteria
-                if current_run_length >= continuous_length:
-                    rockhead_depth = current_run_start
-                    break
-            else:
-                # Reset if rock material is interrupted
-                current_run_start = None
-                current_run_length = 0
-        
-        rockhead_depths[hole_id] = rockhead_depth if rockhead_depth is not None else 'Not Found'
+    holes, order, codes, top, thickness = _sorted_intervals(df, _rockhead_hole_column(df))
+    rock = df['rock_TCR'].to_numpy(dtype=bool)[order]
+    runs = _rock_runs(codes, thickness, rock[:, None])
+    first = _first_runs(runs, continuous_length, 1, len(holes))[0]
+    
+    rockhead_depths = {
+        hole_id: float(top[pos]) if pos >= 0 else 'Not Found'
+        for hole_id, pos in zip(holes, first)
+    }
     
     # Create summary dataframe
     summary_df = pd.DataFrame([
@@ -930,6 +2026,178 @@ def calculate_rockhead(df, core_run=1.0, tcr_threshold=85, continuous_length=5,
     }
 
 
+def rockhead_sweep(df, tcr_thresholds=(85,), continuous_lengths=(5,), include_weak=(False,)):
+    """
+    Rockhead depth of every hole for every combination of parameters.
+    
+    Weathering grades, rock material flags and the depth order are computed
+    once. The runs for all (include_weak, tcr_threshold) combinations are
+    found together in one pass (_rock_runs), and each continuous_length
+    then only filters the runs. Each depth equals what calculate_rockhead
+    gives for the same parameters.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Combined geological data with HOLE_ID, DEPTH_FROM, DEPTH_TO, WETH_GRAD, TCR
+    tcr_thresholds : list of float
+        TCR thresholds to try (percent)
+    continuous_lengths : list of float
+        Required continuous lengths of rock material to try (m)
+    include_weak : list of bool
+        Whether to include weak zones in rock material
+    
+    Returns
+    -------
+    pd.DataFrame
+        One row per hole and parameter combination, with columns HOLE_ID,
+        tcr_threshold, continuous_length, include_weak and Rockhead_Depth
+        (NaN where no rockhead is found)
+    """
+    if 'WETH_GRAD' not in df.columns:
+        raise ValueError("Dataframe must contain 'WETH_GRAD' column")
+    hole_col = _rockhead_hole_column(df)
+    
+    criteria = [c for c in ('WETH_GRAD', 'Mod_Weak', 'Weak', 'NR', 'FI') if c in df.columns]
+    flags = df[criteria].assign(WETH_GRAD_NUM=_weth_grade_numeric(df['WETH_GRAD']))
+    with_weak, without_weak = _rock_material_masks(flags)[:2]
+    holes, order, codes, top, thickness = _sorted_intervals(df, hole_col)
+    
+    tcr_thresholds = list(tcr_thresholds)
+    include_weak = list(include_weak)
+    tcr = pd.to_numeric(df['TCR'], errors='coerce').to_numpy(dtype=float)[order] if 'TCR' in df.columns else None
+    rock = []
+    for weak in include_weak:
+        material = (with_weak if weak else without_weak)[order]
+        for threshold in tcr_thresholds:
+            rock.append(material & (tcr >= threshold) if tcr is not None else material)
+    rock = np.column_stack(rock) if rock else np.zeros((len(order), 0), dtype=bool)
+    runs = _rock_runs(codes, thickness, rock)
+    
+    # depths[length, weak, threshold, hole]
+    depths = np.full((len(continuous_lengths), len(include_weak) * len(tcr_thresholds), len(holes)), np.nan)
+    for i, length in enumerate(continuous_lengths):
+        first = _first_runs(runs, length, rock.shape[1], len(holes))
+        depths[i][first >= 0] = top[first[first >= 0]]
+    depths = depths.reshape(len(continuous_lengths), len(include_weak), len(tcr_thresholds), len(holes))
+    
+    # Tidy rows: hole, then tcr_threshold, continuous_length, include_weak
+    depths = depths.transpose(3, 2, 0, 1)
+    grid = pd.MultiIndex.from_product(
+        [holes, tcr_thresholds, list(continuous_lengths), include_weak],
+        names=['HOLE_ID', 'tcr_threshold', 'continuous_length', 'include_weak']
+    )
+    return pd.DataFrame({'Rockhead_Depth': depths.reshape(-1)}, index=grid).reset_index()
+
+
+# Weathering grade from BS 5930 terms in a description, where WETH_GRAD is missing;
+# the most weathered term found wins
+WETH_DESC_GRADES = [
+    (r'\bfresh\b', 1),
+    (r'\bslightly weathered\b', 2),
+    (r'\bmoderately weathered\b', 3),
+    (r'\bhighly weathered\b', 4),
+    (r'\bcompletely weathered\b', 5),
+    (r'\bresidual soil\b', 6),
+]
+
+# Soil materials in a description; marks an interval without any weathering grade as soil
+SOIL_DESC_PATTERN = r'\b(?:soil|clay|silt|sand|gravel|fill|peat)\b'
+
+# Accepted column names for the hole, top and base of an interval, by preference
+_INTERVAL_COLUMNS = {
+    'hole': ('HOLE_ID', 'GIU_HOLE_ID', 'LOCA_ID'),
+    'top': ('DEPTH_FROM', 'GEOL_TOP'),
+    'base': ('DEPTH_TO', 'GEOL_BASE'),
+}
+
+
+def _weathering_grades(df):
+    """Numeric weathering grade per interval from WETH_GRAD, else from GEOL_DESC terms."""
+    grades = np.full(len(df), np.nan)
+    if 'WETH_GRAD' in df.columns:
+        grades = _weth_grade_numeric(df['WETH_GRAD']).to_numpy(dtype=float)
+    if 'GEOL_DESC' in df.columns:
+        hits = _keyword_matches(df['GEOL_DESC'], [pattern for pattern, _ in WETH_DESC_GRADES])
+        values = np.array([grade for _, grade in WETH_DESC_GRADES], dtype=float)
+        described = np.fmax.reduce(np.where(hits, values, np.nan), axis=1)
+        grades = np.where(np.isnan(grades), described, grades)
+    return grades
+
+
+def detect_corestones(df, min_thickness=0.5, continuous_length=5):
+    """
+    Find corestones: rock-grade runs within the weathered profile.
+    
+    Intervals of weathering grade III or better (from WETH_GRAD, or from
+    the weathering terms of GEOL_DESC) are rock, grades IV-VI soil, and
+    intervals without a grade unknown. A corestone is a continuous run of
+    rock intervals with soil directly above and below it in the same hole
+    (an ungraded interval counts as soil only if its GEOL_DESC names a soil
+    material, see SOIL_DESC_PATTERN),
+    lying above the rockhead, which is the top of the first run of rock at
+    least continuous_length thick (as in calculate_rockhead). Runs are
+    found for all holes at once (_rock_runs).
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Intervals with a hole column (HOLE_ID, GIU_HOLE_ID or LOCA_ID), top
+        and base depths (DEPTH_FROM/DEPTH_TO or GEOL_TOP/GEOL_BASE) and
+        WETH_GRAD and/or GEOL_DESC
+    min_thickness : float
+        Minimum corestone thickness in meters (default: 0.5)
+    continuous_length : float
+        Rock thickness that marks the rockhead in meters (default: 5)
+    
+    Returns
+    -------
+    pd.DataFrame
+        One row per corestone with the hole, top and base columns of df
+        and THICKNESS
+    """
+    columns = {}
+    for role, names in _INTERVAL_COLUMNS.items():
+        columns[role] = next((name for name in names if name in df.columns), None)
+    if df.empty:
+        return pd.DataFrame(columns=[c for c in columns.values() if c] + ['THICKNESS'])
+    missing = [names[0] for role, names in _INTERVAL_COLUMNS.items() if columns[role] is None]
+    if missing or ('WETH_GRAD' not in df.columns and 'GEOL_DESC' not in df.columns):
+        raise ValueError(
+            "DataFrame must contain hole, top and base depth columns and WETH_GRAD or GEOL_DESC"
+        )
+    hole_col, top_col, base_col = columns['hole'], columns['top'], columns['base']
+    
+    holes, order, codes, top, thickness = _sorted_intervals(df, hole_col, top_col, base_col)
+    base = top + thickness
+    grades = _weathering_grades(df)[order]
+    rock = grades <= 3
+    soil = grades > 3
+    if 'GEOL_DESC' in df.columns:
+        described_soil = _keyword_matches(df['GEOL_DESC'], [SOIL_DESC_PATTERN])[order, 0]
+        soil |= np.isnan(grades) & described_soil
+    runs = _rock_runs(codes, thickness, rock[:, None])
+    
+    # Runs at or below each hole's rockhead are bedrock
+    rockhead = _first_runs(runs, continuous_length, 1, len(holes))[0]
+    limit = np.where(rockhead >= 0, rockhead, len(order))
+    first, last = runs['first'].to_numpy(), runs['last'].to_numpy()
+    run_hole = runs['hole'].to_numpy()
+    # Sandwiched: the neighbouring intervals are in the same hole and of a known soil grade
+    above, below = np.maximum(first - 1, 0), np.minimum(last + 1, len(order) - 1)
+    soil_above = (first > 0) & (codes[above] == run_hole) & soil[above]
+    soil_below = (last + 1 < len(order)) & (codes[below] == run_hole) & soil[below]
+    corestone = soil_above & soil_below & (first < limit[run_hole])
+    
+    result = pd.DataFrame({
+        hole_col: holes[codes[first[corestone]]],
+        top_col: top[first[corestone]],
+        base_col: base[last[corestone]],
+    })
+    result['THICKNESS'] = result[base_col] - result[top_col]
+    return result[result['THICKNESS'] >= min_thickness].reset_index(drop=True)
+
+
 # ============================================================================
 # Q-VALUE CALCULATION FUNCTION (Placeholder)
 # ============================================================================
@@ -975,15 +2243,88 @@ def calculate_q_value(df, rqd_col='RQD', jn=9, jr=1, ja=1, jw=1, srf=1):
     df['Q_value'] = (df['RQD_numeric'] / jn) * (jr / ja) * (jw / srf)
     
     # Classify rock mass quality based on Q-value
-    df['Rock_Quality'] = 'Unknown'
-    df.loc[df['Q_value'] < 0.01, 'Rock_Quality'] = 'Exceptionally Poor'
-    df.loc[(df['Q_value'] >= 0.01) & (df['Q_value'] < 0.1), 'Rock_Quality'] = 'Extremely Poor'
-    df.loc[(df['Q_value'] >= 0.1) & (df['Q_value'] < 1), 'Rock_Quality'] = 'Very Poor'
-    df.loc[(df['Q_value'] >= 1) & (df['Q_value'] < 4), 'Rock_Quality'] = 'Poor'
-    df.loc[(df['Q_value'] >= 4) & (df['Q_value'] < 10), 'Rock_Quality'] = 'Fair'
-    df.loc[(df['Q_value'] >= 10) & (df['Q_value'] < 40), 'Rock_Quality'] = 'Good'
-    df.loc[(df['Q_value'] >= 40) & (df['Q_value'] < 100), 'Rock_Quality'] = 'Very Good'
-    df.loc[(df['Q_value'] >= 100) & (df['Q_value'] < 400), 'Rock_Quality'] = 'Extremely Good'
-    df.loc[df['Q_value'] >= 400, 'Rock_Quality'] = 'Exceptionally Good'
+    df['Rock_Quality'] = interpret_q_value(df['Q_value'])
     
     return df
+
+
+# Q-value class boundaries: a Q of Q_CLASS_BOUNDS[i - 1] up to Q_CLASS_BOUNDS[i] is Q_CLASSES[i]
+Q_CLASS_BOUNDS = np.array([0.01, 0.1, 1, 4, 10, 40, 100, 400])
+Q_CLASSES = np.array([
+    'Exceptionally Poor', 'Extremely Poor', 'Very Poor', 'Poor', 'Fair',
+    'Good', 'Very Good', 'Extremely Good', 'Exceptionally Good'
+], dtype=object)
+
+
+def interpret_q_value(q_value):
+    """
+    Rock mass quality class of Q-values.
+    
+    Parameters
+    ----------
+    q_value : float, array-like or pd.Series
+        Q-value(s)
+    
+    Returns
+    -------
+    str, np.ndarray or pd.Series
+        Quality class per value, 'Unknown' where Q is missing; a Series
+        keeps its index
+    """
+    q = pd.to_numeric(pd.Series(q_value) if np.ndim(q_value) else pd.Series([q_value]), errors='coerce')
+    q = q.to_numpy(dtype=float)
+    classes = Q_CLASSES[np.searchsorted(Q_CLASS_BOUNDS, np.nan_to_num(q, nan=0.0), side='right')]
+    classes[np.isnan(q)] = 'Unknown'
+    if isinstance(q_value, pd.Series):
+        return pd.Series(classes, index=q_value.index, name=q_value.name)
+    return classes if np.ndim(q_value) else classes[0]
+
+
+def calculate_q_values_bulk(df, rqd_col='RQD', jn_col='Jn', jr_col='Jr', ja_col='Ja', jw_col='Jw', srf_col='SRF',
+                            jn=9, jr=1, ja=1, jw=1, srf=1):
+    """
+    Calculate Q-values row by row from per-row or default joint parameters.
+    
+    Q = (RQD/Jn) × (Jr/Ja) × (Jw/SRF)
+    
+    Each parameter is taken from its column when df has it, and from the
+    matching scalar otherwise. Rows with RQD outside 0-100 or a parameter
+    that is missing or not positive get a NaN Q_VALUE.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe with RQD data
+    rqd_col : str
+        Name of RQD column (default: 'RQD')
+    jn_col, jr_col, ja_col, jw_col, srf_col : str or None
+        Columns holding Jn, Jr, Ja, Jw and SRF per row
+    jn, jr, ja, jw, srf : float
+        Values used where the parameter column is absent (or None)
+    
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe with additional Q_VALUE and Rock_Quality columns
+    """
+    if rqd_col not in df.columns:
+        raise ValueError(f"DataFrame must contain '{rqd_col}' column")
+    
+    def values(col, default):
+        if col is not None and col in df.columns:
+            return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+        return np.full(len(df), float(default))
+    
+    rqd = values(rqd_col, np.nan)
+    params = np.vstack([values(jn_col, jn), values(jr_col, jr), values(ja_col, ja),
+                        values(jw_col, jw), values(srf_col, srf)])
+    valid = (rqd >= 0) & (rqd <= 100) & (params > 0).all(axis=0)
+    
+    j_n, j_r, j_a, j_w, s_rf = params
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q = np.where(valid, (rqd / j_n) * (j_r / j_a) * (j_w / s_rf), np.nan)
+    
+    df = df.copy()
+    df['Q_VALUE'] = q
+    df['Rock_Quality'] = interpret_q_value(df['Q_VALUE'])
+    return df
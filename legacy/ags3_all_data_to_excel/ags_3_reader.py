@@ -9,6 +9,15 @@ from typing import Dict, List, Tuple, Optional #what types of data you expect (f
 
 import re #Provides tools for finding patterns in text 
 
+import sys
+
+# Group pre-scan (byte-offset index) and line tokenizer are shared with the AGS-Processor core
+try:
+    from ags_core import iter_group_blocks, split_ags_line
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "AGS-Processor"))
+    from ags_core import iter_group_blocks, split_ags_line
+
 # --------------------------------------------------------------------------------------
 # Setup logging
 # --------------------------------------------------------------------------------------
@@ -22,29 +31,38 @@ logger = logging.getLogger(__name__)
 
 def _split_quoted_csv(s: str) -> List[str]:
     
-    """Splits a CSV string, respecting quoted fields(outsourced regex)"""
+    """Splits a CSV string, respecting quoted fields (shared linear-time tokenizer)"""
     
-    return [p.strip().strip('"') for p in re.split(r',(?=(?:[^"]*"[^"]*")*[^"]*$)', s)]
+    return split_ags_line(s)
 
-def parse_ags_file(file_bytes: bytes) -> Dict[str, pd.DataFrame]:  #function patses bytes to a dictionary of dataframes using pandas 
+def parse_ags_file(file_bytes: bytes, warnings: Optional[List[str]] = None,
+                   groups: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:  #function patses bytes to a dictionary of dataframes using pandas 
+    """Parse AGS3 bytes into {group: DataFrame}.
 
-    text = file_bytes.decode("latin-1", errors="ignore") #decodes using latin-1 encoding
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()] #lines strip and text split into lines
+    If a ``warnings`` list is given, data rows whose item count differs from
+    the headings are reported into it (with line numbers) during the same pass.
+    If ``groups`` is given, only those GROUP blocks are decoded and tokenized
+    (located by a byte-offset pre-scan); ``file_bytes`` may then also be an mmap.
+    """
+
+    if groups is None:
+        text = file_bytes.decode("latin-1", errors="ignore") #decodes using latin-1 encoding
+        lines = [(n, ln.strip()) for n, ln in enumerate(text.splitlines(), start=1) if ln.strip()] #(line number, stripped line) for non-blank lines
+    else:
+        lines = [
+            (first_line + n, ln.strip())
+            for _, block, first_line in iter_group_blocks(file_bytes, groups)
+            for n, ln in enumerate(block.decode("latin-1", errors="ignore").splitlines())
+            if ln.strip()
+        ]
 
     group_data: Dict[str, List[Dict[str, str]]] = {}  #group_data is a dictionary where keys are strings and values are lists of dictionaries with string keys and values
     current_group: Optional[str] = None #current_group is an optional string that starts as None
     headings: List[str] = [] #headings is a list of strings that starts empty
     is_header_continuation = False #is_header_continuation is a boolean that starts as False
 
-    def _split_line(line: str) -> List[str]:
-        """ split a CSV line, handling quoted fields."""
-        # This regex handles commas inside quotes
-        parts = re.split(r',(?=(?:[^"]*"[^"]*")*[^"]*$)', line)
-        # Strip quotes and whitespace from each part
-        return [p.strip().strip('"') for p in parts] 
-
-    for line in lines:
-        parts = _split_line(line)
+    for line_num, line in lines:
+        parts = split_ags_line(line)
         first_field = parts[0]
         
         
@@ -96,6 +114,12 @@ def parse_ags_file(file_bytes: bytes) -> Dict[str, pd.DataFrame]:  #function pat
 
         # Data Row
         if headings and parts:
+            if warnings is not None and len(parts) != len(headings):
+                warnings.append(
+                    f"WARNING: Line {line_num} in group {current_group}: "
+                    f"Row has {len(parts)} items but {len(headings)} headings expected. "
+                    f"Row data: {parts[:min(5, len(parts))]}..."
+                )
             # Ensure row has the same number of columns as headings
             row_values = parts[:len(headings)]
             # Pad row with empty strings if it's shorter than headings
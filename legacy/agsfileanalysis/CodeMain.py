@@ -13,7 +13,7 @@ import plotly.express as px
 
 # External modules
 from agsparser import analyze_ags_content, _split_quoted_csv, parse_ags_file
-from cleaners import deduplicate_cell, drop_singleton_rows, expand_rows, combine_groups, coalesce_columns, to_numeric_safe, normalize_columns
+from cleaners import deduplicate_cell, drop_singleton_rows, expand_rows, clean_group, combine_groups, coalesce_columns, to_numeric_safe, normalize_columns
 from triaxial import generate_triaxial_table, generate_triaxial_with_lithology, calculate_s_t_values, remove_duplicate_tests
 
 from excel_util import  add_st_charts_to_excel, build_all_groups_excel, remove_duplicate_tests
@@ -76,14 +76,10 @@ if uploaded_files:
             # 3) Normalize column names
             df = normalize_columns(df)
 
-            # 4) Drop rows where only one cell is populated
-            df = drop_singleton_rows(df)
-
-            # 5) Expand any multi-interval rows into one record per interval
-            df = expand_rows(df)
-
-            # 6) Clean up duplicate values within each cell
-            df = df.map(deduplicate_cell)
+            # 4-6) Drop rows where only one cell is populated, expand any
+            # multi-interval rows into one record per interval and clean up
+            # duplicate values within each cell, in one pass
+            df = clean_group(df)
 
             # 7) Unify depth columns
             coalesce_columns(df, ["DEPTH_FROM", "START_DEPTH"], "DEPTH_FROM")
@@ -171,9 +167,7 @@ if uploaded_files:
         if "LOCA_ID" in giu_df.columns and "HOLE_ID" not in giu_df.columns:
             giu_df = giu_df.rename(columns={"LOCA_ID": "HOLE_ID"})
     
-        giu_df = drop_singleton_rows(giu_df)
-        giu_df = expand_rows(giu_df)
-        giu_df = giu_df.applymap(deduplicate_cell)
+        giu_df = clean_group(giu_df)
         coalesce_columns(giu_df, ["DEPTH_FROM","START_DEPTH"], "DEPTH_FROM")
         coalesce_columns(giu_df, ["DEPTH_TO","END_DEPTH"],     "DEPTH_TO")
         to_numeric_safe(giu_df, ["DEPTH_FROM","DEPTH_TO"])
@@ -236,11 +230,13 @@ if uploaded_files:
         st_cols      = [c for c in ["s","t","s_total","s_effective","s_source","TEST_TYPE","SOURCE_FILE"]
                 if c in st_df.columns]
     
-        tri_df_with_st = (
-            tri_df
-              .merge(st_df[merge_keys + st_cols], on=merge_keys, how="left")
-              .pipe(remove_duplicate_tests)
+        tri_df_with_st, removed = remove_duplicate_tests(
+            tri_df.merge(st_df[merge_keys + st_cols], on=merge_keys, how="left"),
+            return_report=True,
         )
+        if removed.sum():
+            st.caption("Duplicate tests removed per file: " +
+                       ", ".join(f"{src}: {n}" for src, n in removed[removed > 0].items()))
     
         # ─── 6) Display summary ─────────────────────────────────────────────
         st.write(f"**Triaxial summary (with s, t & lithology)** — {len(tri_df_with_st)} rows")
@@ -1,26 +1,22 @@
 from typing import Dict, List,Tuple
-import re
+import sys
+from pathlib import Path
 import pandas as pd
 
+# Shared linear-time line tokenizer from the AGS-Processor core
+try:
+    from ags_core import split_ags_line
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "AGS-Processor"))
+    from ags_core import split_ags_line
+
 # --------------------------------------------------------------------------------------
 ### split quotes in the AGS
 # --------------------------------------------------------------------------------------
 
 def _split_quoted_csv(line: str) -> List[str]:
     
-    s = line.strip() #remove whitespace
-  
-    if s.startswith('"') and s.endswith('"') and '","' in s: 
-      
-        parts = [p.replace('""', '"') for p in s.split('","')]  # split by '","' and replaces any escaped double quotes ("") with a single quote (")
-      
-        #remove outermost quotes
-        parts[0] = parts[0].lstrip('"') 
-        parts[-1] = parts[-1].rstrip('"')
-      
-        return parts
- 
-    return [p.strip().strip('"') for p in re.split(r',(?=(?:[^"]*"[^"]*")*[^"]*$)', s)] #regex in case some errors, splits only on commas outside quotes
+    return split_ags_line(line.strip()) #splits only on commas outside quotes, "" -> " inside quoted fields
 
 
 # --------------------------------------------------------------------------------------
@@ -1,13 +1,91 @@
-from scipy.stats import linregress
+from typing import Optional, Sequence, Tuple
 import numpy as np
+import pandas as pd
 
-def estimate_strength_params(df: pd.DataFrame) -> Tuple[float, float]:
-    df = df.dropna(subset=["s", "t"])
+# Grouping columns used by fit_strength_params when present in the s–t table
+STRENGTH_GROUP_COLUMNS = ["LITH", "LITHOLOGY", "TEST_TYPE", "SOURCE_FILE"]
+
+
+def fit_strength_params(
+    st_df: pd.DataFrame,
+    by: Optional[Sequence[str]] = None,
+    s_col: str = "s",
+    t_col: str = "t",
+) -> pd.DataFrame:
+    """
+    Fit a Mohr–Coulomb s–t line (t = intercept + slope·s) for every group at once.
+
+    Takes the output of calculate_s_t_values and solves each group's least
+    squares line in closed form from grouped sums of the centred s, t, s²,
+    st and t², so thousands of groups cost one groupby rather than one
+    regression each. phi' = asin(slope) and c' = intercept / cos(phi').
+
+    Parameters
+    ----------
+    st_df : DataFrame with s and t columns
+    by    : grouping columns; defaults to the STRENGTH_GROUP_COLUMNS present
+            (an empty list fits the whole table as one group)
+
+    Returns one row per group with the group keys and
+    n_tests, slope, intercept, r_squared, phi_deg, cohesion.
+    Groups with fewer than two distinct s values get NaN parameters; a
+    slope outside [-1, 1] gives NaN phi_deg and cohesion.
+    """
+    if by is None:
+        by = [c for c in STRENGTH_GROUP_COLUMNS if c in st_df.columns]
+    by = list(by)
+    out_cols = by + ["n_tests", "slope", "intercept", "r_squared", "phi_deg", "cohesion"]
+
+    df = st_df[by].copy()
+    df["_s"] = pd.to_numeric(st_df[s_col], errors="coerce")
+    df["_t"] = pd.to_numeric(st_df[t_col], errors="coerce")
+    df = df[np.isfinite(df["_s"]) & np.isfinite(df["_t"])]
     if df.empty:
+        return pd.DataFrame(columns=out_cols)
+
+    # Factorize the group keys once; everything after works on integer codes
+    if by:
+        grouper = df.groupby(by, dropna=False, sort=True, observed=True)
+        codes, groups = grouper.ngroup().to_numpy(), grouper.size().index
+    else:
+        codes, groups = np.zeros(len(df), dtype=np.int64), pd.RangeIndex(1)
+    s_vals, t_vals = df["_s"].to_numpy(), df["_t"].to_numpy()
+
+    n_tests = np.bincount(codes)
+    s_mean = np.bincount(codes, s_vals) / n_tests
+    t_mean = np.bincount(codes, t_vals) / n_tests
+    # Centre on the group means before squaring so large s and t stay well conditioned
+    ds, dt = s_vals - s_mean[codes], t_vals - t_mean[codes]
+    ss, st, tt = np.bincount(codes, ds * ds), np.bincount(codes, ds * dt), np.bincount(codes, dt * dt)
+    # Compare ranges rather than ss/tt > 0, which round-off in the means can fake
+    ranges = pd.DataFrame({"s": s_vals, "t": t_vals}).groupby(codes).agg(["min", "max"])
+    s_varies = (ranges[("s", "max")] > ranges[("s", "min")]).to_numpy()
+    t_varies = (ranges[("t", "max")] > ranges[("t", "min")]).to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(s_varies, st / ss, np.nan)
+        intercept = t_mean - slope * s_mean
+        r_squared = np.where(s_varies & t_varies, st ** 2 / (ss * tt), np.nan)
+        phi = np.arcsin(slope)
+        cohesion = intercept / np.cos(phi)
+
+    result = pd.DataFrame({
+        "n_tests": n_tests,
+        "slope": slope,
+        "intercept": intercept,
+        "r_squared": r_squared,
+        "phi_deg": np.degrees(phi),
+        "cohesion": cohesion,
+    }, index=groups)
+    if not by:
+        return result.reset_index(drop=True)
+    return result.reset_index()[out_cols]
+
+
+def estimate_strength_params(df: pd.DataFrame) -> Tuple[float, float]:
+    params = fit_strength_params(df, by=[])
+    if params.empty:
         return (np.nan, np.nan)
 
-    slope, intercept, _, _, _ = linregress(df["s"], df["t"])
-    phi = np.degrees(np.arcsin(slope))
-    cohesion = intercept / np.cos(np.radians(phi))
+    phi, cohesion = params.loc[0, ["phi_deg", "cohesion"]]
     return round(phi, 2), round(cohesion, 2)
-
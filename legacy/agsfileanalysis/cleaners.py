@@ -1,4 +1,6 @@
 
+import functools
+
 import pandas as pd
 import numpy as np
 from typing import List, Tuple, Dict
@@ -8,59 +10,122 @@ def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+SEPARATOR = " | "
+
+
+def _encode_column(s: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Factorize a column into (codes, texts): texts holds str(value) once per
+    distinct value and missing cells get code -1, so per-value string work
+    runs once per unique value instead of once per cell.
+    """
+    if s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) not in ("string", "empty"):
+        # Mixed objects: key on the text so that e.g. 1 and 1.0 stay apart
+        codes, texts = pd.factorize(s.map(str, na_action="ignore"))
+        return codes, np.asarray(texts, dtype=object)
+    codes, uniques = pd.factorize(s)
+    return codes, np.array([str(u) for u in uniques], dtype=object)
+
+
+def _filled_cells(encoded: List[Tuple[np.ndarray, np.ndarray]], n_rows: int) -> np.ndarray:
+    """Count cells per row that are neither missing nor blank/whitespace-only."""
+    filled = np.zeros(n_rows, dtype=np.int64)
+    for codes, texts in encoded:
+        blank = np.array([not t.strip() for t in texts] + [True], dtype=bool)
+        filled += ~blank[codes]
+    return filled
+
+
 def drop_singleton_rows(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
-    # Treat empty strings and whitespace as NaN
-    pd.set_option('future.no_silent_downcasting', True)  # Add this line once at the beginning of the script
-    clean = df.replace(r"^\s*$", np.nan, regex=True).infer_objects(copy=False)
-    nn = clean.notna().sum(axis=1)
-    return df.loc[nn > 1].reset_index(drop=True)
+    # Empty strings and whitespace count as missing
+    encoded = [_encode_column(df.iloc[:, j]) for j in range(df.shape[1])]
+    return df.loc[_filled_cells(encoded, len(df)) > 1].reset_index(drop=True)
+
+
+@functools.lru_cache(maxsize=65536)
+def _deduplicate_text(text: str) -> str:
+    unique_parts = dict.fromkeys(p.strip() for p in text.split(SEPARATOR))
+    unique_parts.pop("", None)
+    return SEPARATOR.join(unique_parts)
+
 
 def deduplicate_cell(cell):
     if pd.isna(cell):
         return cell
-    parts = [p.strip() for p in str(cell).split(" | ")]
-    unique_parts = []
-    for p in parts:
-        if p and p not in unique_parts:
-            unique_parts.append(p)
-    return " | ".join(unique_parts)
+    return _deduplicate_text(str(cell))
+
+
+def _expand_encoded(
+    columns: pd.Index,
+    encoded: List[Tuple[np.ndarray, np.ndarray]],
+    rows: np.ndarray,
+    deduplicate: bool,
+) -> pd.DataFrame:
+    """
+    Explode ' | ' multi-valued cells of the given rows (see expand_rows).
+
+    Rows are repeated by their longest split and each column picks its i-th
+    part (or "" past its own length), which is DataFrame.explode with ragged
+    columns padded instead of rejected.
+    """
+    split = []
+    for codes, texts in encoded:
+        parts = [t.split(SEPARATOR) for t in texts] + [[""]]  # last entry: missing cell
+        n_parts = np.array([len(p) for p in parts], dtype=np.int64)
+        same = np.array([len(set(p)) == 1 for p in parts], dtype=bool)
+        flat = [q for p in parts for q in p]
+        if deduplicate:
+            flat = [_deduplicate_text(q) for q in flat]
+        offsets = np.cumsum(n_parts) - n_parts
+        c = codes[rows]
+        split.append((np.where(c < 0, len(texts), c), n_parts, offsets, np.array(flat, dtype=object), same))
+
+    # A row whose cells all repeat one value (e.g. "A | A") collapses to a single row
+    n_cells = np.ones(len(rows), dtype=np.int64)
+    collapse = np.ones(len(rows), dtype=bool)
+    for c, n_parts, _, _, same in split:
+        n_cells = np.maximum(n_cells, n_parts[c])
+        collapse &= (n_parts[c] > 1) & same[c]
+    repeat = np.where(collapse, 1, n_cells)
+
+    source = np.repeat(np.arange(len(rows)), repeat)
+    part = np.arange(len(source)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+    data = {}
+    for j, (c, n_parts, offsets, flat, _) in enumerate(split):
+        c = c[source]
+        n = n_parts[c]
+        data[j] = np.where(part < n, flat[offsets[c] + np.minimum(part, n - 1)], "")
+    out = pd.DataFrame(data, index=pd.RangeIndex(len(source)))
+    out.columns = columns
+    return out
 
 
 def expand_rows(df: pd.DataFrame) -> pd.DataFrame:
     """
     Expand rows where any cell contains ' | ' separated values,
     but skip expansion if all split values across columns are identical.
+    All cells come back as strings, with "" for missing values.
     """
-    expanded_rows = []
-
-    for _, row in df.iterrows():
-        split_values = {
-            col: (str(row[col]).split(" | ") if pd.notna(row[col]) else [""])
-            for col in df.columns
-        }
-
-        # Check if all columns have the same repeated value
-        all_same = all(
-            len(set(values)) == 1 for values in split_values.values()
-        )
-
-        if all_same and all(len(values) > 1 for values in split_values.values()):
-            # If all values are the same and repeated, keep as single row
-            new_row = {col: split_values[col][0] for col in df.columns}
-            expanded_rows.append(new_row)
-        else:
-            # Expand into multiple rows
-            max_len = max(len(v) for v in split_values.values()) if split_values else 1
-            for i in range(max_len):
-                new_row = {
-                    col: (split_values[col][i] if i < len(split_values[col]) else "")
-                    for col in df.columns
-                }
-                expanded_rows.append(new_row)
-
-    return pd.DataFrame(expanded_rows) 
+    encoded = [_encode_column(df.iloc[:, j]) for j in range(df.shape[1])]
+    return _expand_encoded(df.columns, encoded, np.arange(len(df)), deduplicate=False)
+
+
+def clean_group(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fused drop_singleton_rows -> expand_rows -> map(deduplicate_cell).
+
+    Each column is factorized once and all string work (blank checks,
+    splitting, deduplication) runs per distinct value, so the result equals
+    the three-step pipeline without its per-cell Python calls or
+    intermediate frames.
+    """
+    if df.empty:
+        return df
+    encoded = [_encode_column(df.iloc[:, j]) for j in range(df.shape[1])]
+    rows = np.flatnonzero(_filled_cells(encoded, len(df)) > 1)
+    return _expand_encoded(df.columns, encoded, rows, deduplicate=True)
 
 def combine_groups(all_group_dfs: List[Tuple[str, Dict[str, pd.DataFrame]]]) -> Dict[str, pd.DataFrame]:
     """
@@ -2,6 +2,7 @@ from typing import Dict
 import pandas as pd 
 import io
 from cleaners import drop_singleton_rows
+from triaxial import remove_duplicate_tests  # noqa: F401 - re-exported for existing imports
 
 def build_all_groups_excel(groups: Dict[str, pd.DataFrame]) -> bytes:
     """
@@ -88,40 +89,3 @@ def add_st_charts_to_excel(writer: pd.ExcelWriter, st_df: pd.DataFrame, sheet_na
     add_scatter("s′–t (Effective stress)", "s_effective", "t", "B2")
     # s–t (total)
     add_scatter("s–t (Total stress)", "s_total", "t", "B25")
-    
-def remove_duplicate_tests(df: pd.DataFrame) -> pd.DataFrame:
- 
-    if df.empty:
-        return df
-    
-    # Define key columns that should be unique for each test
-    key_cols = [
-        'HOLE_ID', 'SPEC_DEPTH', 'CELL', 'DEVF', 'PWPF', 
-        'TEST_TYPE', 'SOURCE_FILE'
-    ]
-    
-    # Use only columns that actually exist in the DataFrame
-    available_cols = [col for col in key_cols if col in df.columns]
-    
-    # If we have at least 3 identifying columns, use them for deduplication
-    if len(available_cols) >= 3:
-        # Create a copy of the relevant columns
-        temp_df = df[available_cols].copy()
-        
-        # Convert float columns to rounded strings for consistent comparison
-        for col in temp_df.columns:
-            if pd.api.types.is_float_dtype(temp_df[col]):
-                # Round floats to 2 decimal places and convert to string
-                temp_df[col] = temp_df[col].apply(lambda x: f"{x:.2f}" if not pd.isna(x) else "")
-            else:
-                # Convert non-float columns to string
-                temp_df[col] = temp_df[col].astype(str)
-        
-        # Create a combined string representation for each row
-        temp_df['combined'] = temp_df.apply(lambda row: '|'.join(row.values), axis=1)
-        
-        # Identify duplicates while keeping the first occurrence
-        mask = ~temp_df.duplicated(subset=['combined'], keep='first')
-        df = df[mask].reset_index(drop=True)
-    
-    return df
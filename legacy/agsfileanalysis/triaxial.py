@@ -107,10 +107,76 @@ def generate_triaxial_table(groups: Dict[str, pd.DataFrame]) -> pd.DataFrame:
 # Lithology Mapping
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+def lookup_intervals(
+    holes: pd.Series,
+    depths: pd.Series,
+    intervals: pd.DataFrame,
+    value_col: str,
+    hole_col: str = "HOLE_ID",
+    from_col: str = "DEPTH_FROM",
+    to_col: str = "DEPTH_TO",
+) -> pd.Series:
+    """
+    Look up the interval containing each (hole, depth) point, as a sorted interval join.
+
+    Boundary rules:
+      - intervals are closed, DEPTH_FROM <= depth <= DEPTH_TO, so a depth on a
+        shared boundary falls in both neighbouring intervals
+      - when several intervals contain a depth, the one with the shallowest
+        DEPTH_FROM wins (the upper one at a shared boundary); ties keep the
+        first in table order
+      - points with a missing hole or depth, and intervals with a missing
+        hole, top or base, never match
+
+    Returns a Series of value_col aligned to ``depths`` (None where nothing matches).
+    """
+    result = np.full(len(depths), None, dtype=object)
+
+    # One integer code per hole over both tables, so holes compare as they
+    # would in a dict lookup; missing holes get code -1
+    codes = pd.factorize(pd.concat([intervals[hole_col], holes], ignore_index=True))[0]
+    iv_hole, pt_hole = codes[:len(intervals)], codes[len(intervals):]
+    top = pd.to_numeric(intervals[from_col], errors="coerce").to_numpy(dtype=float)
+    base = pd.to_numeric(intervals[to_col], errors="coerce").to_numpy(dtype=float)
+    depth = pd.to_numeric(depths, errors="coerce").to_numpy(dtype=float)
+
+    keep = np.flatnonzero((iv_hole >= 0) & ~np.isnan(top) & ~np.isnan(base))
+    point = np.flatnonzero((pt_hole >= 0) & ~np.isnan(depth))
+    if not len(keep) or not len(point):
+        return pd.Series(result, index=depths.index)
+    iv_hole, top, base = iv_hole[keep], top[keep], base[keep]
+    pt_hole, depth = pt_hole[point], depth[point]
+
+    # Sort by hole then top; within a hole the running max of the base is
+    # non-decreasing, so the first interval whose running max reaches the depth
+    # is the shallowest-topped interval that can still contain it
+    order = np.argsort(top, kind="stable")
+    order = order[np.argsort(iv_hole[order], kind="stable")]
+    iv_hole, top = iv_hole[order], top[order]
+    reach = pd.Series(base[order]).groupby(iv_hole).cummax().to_numpy()
+
+    # Rank reach and depth together so (hole, value) packs into one sortable integer
+    ranks = np.unique(np.concatenate([reach, depth]), return_inverse=True)[1]
+    width = ranks.max() + 1
+    iv_key = iv_hole.astype(np.int64) * width + ranks[:len(reach)]
+    pt_key = pt_hole.astype(np.int64) * width + ranks[len(reach):]
+
+    pos = np.searchsorted(iv_key, pt_key, side="left")
+    found = pos < len(iv_key)
+    pos = np.minimum(pos, len(iv_key) - 1)
+    found &= (iv_hole[pos] == pt_hole) & (top[pos] <= depth)
+
+    values = intervals[value_col].to_numpy(dtype=object)[keep[order]]
+    matched = values[pos[found]]
+    result[point[found]] = np.where(pd.isna(matched), None, matched)
+    return pd.Series(result, index=depths.index)
+
+
 def generate_triaxial_with_lithology(groups: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     """
     Builds triaxial summary table and maps lithology from GIU group based on depth ranges.
-    Optimized for large GIU files by grouping intervals by HOLE_ID.
+    Specimens are joined to GIU intervals per HOLE_ID in one sorted pass (see lookup_intervals
+    for the boundary rules).
     """
     triaxial_df = generate_triaxial_table(groups)
     giu = groups.get("GIU", pd.DataFrame()).copy()
@@ -124,26 +190,12 @@ def generate_triaxial_with_lithology(groups: Dict[str, pd.DataFrame]) -> pd.Data
     coalesce_columns(giu, ["GEOL_DESC", "GEOL_GEOL", "GEOL_GEO2"], "LITHOLOGY")
     to_numeric_safe(giu, ["DEPTH_FROM", "DEPTH_TO"])
 
-    giu_by_hole = {
-        hole: df.dropna(subset=["DEPTH_FROM", "DEPTH_TO"])
-        for hole, df in giu.groupby("HOLE_ID")
-    }
-
-    def map_litho(row):
-        hole = row.get("HOLE_ID")
-        depth = row.get("SPEC_DEPTH")
-        if pd.isna(hole) or pd.isna(depth):
-            return None
-        giu_rows = giu_by_hole.get(hole)
-        if giu_rows is None:
-            return None
-        match = giu_rows[
-            (giu_rows["DEPTH_FROM"] <= depth) &
-            (giu_rows["DEPTH_TO"] >= depth)
-        ]
-        return match["LITHOLOGY"].iloc[0] if not match.empty else None
-
-    triaxial_df["LITHOLOGY"] = triaxial_df.apply(map_litho, axis=1)
+    triaxial_df["LITHOLOGY"] = lookup_intervals(
+        triaxial_df.get("HOLE_ID", pd.Series(np.nan, index=triaxial_df.index)),
+        pd.to_numeric(triaxial_df.get("SPEC_DEPTH", pd.Series(np.nan, index=triaxial_df.index)), errors="coerce"),
+        giu,
+        "LITHOLOGY",
+    )
     return triaxial_df
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -223,29 +275,53 @@ def calculate_s_t_values(df: pd.DataFrame) -> pd.DataFrame:
 # Deduplication
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-def remove_duplicate_tests(df: pd.DataFrame) -> pd.DataFrame:
+DUPLICATE_KEY_COLUMNS = [
+    'HOLE_ID', 'SPEC_DEPTH', 'CELL', 'DEVF', 'PWPF',
+    'TEST_TYPE', 'SOURCE_FILE'
+]
+
+
+def remove_duplicate_tests(df: pd.DataFrame, decimals: int = 2, return_report: bool = False):
     """
     Removes duplicate triaxial test rows based on key identifiers.
+
+    Float key columns are rounded to ``decimals`` places (missing values
+    compare equal) and the key columns are hashed row-wise with
+    ``pd.util.hash_pandas_object``. Rows sharing a hash are then compared on
+    the rounded keys themselves, so a hash collision never drops a distinct
+    test; the first row of each set of equal keys is kept. Deduplication
+    needs at least 3 of DUPLICATE_KEY_COLUMNS.
+
+    With ``return_report=True`` returns (df, report), where report is a
+    Series of rows removed per SOURCE_FILE (zero for files that lost none).
+    The counts are of rows whose keys are equal after rounding to
+    ``decimals``, not only of exact duplicates.
     """
-    if df.empty:
+    if 'SOURCE_FILE' in df.columns:
+        sources = df['SOURCE_FILE'].to_numpy()
+    else:
+        sources = np.full(len(df), '(no source)', dtype=object)
+    keep = np.ones(len(df), dtype=bool)
+    available_cols = [col for col in DUPLICATE_KEY_COLUMNS if col in df.columns]
+
+    if not df.empty and len(available_cols) >= 3:
+        keys = {}
+        for col in available_cols:
+            values = df[col]
+            if pd.api.types.is_float_dtype(values):
+                # + 0.0 folds -0.0 into 0.0 so both round to the same key
+                values = values.round(decimals) + 0.0
+            keys[col] = values
+        keys = pd.DataFrame(keys)
+        hashes = pd.util.hash_pandas_object(keys, index=False)
+        # Only rows whose hash repeats can be duplicates; confirm them on the keys
+        candidates = hashes.duplicated(keep=False).to_numpy()
+        if candidates.any():
+            keep[candidates] = ~keys[candidates].duplicated(keep='first').to_numpy()
+        df = df[keep].reset_index(drop=True)
+
+    if not return_report:
         return df
-
-    key_cols = [
-        'HOLE_ID', 'SPEC_DEPTH', 'CELL', 'DEVF', 'PWPF',
-        'TEST_TYPE', 'SOURCE_FILE'
-    ]
-    available_cols = [col for col in key_cols if col in df.columns]
-
-    if len(available_cols) >= 3:
-        temp_df = df[available_cols].copy()
-        for col in temp_df.columns:
-            if pd.api.types.is_float_dtype(temp_df[col]):
-                temp_df[col] = temp_df[col].apply(lambda x: f"{x:.2f}" if not pd.isna(x) else "")
-            else:
-                temp_df[col] = temp_df[col].astype(str)
-
-        temp_df['combined'] = temp_df.apply(lambda row: '|'.join(row.values), axis=1)
-        mask = ~temp_df.duplicated(subset=['combined'], keep='first')
-        df = df[mask].reset_index(drop=True)
-
-    return df
+    report = pd.Series(~keep).groupby(sources, dropna=False).sum().rename('rows_removed')
+    report.index.name = 'SOURCE_FILE'
+    return df, report
@@ -27,6 +27,9 @@ setup(
         "xlsxwriter>=3.0.0",
         "streamlit>=1.28.0",
     ],
+    extras_require={
+        "parquet": ["pyarrow>=7.0.0"],
+    },
     entry_points={
         "console_scripts": [
             "ags-processor=ags_processor.cli:main",
@@ -111,6 +111,50 @@ class TestGeotechnicalCalculations(unittest.TestCase):
         self.assertEqual(rockhead['BH01'], 5.0)
         self.assertEqual(rockhead['BH02'], 3.0)
     
+    def test_calculate_rockhead_first_continuous_run(self):
+        """Test that rockhead is the top of the first long enough run of rock."""
+        data = pd.DataFrame({
+            'GIU_HOLE_ID': ['G_BH2', 'G_BH1', 'G_BH1', 'G_BH1', 'G_BH1', 'G_BH2'],
+            'DEPTH_FROM': [0.0, 3.0, 0.0, 1.0, 6.0, 2.0],
+            'DEPTH_TO': [2.0, 6.0, 1.0, 3.0, 9.0, 4.0],
+            'WETH_GRAD': ['V', 'II', 'III', 'IV', 'I', 'III'],
+            'TCR': [100, 95, 100, 100, 90, 50],
+        })
+        result = self.calc.calculate_rockhead(data, tcr_threshold=85, continuous_length=5)
+        
+        # BH1: 0-1 is too short and 1-3 interrupts; 3-9 is continuous rock
+        self.assertEqual(result['rockhead_depths'], {'G_BH2': 'Not Found', 'G_BH1': 3.0})
+        self.assertEqual(list(result['summary']['HOLE_ID']), ['G_BH2', 'G_BH1'])
+        self.assertEqual(list(result['detailed_data']['rock_TCR']), [False, True, True, False, True, False])
+        
+    def test_rockhead_sweep_matches_single_runs(self):
+        """Test that a parameter sweep gives each combination's calculate_rockhead depth."""
+        data = pd.DataFrame({
+            'HOLE_ID': ['BH1', 'BH1', 'BH1', 'BH2', 'BH2'],
+            'DEPTH_FROM': [0.0, 1.0, 3.0, 0.0, 2.0],
+            'DEPTH_TO': [1.0, 3.0, 8.0, 2.0, 4.0],
+            'WETH_GRAD': ['III', 'II', 'I', 'II', 'III'],
+            'TCR': [80, 90, 100, 100, 95],
+            'Weak': [0, 1, 0, 0, 0],
+        })
+        sweep = self.calc.rockhead_sweep(
+            data, tcr_thresholds=[75, 85], continuous_lengths=[2, 5], include_weak=[False, True]
+        )
+        self.assertEqual(len(sweep), 2 * 2 * 2 * 2)
+        self.assertEqual(
+            list(sweep.columns),
+            ['HOLE_ID', 'tcr_threshold', 'continuous_length', 'include_weak', 'Rockhead_Depth']
+        )
+        for row in sweep.itertuples():
+            expected = self.calc.calculate_rockhead(
+                data, tcr_threshold=row.tcr_threshold, continuous_length=row.continuous_length,
+                include_weak=row.include_weak
+            )['rockhead_depths'][row.HOLE_ID]
+            if expected == 'Not Found':
+                self.assertTrue(np.isnan(row.Rockhead_Depth))
+            else:
+                self.assertEqual(row.Rockhead_Depth, expected)
+        
     def test_rockhead_detection_empty(self):
         """Test rockhead detection with empty dataframe."""
         geol_data = pd.DataFrame()
@@ -140,12 +184,13 @@ class TestGeotechnicalCalculations(unittest.TestCase):
     def test_corestone_detection_min_thickness(self):
         """Test corestone detection with thickness filter."""
         geol_data = pd.DataFrame({
-            'LOCA_ID': ['BH01', 'BH01'],
-            'GEOL_TOP': [0.0, 1.0],
-            'GEOL_BASE': [1.0, 1.3],
+            'LOCA_ID': ['BH01', 'BH01', 'BH01'],
+            'GEOL_TOP': [0.0, 1.0, 1.3],
+            'GEOL_BASE': [1.0, 1.3, 2.0],
             'GEOL_DESC': [
                 'SOIL - weathered',
-                'GRANITE - fresh (corestone)'
+                'GRANITE - fresh (corestone)',
+                'SOIL - highly weathered'
             ]
         })
         
@@ -157,6 +202,34 @@ class TestGeotechnicalCalculations(unittest.TestCase):
         corestones = self.calc.detect_corestones(geol_data, min_thickness=1.0)
         self.assertEqual(len(corestones), 0)
     
+    def test_corestones_stop_at_rockhead(self):
+        """Test that rock runs at or below the rockhead are not corestones."""
+        data = pd.DataFrame({
+            'GIU_HOLE_ID': ['G_BH1'] * 6 + ['G_BH2'] * 2,
+            'DEPTH_FROM': [0.0, 1.0, 2.5, 3.0, 4.0, 10.0, 0.0, 2.0],
+            'DEPTH_TO': [1.0, 2.5, 3.0, 4.0, 10.0, 12.0, 2.0, 3.0],
+            'WETH_GRAD': ['V', 'II', 'III', 'IV', 'I', 'II', 'II', 'V'],
+        })
+        corestones = self.calc.detect_corestones(data, min_thickness=0.5)
+        
+        # G_BH1: 1.0-3.0 is a corestone, 4.0-12.0 is rockhead; G_BH2 starts in rock
+        self.assertEqual(list(corestones.columns), ['GIU_HOLE_ID', 'DEPTH_FROM', 'DEPTH_TO', 'THICKNESS'])
+        self.assertEqual(corestones.values.tolist(), [['G_BH1', 1.0, 3.0, 2.0]])
+        self.assertTrue(self.calc.detect_corestones(data, min_thickness=2.5).empty)
+    
+    def test_corestones_need_known_soil_on_both_sides(self):
+        """Test that unproven rock at the base of a hole and ungraded neighbours are not corestones."""
+        data = pd.DataFrame({
+            'HOLE_ID': ['BH1'] * 3 + ['BH2'] * 3 + ['BH3'] * 3,
+            'DEPTH_FROM': [0.0, 2.0, 4.0] * 3,
+            'DEPTH_TO': [2.0, 4.0, 5.0] * 3,
+            'WETH_GRAD': ['V', 'IV', 'II', None, 'II', None, 'V', 'II', 'IV'],
+        })
+        corestones = self.calc.detect_corestones(data, min_thickness=0.5)
+        
+        # BH1 ends in rock (no rockhead proven), BH2's rock lies between ungraded intervals
+        self.assertEqual(corestones.values.tolist(), [['BH3', 2.0, 4.0, 2.0]])
+    
     def test_q_value_bulk_calculation(self):
         """Test bulk Q-value calculation."""
         data = pd.DataFrame({
@@ -194,6 +267,22 @@ class TestGeotechnicalCalculations(unittest.TestCase):
         self.assertTrue(pd.isna(result.iloc[1]['Q_VALUE']))
         self.assertTrue(pd.isna(result.iloc[2]['Q_VALUE']))
     
+    def test_q_value_bulk_defaults_and_classes(self):
+        """Missing parameter columns fall back to scalar defaults; classes are vectorized."""
+        data = pd.DataFrame({'RQD': [90, 45, 120], 'Jn': [9, 9, 9]}, index=[10, 20, 30])
+        
+        result = self.calc.calculate_q_values_bulk(data, jr=2)
+        
+        self.assertEqual(list(result.index), [10, 20, 30])
+        self.assertAlmostEqual(result.loc[10, 'Q_VALUE'], 20.0)
+        self.assertAlmostEqual(result.loc[20, 'Q_VALUE'], 10.0)
+        self.assertTrue(pd.isna(result.loc[30, 'Q_VALUE']))
+        self.assertEqual(result['Rock_Quality'].tolist(), ['Good', 'Good', 'Unknown'])
+        self.assertEqual(
+            list(self.calc.interpret_q_value(np.array([0.005, 4, 400]))),
+            ['Exceptionally Poor', 'Fair', 'Exceptionally Good']
+        )
+    
     def test_rqd_estimation_from_fractures(self):
         """Test RQD estimation from fracture frequency."""
         # Low fracture frequency -> high RQD
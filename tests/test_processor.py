@@ -47,6 +47,558 @@ class TestAGSProcessor(unittest.TestCase):
         self.assertEqual(summary['total_errors'], 0)
         self.assertEqual(summary['total_tables'], 0)
         
+    def test_mismatched_rows_reported_in_single_pass(self):
+        """Test that row-length warnings come from the parsing pass itself."""
+        filepath = os.path.join(self.test_dir, 'mismatch.ags')
+        with open(filepath, 'w') as f:
+            f.write(
+                '"**HOLE"\n'
+                '"*HOLE_ID","*HOLE_TYPE"\n'
+                '"<UNITS>",""\n'
+                '"BH1","CP"\n'
+                '"BH2"\n'
+            )
+        groups = self.processor.read_file(filepath)
+        self.assertEqual(len(groups['HOLE']), 2)
+        warnings = self.processor.errors['mismatch.ags']
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('Line 5 in group HOLE', warnings[0])
+        
+        processor = AGSProcessor()
+        groups = processor.read_file(filepath, skip_mismatched_rows=True)
+        self.assertEqual(len(groups['HOLE']), 1)
+        self.assertTrue(processor.errors['mismatch.ags'][0].endswith('SKIPPED'))
+        
+    def test_ags4_columns_typed_from_type_row(self):
+        """Test that AGS4 UNIT/TYPE rows become metadata and drive column dtypes."""
+        import pandas as pd
+        from tests.sample_data import create_sample_ags4_file
+        filepath = os.path.join(self.test_dir, 'sample.ags')
+        create_sample_ags4_file(filepath)
+        
+        groups = self.processor.read_file(filepath)
+        loca = groups['LOCA']
+        self.assertEqual(len(loca), 2)
+        self.assertEqual(loca['LOCA_GL'].dtype, 'float64')
+        self.assertIsInstance(loca['LOCA_ID'].dtype, pd.CategoricalDtype)
+        self.assertEqual(loca.attrs['units']['LOCA_GL'], 'm')
+        self.assertEqual(loca.attrs['types']['LOCA_NATE'], '2DP')
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(groups['TRAN']['TRAN_DATE']))
+        
+    def test_iter_groups_streams_groups_in_file_order(self):
+        """Test that iter_groups yields one (name, frame, metadata) per GROUP block."""
+        from ags_processor.processor import iter_groups
+        from tests.sample_data import create_sample_ags4_file
+        filepath = os.path.join(self.test_dir, 'sample.ags')
+        create_sample_ags4_file(filepath)
+        
+        with open(filepath, 'rb') as f:
+            stream = iter_groups(f)
+            name, df, metadata = next(stream)
+            self.assertEqual(name, 'PROJ')
+            self.assertEqual(len(df), 1)
+            names = [name] + [g for g, _, _ in stream]
+        
+        self.assertEqual(names, ['PROJ', 'TRAN', 'LOCA', 'GEOL', 'SAMP'])
+        self.assertEqual(metadata['headings'][0], 'PROJ_ID')
+        self.assertEqual(metadata['types']['PROJ_NAME'], 'X')
+        
+    def test_read_file_selected_groups(self):
+        """Test that only requested groups are loaded via the group index."""
+        from ags_processor import index_groups
+        from tests.sample_data import create_sample_ags4_file
+        filepath = os.path.join(self.test_dir, 'sample.ags')
+        create_sample_ags4_file(filepath)
+        
+        index = index_groups(filepath)
+        self.assertEqual(list(index), ['PROJ', 'TRAN', 'LOCA', 'GEOL', 'SAMP'])
+        offset, length, line = index['LOCA']
+        with open(filepath, 'rb') as f:
+            f.seek(offset)
+            self.assertTrue(f.read(length).startswith(b'"GROUP","LOCA"'))
+        self.assertEqual(line, 13)
+        
+        groups = self.processor.read_file(filepath, groups=['LOCA', 'GEOL'])
+        self.assertEqual(sorted(groups), ['GEOL', 'LOCA'])
+        self.assertEqual(len(groups['GEOL']), 6)
+        
+    def test_read_csv_engine_matches_python_parser(self):
+        """Test that the read_csv engine gives the same tables and falls back on bad rows."""
+        import pandas as pd
+        from ags_processor.processor import AGS4_to_dataframe
+        from tests.sample_data import create_sample_ags4_file
+        filepath = os.path.join(self.test_dir, 'sample.ags')
+        create_sample_ags4_file(filepath)
+        with open(filepath, 'a') as f:
+            f.write('\n"GROUP","HOLE"\n"HEADING","LOCA_ID","HOLE_DPTH"\n"UNIT","","m"\n'
+                    '"TYPE","ID","2DP"\n"DATA","BH1","5.00"\n"DATA","BH2"\n')
+        
+        python_warnings = []
+        expected, _ = AGS4_to_dataframe(filepath, warnings=python_warnings)
+        self.assertEqual(len(python_warnings), 1)
+        for engine in ('c', 'pyarrow'):
+            engine_warnings = []
+            tables, _ = AGS4_to_dataframe(filepath, warnings=engine_warnings, engine=engine)
+            self.assertEqual(list(tables), list(expected))
+            for group in expected:
+                pd.testing.assert_frame_equal(tables[group], expected[group])
+            self.assertEqual(engine_warnings, python_warnings)
+        
+    def test_read_csv_engine_decodes_non_utf8_units(self):
+        """Test that a latin-1 byte in a UNIT row parses like the Python parser."""
+        import pandas as pd
+        from ags_processor.processor import AGS4_to_dataframe
+        filepath = os.path.join(self.test_dir, 'latin1.ags')
+        with open(filepath, 'wb') as f:
+            f.write(b'"GROUP","TEMP"\r\n"HEADING","LOCA_ID","TEMP_DPTH","TEMP_VAL"\r\n'
+                    b'"UNIT","","m","\xb0C"\r\n"TYPE","ID","2DP","1DP"\r\n'
+                    b'"DATA","BH1","1.00","12.5"\r\n')
+
+        expected, _ = AGS4_to_dataframe(filepath)
+        for engine in ('c', 'pyarrow'):
+            tables, _ = AGS4_to_dataframe(filepath, engine=engine)
+            pd.testing.assert_frame_equal(tables['TEMP'], expected['TEMP'])
+            self.assertEqual(tables['TEMP'].attrs, expected['TEMP'].attrs)
+        
+    def test_read_multiple_files_with_workers(self):
+        """Test that a process-pool read merges results and errors in input order."""
+        import pandas as pd
+        from tests.sample_data import create_sample_ags4_file
+        filepaths = []
+        for name in ('b.ags', 'a.ags'):
+            filepaths.append(os.path.join(self.test_dir, name))
+            create_sample_ags4_file(filepaths[-1])
+        filepaths.append(os.path.join(self.test_dir, 'missing.ags'))
+        
+        sequential = AGSProcessor()
+        expected = sequential.read_multiple_files(filepaths)
+        results = self.processor.read_multiple_files(filepaths, workers=2)
+        
+        self.assertEqual(list(results), list(expected))
+        self.assertEqual(self.processor.processed_files, ['b.ags', 'a.ags'])
+        self.assertEqual(self.processor.errors, sequential.errors)
+        self.assertIn(filepaths[-1], self.processor.errors)
+        for group, df in sequential.tables.items():
+            pd.testing.assert_frame_equal(self.processor.tables[group], df)
+        
+    def test_consolidated_tables_keep_column_dtypes(self):
+        """Test that groups from several files are built once with a resolved schema."""
+        import pandas as pd
+        from tests.sample_data import create_sample_ags4_file
+        first = os.path.join(self.test_dir, 'first.ags')
+        second = os.path.join(self.test_dir, 'second.ags')
+        create_sample_ags4_file(first)
+        create_sample_ags4_file(second)
+        
+        self.processor.read_file(first)
+        self.processor.read_file(second)
+        self.processor.tables['LOCA']  # build, then add a file with an extra column
+        extra = self.processor.file_data['first.ags']['LOCA'].assign(LOCA_REM='x')
+        self.processor._store_parsed('third.ags', 'AGS4', {'LOCA': extra}, [])
+        
+        schema = self.processor.get_schema('LOCA')
+        self.assertEqual(schema['LOCA_GL'], 'float64')
+        self.assertEqual(schema['LOCA_REM'], object)
+        loca = self.processor.get_table('LOCA')
+        self.assertEqual(len(loca), 6)
+        self.assertEqual(loca['LOCA_GL'].dtype, 'float64')
+        self.assertIsInstance(loca['LOCA_ID'].dtype, pd.CategoricalDtype)
+        self.assertEqual(loca['LOCA_REM'].isna().sum(), 4)
+        self.assertEqual(self.processor.get_file_summary()['total_records'],
+                         sum(len(df) for df in self.processor.tables.values()))
+        
+    def test_tables_dict_edits_are_kept(self):
+        """Test that groups added, replaced or deleted through processor.tables stick."""
+        import pandas as pd
+        from tests.sample_data import create_sample_ags4_file
+        first = os.path.join(self.test_dir, 'first.ags')
+        second = os.path.join(self.test_dir, 'second.ags')
+        create_sample_ags4_file(first)
+        create_sample_ags4_file(second)
+        self.processor.read_file(first)
+        
+        tables = self.processor.tables
+        tables['NEW'] = pd.DataFrame({'A': [1, 2]})
+        tables['GEOL'] = tables['GEOL'].head(1)
+        del tables['PROJ']
+        
+        self.assertNotIn('PROJ', self.processor.get_group_names())
+        self.assertIn('NEW', self.processor.get_group_names())
+        summary = self.processor.get_file_summary()
+        self.assertEqual(summary['group_names'], list(self.processor.tables))
+        self.assertEqual(summary['total_records'], sum(len(df) for df in tables.values()))
+        self.assertIs(self.processor.tables, tables)
+        
+        self.processor.read_file(second)
+        geol = self.processor.file_data['second.ags']['GEOL']
+        self.assertEqual(len(self.processor.tables['GEOL']), 1 + len(geol))
+        self.assertEqual(len(self.processor.tables['NEW']), 2)
+        self.assertEqual(len(self.processor.tables['PROJ']), 1)
+        
+    def test_source_file_follows_table_edits(self):
+        """Test that SOURCE_FILE labels stay aligned with edited tables."""
+        from tests.sample_data import create_sample_ags4_file
+        first = os.path.join(self.test_dir, 'first.ags')
+        second = os.path.join(self.test_dir, 'second.ags')
+        create_sample_ags4_file(first)
+        create_sample_ags4_file(second)
+        self.processor.read_file(first)
+        self.processor.read_file(second)
+        
+        tables = self.processor.tables
+        tables['GEOL'] = tables['GEOL'].head(2)
+        tables['LOCA'].drop(index=0, inplace=True)
+        labelled = self.processor.get_all_tables(include_source=True)
+        self.assertEqual(labelled['GEOL']['SOURCE_FILE'].isna().tolist(), [True, True])
+        self.assertEqual(labelled['LOCA']['SOURCE_FILE'].isna().sum(), len(tables['LOCA']))
+        samp = labelled['SAMP']['SOURCE_FILE']
+        n_samp = len(self.processor.file_data['first.ags']['SAMP'])
+        self.assertEqual(samp.tolist(), ['first.ags'] * n_samp + ['second.ags'] * n_samp)
+        
+        self.processor.read_file(first)
+        n_geol = len(self.processor.file_data['first.ags']['GEOL'])
+        geol = self.processor.get_all_tables(include_source=True)['GEOL']['SOURCE_FILE']
+        self.assertEqual(geol.isna().tolist(), [True, True] + [False] * n_geol)
+        self.assertEqual(set(geol.dropna()), {'first.ags'})
+        
+    def test_parse_cache_reuses_unchanged_files(self):
+        """Test that a warm parse cache returns the same tables without parsing."""
+        import pandas as pd
+        from unittest import mock
+        from ags_processor.cache import pyarrow
+        from tests.sample_data import create_sample_ags4_file
+        if pyarrow is None:
+            self.skipTest("pyarrow not installed")
+        filepath = os.path.join(self.test_dir, 'sample.ags')
+        create_sample_ags4_file(filepath)
+        cache_dir = os.path.join(self.test_dir, 'cache')
+        
+        cold = AGSProcessor(cache_dir=cache_dir)
+        expected = cold.read_file(filepath)
+        self.assertEqual(len(cold.cache), 1)
+        
+        warm = AGSProcessor(cache_dir=cache_dir)
+        with mock.patch.object(AGSProcessor, '_parse_with_validation') as parse:
+            groups = warm.read_file(filepath)
+        parse.assert_not_called()
+        self.assertEqual(list(groups), list(expected))
+        for group, df in expected.items():
+            pd.testing.assert_frame_equal(groups[group], df)
+            self.assertEqual(groups[group].attrs, df.attrs)
+        
+    def test_split_ags_line(self):
+        """Test the shared tokenizer on quoted commas and doubled quotes."""
+        from ags_processor.processor import split_ags_line
+        self.assertEqual(
+            split_ags_line('"DATA","BH1","Grey, weathered ""GRANITE""", "2.50"'),
+            ['DATA', 'BH1', 'Grey, weathered "GRANITE"', '2.50']
+        )
+        self.assertEqual(split_ags_line('**HOLE'), ['**HOLE'])
+        self.assertEqual(split_ags_line(''), [''])
+
+    def test_combine_ags_data_overlays_intervals(self):
+        """Test combining groups into intervals split at every TOP/BASE depth."""
+        import pandas as pd
+        from ags_processor.combiners import combine_ags_data
+        groups = {
+            'HOLE': pd.DataFrame({'GIU_NO': [1, 1], 'HOLE_ID': ['BH1', 'BH2']}),
+            'GEOL': pd.DataFrame({
+                'GIU_NO': 1, 'HOLE_ID': ['BH1', 'BH1'],
+                'GEOL_TOP': [0.0, 2.0], 'GEOL_BASE': [2.0, 5.0],
+                'GEOL_LEG': ['CLAY', 'GRAN'], 'GEOL_DESC': ['Soft clay', 'Granite'],
+            }),
+            'DETL': pd.DataFrame({
+                'GIU_NO': 1, 'HOLE_ID': ['BH1', 'BH1'],
+                'DETL_TOP': [1.0, 1.5], 'DETL_BASE': [3.0, 2.0],
+                'DETL_DESC': ['Joint set', 'Vein'],
+            }),
+            'WETH': pd.DataFrame({
+                'GIU_NO': 1, 'HOLE_ID': ['BH1'],
+                'WETH_TOP': [2.0], 'WETH_BASE': [5.0], 'WETH_GRAD': ['II/III'],
+            }),
+        }
+        filepath = os.path.join(self.test_dir, 'combined.xlsx')
+        with pd.ExcelWriter(filepath) as writer:
+            for name, df in groups.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+
+        combined = combine_ags_data([filepath], ['GEOL', 'DETL', 'WETH'])
+
+        self.assertEqual(list(combined['GIU_HOLE_ID'].unique()), ['1_BH1'])
+        self.assertEqual(list(combined['DEPTH_FROM']), [0.0, 1.0, 1.5, 2.0, 3.0])
+        self.assertEqual(list(combined['DEPTH_TO']), [1.0, 1.5, 2.0, 3.0, 5.0])
+        self.assertEqual(list(combined['GEOL']), ['CLAY', 'CLAY', 'CLAY', 'GRAN', 'GRAN'])
+        # The later, overlapping DETL row wins over 1.5-2.0
+        self.assertEqual(list(combined['Details'].fillna('')), ['', 'Joint set', 'Vein', 'Joint set', ''])
+        self.assertEqual(list(combined['WETH'].fillna('')), ['', '', '', 'III', 'III'])
+        self.assertEqual(list(combined.columns[:5]), ['GIU_HOLE_ID', 'GIU_NO', 'HOLE_ID', 'DEPTH_FROM', 'DEPTH_TO'])
+
+    def test_combine_ags_data_from_tables_and_parquet(self):
+        """Test combining in-memory tables and a Parquet dataset like an Excel file."""
+        import pandas as pd
+        from ags_processor.combiners import combine_ags_data
+        from ags_processor.exporter import pa
+        groups = {
+            'HOLE': pd.DataFrame({'SOURCE_FILE': 'a.ags', 'HOLE_ID': ['BH1', 'BH2']}),
+            'GEOL': pd.DataFrame({
+                'SOURCE_FILE': 'a.ags', 'HOLE_ID': ['BH1', 'BH2', 'BH2'],
+                'GEOL_TOP': [0.0, 0.0, 1.0], 'GEOL_BASE': [2.0, 1.0, 4.0],
+                'GEOL_LEG': ['CLAY', 'SAND', 'GRAN'], 'GEOL_DESC': ['Clay', 'Sand', 'Granite'],
+            }),
+        }
+        from_tables = combine_ags_data(groups, ['GEOL'])
+        self.assertEqual(list(from_tables['GIU_HOLE_ID']), ['a.ags_BH1', 'a.ags_BH2', 'a.ags_BH2'])
+        self.assertEqual(list(from_tables['GEOL']), ['CLAY', 'SAND', 'GRAN'])
+
+        filepath = os.path.join(self.test_dir, 'groups.xlsx')
+        with pd.ExcelWriter(filepath) as writer:
+            for name, df in groups.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+        pd.testing.assert_frame_equal(combine_ags_data([filepath], ['GEOL']), from_tables)
+
+        if pa is not None:
+            dataset_dir = os.path.join(self.test_dir, 'parquet')
+            self.assertTrue(AGSExporter().export_to_parquet(groups, dataset_dir))
+            from_parquet = combine_ags_data(dataset_dir, ['GEOL'])
+            pd.testing.assert_frame_equal(from_parquet.astype(object), from_tables.astype(object))
+
+        with self.assertRaises(ValueError):
+            combine_ags_data({'HOLE': pd.DataFrame({'HOLE_ID': ['BH1']})})
+
+    def test_search_depth_with_reusable_index(self):
+        """Test point and range depth queries through a prebuilt DepthIndex."""
+        import pandas as pd
+        from ags_processor import DepthIndex, search_depth
+        data = pd.DataFrame({
+            'GIU_HOLE_ID': ['G_BH2', 'G_BH1', 'G_BH1', 'G_BH1'],
+            'DEPTH_FROM': [0.0, 2.0, 0.0, 1.0],
+            'DEPTH_TO': [3.0, 4.0, 2.0, 5.0],
+            'GEOL': ['SAND', 'GRAN', 'CLAY', 'FILL'],
+        })
+        index = DepthIndex(data)
+
+        points = pd.DataFrame({'GIU_HOLE_ID': ['G_BH1', 'G_BH2', 'G_BH9'], 'DEPTH': [2.0, 3.0, 1.0]})
+        result = search_depth(index, points)
+        # Matches keep data order; DEPTH_TO is exclusive and unknown holes match nothing
+        self.assertEqual(list(result.columns), ['GIU_HOLE_ID', 'DEPTH', 'DEPTH_FROM', 'DEPTH_TO', 'GEOL'])
+        self.assertEqual(list(result['GEOL']), ['GRAN', 'FILL'])
+
+        ranges = pd.DataFrame({'GIU_HOLE_ID': ['G_BH1'], 'DEPTH_FROM': [4.0], 'DEPTH_TO': [6.0]})
+        result = search_depth(index, ranges, is_single_depth=False)
+        self.assertEqual(list(result['GEOL']), ['FILL'])
+        self.assertEqual(list(result['DEPTH_FROM']), [1.0])
+        pd.testing.assert_frame_equal(search_depth(data, ranges, is_single_depth=False), result)
+
+    def test_search_keyword_matches_all_keywords_in_one_pass(self):
+        """Test overlapping, regex and 'no recovery' keywords over repeated descriptions."""
+        import numpy as np
+        import pandas as pd
+        from ags_processor import search_keyword
+        df = pd.DataFrame({
+            'GEOL_DESC': ['Grey CLAYEY SAND', 'Grey CLAYEY SAND', np.nan, 'Granite'],
+            'Details': ['', 'No recovery', 'gray clay', np.nan],
+            'FI': ['5', np.nan, 'NR', 'NI'],
+        })
+        result = search_keyword(df, ['clay', 'clayey', 'gr[ae]y', 'no recovery'])
+        self.assertEqual(list(result.columns[3:]), ['clay', 'clayey', 'gr[ae]y', 'No Recovery'])
+        self.assertEqual(list(result['clay']), [True, True, True, False])
+        self.assertEqual(list(result['clayey']), [True, True, False, False])
+        self.assertEqual(list(result['gr[ae]y']), [True, True, True, False])
+        self.assertEqual(list(result['No Recovery']), [False, True, True, False])
+
+    def test_search_keyword_accepts_inline_global_flags(self):
+        """Test that a keyword starting with a global flag such as (?i) still searches."""
+        import pandas as pd
+        from ags_processor import search_keyword
+        df = pd.DataFrame({'GEOL_DESC': ['GRANITE', 'Grey CLAY'], 'Details': ['', ''], 'FI': ['', '']})
+        result = search_keyword(df, ['(?i)granite', 'clay'])
+        self.assertEqual(list(result['(?i)granite']), [True, False])
+        self.assertEqual(list(result['clay']), [False, True])
+
+    def test_search_keyword_literals_match_str_contains(self):
+        """Test that literal keywords scanned together match a search per keyword."""
+        import pandas as pd
+        from ags_processor import search_keyword
+        df = pd.DataFrame({
+            'GEOL_DESC': ['Stiff sandy CLAY', 'Clayey SAND with shell', 'SAND', 'silty clay'],
+            'Details': ['', 'sandy clay', '', None],
+        })
+        keywords = ['sand', 'sandy clay', 'clay', 'clayey sand|shell', 'y c', 'gr[ae]y']
+        result = search_keyword(df, keywords)
+        for kw in keywords:
+            expected = (df['GEOL_DESC'].str.contains(kw, case=False, na=False) |
+                        df['Details'].str.contains(kw, case=False, na=False))
+            self.assertEqual(list(result[kw]), list(expected), kw)
+
+    def test_match_soil_types_with_custom_rules(self):
+        """Test the default rule tables and a user rule added without code changes."""
+        import numpy as np
+        import pandas as pd
+        from ags_processor import match_soil_types
+        from ags_processor.search import SOIL_TYPE_RULES
+        df = pd.DataFrame({
+            'GEOL_DESC': ['Soft grey sandy CLAY', 'Dark brown PEAT', 'Loose FILL of SAND'],
+            'GEOL': ['ALL', np.nan, 'FILL'],
+            'Details': [np.nan, 'COBBLES', ''],
+            'WETH': [np.nan, np.nan, 'V'],
+        })
+        result = match_soil_types(df, ['ALLUVIUM', 'FILL', 'V'], ['CLAY', 'SAND', 'COBBLE'])
+        self.assertEqual(list(result['Soil Type/Grain Size']), ['ALL-c', 'nan-cb', 'V-s'])
+        self.assertEqual(list(result.columns[4:]), ['Soil Type/Grain Size', 'Clay', 'Sand', 'Cobble'])
+        self.assertEqual(result['Sand'].tolist()[2], 's')
+
+        peat = pd.DataFrame([{'option': 'PEAT', 'field': 'GEOL_DESC', 'pattern': 'peat', 'case': False,
+                              'output': 'Soil Type', 'code': 'PT', 'priority': 1}])
+        rules = pd.concat([SOIL_TYPE_RULES, peat], ignore_index=True)
+        result = match_soil_types(df, ['PEAT', 'FILL'], [], soil_type_rules=rules)
+        self.assertEqual(list(result['Soil Type/Grain Size']), ['nan-nan', 'PT-nan', 'FILL-nan'])
+
+    def test_text_index_persists_next_to_data(self):
+        """Test that searches through a saved TextIndex match plain searches."""
+        import numpy as np
+        import pandas as pd
+        from ags_processor import TextIndex, search_keyword, match_soil_types
+        df = pd.DataFrame({
+            'GEOL_DESC': ['Grey sandy CLAY', 'No recovery', np.nan, 'Grey sandy CLAY', 'Loose FILL'],
+            'Details': ['GRAVEL band', '', 'grey silt', np.nan, 'COBBLES'],
+            'GEOL': ['ALL', np.nan, 'FILL', 'ALL', 'FILL'],
+            'WETH': np.nan,
+        })
+        data_path = os.path.join(self.test_dir, 'combined.xlsx')
+        df.to_excel(data_path, index=False)
+
+        index = TextIndex.for_dataset(data_path, df)
+        self.assertTrue(os.path.exists(TextIndex.path_for(data_path)))
+        reloaded = TextIndex.for_dataset(data_path, df)
+        self.assertEqual(reloaded.fields['GEOL_DESC'][1], index.fields['GEOL_DESC'][1])
+
+        keywords = ['clay', 'grey|gravel', 'no recovery', 'san.y', 'xyz']
+        pd.testing.assert_frame_equal(
+            search_keyword(df, keywords, text_index=reloaded), search_keyword(df, keywords)
+        )
+        pd.testing.assert_frame_equal(
+            match_soil_types(df, ['FILL', 'ALLUVIUM'], ['CLAY', 'COBBLE', 'silt'], text_index=reloaded),
+            match_soil_types(df, ['FILL', 'ALLUVIUM'], ['CLAY', 'COBBLE', 'silt'])
+        )
+        with self.assertRaises(ValueError):
+            search_keyword(df.head(2), keywords, text_index=reloaded)
+
+        # Rows are looked up by their text, not their position
+        reordered = df.iloc[::-1].reset_index(drop=True)
+        reordered.loc[0, 'Details'] = 'new CLAY band'
+        pd.testing.assert_frame_equal(
+            search_keyword(reordered, keywords, text_index=reloaded), search_keyword(reordered, keywords)
+        )
+
+    def test_triaxial_lithology_interval_join(self):
+        """Test lithology lookup boundary rules for triaxial specimens."""
+        import pandas as pd
+        from ags_processor.triaxial import generate_triaxial_with_lithology
+        groups = {
+            'TRET': pd.DataFrame({
+                'HOLE_ID': ['BH1', 'BH1', 'BH1', 'BH2', 'BH3'],
+                'SPEC_DEPTH': ['2.0', '5.0', '9.0', '1.0', '1.0'],
+                'TRET_CELL': ['100', '200', '300', '50', '50'],
+                'TRET_DEVF': ['300', '400', '500', '100', '100'],
+            }),
+            'GIU': pd.DataFrame({
+                'HOLE_ID': ['BH1', 'BH1', 'BH2', 'BH2'],
+                'DEPTH_FROM': ['2', '0', '0', '0.5'],
+                'DEPTH_TO': ['6', '2', '0.5', None],
+                'GEOL_DESC': ['SAND', 'CLAY', 'FILL', 'GRAVEL'],
+            }),
+        }
+
+        result = generate_triaxial_with_lithology(groups)
+
+        # Shared boundaries go to the shallower interval; open or missing intervals never match
+        self.assertEqual(result['LITHOLOGY'].tolist(), ['CLAY', 'SAND', None, None, None])
+
+    def test_clean_group_matches_stepwise_cleaning(self):
+        """Test that the fused cleaning stage equals the step-by-step pipeline."""
+        import numpy as np
+        import pandas as pd
+        from ags_processor.cleaners import clean_group, drop_singleton_rows, expand_rows, deduplicate_cell
+        df = pd.DataFrame({
+            'HOLE_ID': ['BH1', 'BH1 | BH1', 'BH2', '  ', 'BH3 | BH4'],
+            'DEPTH_FROM': ['1.0', '2.0 | 3.0', np.nan, 'x', '4.0'],
+            'GEOL_DESC': [' CLAY ', 'SAND | SAND', None, np.nan, 'A |  | B'],
+        })
+
+        stepwise = expand_rows(drop_singleton_rows(df)).map(deduplicate_cell)
+        fused = clean_group(df)
+
+        pd.testing.assert_frame_equal(fused, stepwise)
+        self.assertEqual(fused['HOLE_ID'].tolist(), ['BH1', 'BH1', 'BH1', 'BH3', 'BH4', ''])
+        self.assertEqual(fused['GEOL_DESC'].tolist(), ['CLAY', 'SAND', 'SAND', 'A', '', 'B'])
+
+    def test_remove_duplicate_tests_reports_per_file(self):
+        """Test rounded, hash-based duplicate removal and its per-file report."""
+        import numpy as np
+        import pandas as pd
+        from ags_processor.triaxial import remove_duplicate_tests
+        df = pd.DataFrame({
+            'HOLE_ID': ['BH1', 'BH1', 'BH1', 'BH2', 'BH2'],
+            'SPEC_DEPTH': [1.0, 1.001, 1.0, 2.0, 2.0],
+            'CELL': [100.0, 100.0, 200.0, np.nan, np.nan],
+            'DEVF': [50.0, 50.0, 50.0, 80.0, 80.0],
+            'SOURCE_FILE': ['a.ags', 'a.ags', 'a.ags', 'b.ags', 'c.ags'],
+        })
+
+        result, report = remove_duplicate_tests(df, return_report=True)
+
+        self.assertEqual(len(result), 4)
+        self.assertEqual(report.to_dict(), {'a.ags': 1, 'b.ags': 0, 'c.ags': 0})
+        self.assertEqual(len(remove_duplicate_tests(df, decimals=3)), 5)
+
+        # Even if every row hashed alike, only rows with equal keys are dropped
+        from unittest import mock
+        with mock.patch.object(pd.util, 'hash_pandas_object', lambda keys, index: pd.Series(0, index=keys.index)):
+            pd.testing.assert_frame_equal(remove_duplicate_tests(df), result)
+
+    def test_fit_strength_params_per_group(self):
+        """Test batched s-t fits against known Mohr-Coulomb lines."""
+        import numpy as np
+        import pandas as pd
+        from ags_processor.triaxial import fit_strength_params, estimate_strength_params
+        s = np.array([100.0, 200.0, 300.0])
+        st_df = pd.DataFrame({
+            'LITH': ['CLAY'] * 3 + ['SAND'] * 3 + [None] * 2,
+            'TEST_TYPE': ['CU'] * 8,
+            's': np.r_[s, s, 50.0, 50.0],
+            't': np.r_[10 + 0.5 * s, 0.25 * s, 20.0, np.nan],
+        })
+
+        params = fit_strength_params(st_df)
+
+        self.assertEqual(params['LITH'].tolist()[:2], ['CLAY', 'SAND'])
+        self.assertTrue(pd.isna(params['LITH'].iloc[2]))
+        self.assertEqual(params['n_tests'].tolist(), [3, 3, 1])
+        np.testing.assert_allclose(params['phi_deg'].iloc[:2], np.degrees(np.arcsin([0.5, 0.25])))
+        np.testing.assert_allclose(params['r_squared'].iloc[:2], [1.0, 1.0])
+        self.assertAlmostEqual(params['cohesion'].iloc[0], 10 / np.cos(np.radians(30)))
+        self.assertTrue(params.iloc[2][['slope', 'phi_deg', 'cohesion']].isna().all())
+        self.assertEqual(estimate_strength_params(st_df[st_df['LITH'] == 'CLAY']), (30.0, 11.55))
+
+    def test_fit_strength_params_categorical_groups(self):
+        """Test that unused categories of a group key do not add empty groups."""
+        import numpy as np
+        import pandas as pd
+        from ags_processor.triaxial import fit_strength_params
+        s = np.array([100.0, 200.0, 300.0, 100.0, 200.0])
+        st_df = pd.DataFrame({
+            'LITHOLOGY': pd.Categorical(['a', 'a', 'a', 'c', 'c'], categories=['a', 'b', 'c']),
+            's': s,
+            't': np.r_[0.5 * s[:3], 5 + 0.25 * s[3:]],
+        })
+
+        params = fit_strength_params(st_df)
+
+        self.assertEqual(params['LITHOLOGY'].tolist(), ['a', 'c'])
+        self.assertEqual(params['n_tests'].tolist(), [3, 2])
+        np.testing.assert_allclose(params['slope'], [0.5, 0.25])
+        np.testing.assert_allclose(params['intercept'], [0.0, 5.0], atol=1e-9)
+
     def test_clear(self):
         """Test clearing processor data."""
         self.processor.errors['test'] = ['error']
@@ -109,6 +661,37 @@ class TestAGSExporter(unittest.TestCase):
         self.assertTrue(success)
         self.assertTrue(os.path.exists(output_path))
         
+    def test_export_to_excel_rolls_over_row_limit(self):
+        """Test that tables over the sheet row limit continue on GROUP_2, GROUP_3 sheets."""
+        import pandas as pd
+        from unittest import mock
+        from ags_processor import exporter
+        tables = {'GEOL': pd.DataFrame({'HOLE_ID': ['BH1'] * 7, 'GEOL_TOP': [float(i) for i in range(7)]})}
+        output_path = os.path.join(self.test_dir, 'output.xlsx')
+        
+        with mock.patch.object(exporter, 'EXCEL_MAX_ROWS', 4):
+            success = self.exporter.export_to_excel(tables, output_path, include_summary=False)
+        self.assertTrue(success)
+        
+        sheets = pd.read_excel(output_path, sheet_name=None)
+        self.assertEqual(list(sheets), ['GEOL', 'GEOL_2', 'GEOL_3'])
+        combined = pd.concat(sheets.values(), ignore_index=True)
+        pd.testing.assert_frame_equal(combined, tables['GEOL'], check_dtype=False)
+        
+    def test_export_to_excel_writes_infinite_values(self):
+        """Test that +/-inf values are written as text without cutting the sheet short."""
+        import numpy as np
+        import pandas as pd
+        tables = {'T': pd.DataFrame({'a': [1.0, np.inf, -np.inf, 3.0], 'b': list('wxyz')})}
+        output_path = os.path.join(self.test_dir, 'inf.xlsx')
+        
+        self.assertTrue(self.exporter.export_to_excel(tables, output_path, include_summary=False))
+        
+        sheet = pd.read_excel(output_path, sheet_name='T')
+        # Stored as the text 'inf'/'-inf', which read_excel parses back to floats
+        self.assertEqual(sheet['a'].tolist(), [1.0, np.inf, -np.inf, 3.0])
+        self.assertEqual(sheet['b'].tolist(), list('wxyz'))
+        
     def test_create_summary_sheet(self):
         """Test summary sheet creation."""
         import pandas as pd
@@ -122,6 +705,33 @@ class TestAGSExporter(unittest.TestCase):
         self.assertIn('Table Name', summary.columns)
         self.assertIn('Row Count', summary.columns)
         
+    def test_export_to_parquet_partitions_and_metadata(self):
+        """Test Parquet export partitions by source file and keeps AGS metadata."""
+        import json
+        import pandas as pd
+        from ags_processor.exporter import pq
+        from tests.sample_data import create_sample_ags4_file
+        if pq is None:
+            self.skipTest("pyarrow not installed")
+        processor = AGSProcessor()
+        for name in ('a.ags', 'b.ags'):
+            create_sample_ags4_file(os.path.join(self.test_dir, name))
+            processor.read_file(os.path.join(self.test_dir, name))
+        output_dir = os.path.join(self.test_dir, 'parquet')
+        
+        success = self.exporter.export_to_parquet(processor.get_all_tables(include_source=True), output_dir)
+        self.assertTrue(success, self.exporter.get_errors())
+        
+        loca_dir = os.path.join(output_dir, 'LOCA')
+        self.assertEqual(sorted(os.listdir(loca_dir)), ['SOURCE_FILE=a.ags', 'SOURCE_FILE=b.ags'])
+        loca = pd.read_parquet(loca_dir)
+        self.assertEqual(len(loca), 4)
+        self.assertEqual(loca['LOCA_GL'].dtype, 'float64')
+        self.assertIsInstance(loca['LOCA_ID'].dtype, pd.CategoricalDtype)
+        schema = pq.read_schema(os.path.join(loca_dir, 'SOURCE_FILE=a.ags', os.listdir(os.path.join(loca_dir, 'SOURCE_FILE=a.ags'))[0]))
+        self.assertEqual(schema.field('LOCA_GL').metadata[b'unit'], b'm')
+        self.assertEqual(json.loads(schema.metadata[b'ags'])['types']['LOCA_NATE'], '2DP')
+        
     def test_clear_errors(self):
         """Test clearing export errors."""
         self.exporter.export_errors.append('test error')